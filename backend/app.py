@@ -15,16 +15,37 @@ if sys.platform == "win32" and hasattr(sys.stdout, "reconfigure"):
     except OSError:
         pass
 
+# Root logger -> queue -> one writer thread (LOG_LEVEL, LOG_FORMAT); see logging_config.py.
+from logging_config import configure_logging
+
+configure_logging()
+
 from flask import Flask
 
 from flask_cors import CORS
+from compression import init_compression
+from json_provider import install_json_provider
+import event_broker
+import metrics
+import profiling
+import tracing
 from routes.google_auth import google_auth
 from routes.emails import emails
 from routes.user import user
 from routes.profile import profile
 from routes.canvas import canvas_bp
+from routes.internal import internal
+from routes.events import events
+from routes.dashboard import dashboard_bp
+from routes.metrics import metrics_bp
+from event_hub import get_hub
 
 app = Flask(__name__)
+install_json_provider(app)
+init_compression(app)
+metrics.init_app(app)
+tracing.init_app(app)
+profiling.init_app(app)
 
 _frontend = os.getenv("FRONTEND_URL", "http://localhost:3000").rstrip("/")
 _cors_origins = [o.strip() for o in os.getenv("CORS_ORIGINS", _frontend).split(",") if o.strip()]
@@ -39,6 +60,22 @@ app.register_blueprint(emails, url_prefix="/api")
 app.register_blueprint(user)
 app.register_blueprint(profile, url_prefix="/api/profile")
 app.register_blueprint(canvas_bp, url_prefix="/api")
+app.register_blueprint(internal, url_prefix="/internal")
+app.register_blueprint(events, url_prefix="/api")
+app.register_blueprint(dashboard_bp, url_prefix="/api")
+app.register_blueprint(metrics_bp)
+
+if event_broker.enabled():
+    # Events published by other workers and by CLI sync runs reach this worker's streams through the relay.
+    event_broker.start_relay(get_hub())
+
+if os.getenv("REMINDER_SCHEDULER", "0").lower() in ("1", "true", "yes"):
+    # Fire deadline reminders from a web worker (instead of a separate `python reminder_scheduler.py`);
+    # only the process holding REMINDER_LOCK_PATH runs the scheduler, and EVENT_BROKER=supabase
+    # delivers its reminders to every worker's streams.
+    from reminder_scheduler import start_in_background
+
+    start_in_background()
 
 
 @app.route("/")
@@ -0,0 +1,72 @@
+"""
+Process-wide event loop and pooled async HTTP client for upstream APIs (Canvas, Gmail).
+
+Route handlers stay ordinary WSGI views; they hand their upstream calls to run(), which executes the
+coroutine on one event loop running in a daemon thread. Every request in the process shares that
+loop and one httpx.AsyncClient, so concurrent requests reuse keep-alive connections and their many
+small upstream calls overlap instead of each handler making them one after another.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+
+import httpx
+
+UPSTREAM_TIMEOUT = float(os.environ.get("UPSTREAM_TIMEOUT", "30"))
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get("UPSTREAM_MAX_CONNECTIONS", "100"))
+
+_loop: asyncio.AbstractEventLoop | None = None
+_client: httpx.AsyncClient | None = None
+_lock = threading.Lock()
+
+
+def _start_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="upstream-io", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def _reset_after_fork():
+    # The loop thread does not survive fork(); each gunicorn worker starts its own on first use.
+    global _loop, _client
+    _loop = None
+    _client = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def client() -> httpx.AsyncClient:
+    """The shared client. Only call from coroutines running on the upstream loop (i.e. inside run())."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=UPSTREAM_TIMEOUT,
+            limits=httpx.Limits(max_connections=UPSTREAM_MAX_CONNECTIONS, max_keepalive_connections=20),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def _in_context(context: contextvars.Context, coro):
+    # Tasks on the loop thread start from that thread's context; carry over the caller's
+    # context variables (e.g. the active trace span) so spans created upstream nest correctly.
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def run(coro, timeout: float = None):
+    """Run a coroutine on the shared upstream loop and return its result (blocks the calling thread)."""
+    future = asyncio.run_coroutine_threadsafe(_in_context(contextvars.copy_context(), coro), _start_loop())
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
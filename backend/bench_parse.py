@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the email parse pipeline (no network, no Gemini quota).
+
+Generates synthetic student inboxes with known ground truth, records a scripted LLM response for
+each one through the record/replay layer (llm_replay.py), then replays them through the real
+call_llm -> parse_llm_output -> dedupe_notification_list path and reports:
+- per-stage throughput (rules pre-filter, compaction, LLM replay, parse, dedup) in emails/sec and rows/sec;
+- prompt tokens per email, before and after compaction;
+- dedup precision/recall against the ground truth.
+
+Usage:
+  python3 bench_parse.py
+  python3 bench_parse.py --inboxes 50 --emails 60 --seed 7 --output-mode json
+  python3 bench_parse.py --fixtures-dir fixtures/bench --json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+os.environ.setdefault("GOOGLE_API_KEY", "offline-bench")
+# The scripted model has no context-cache API; send the system prompt inline.
+os.environ.setdefault("LLM_CONTEXT_CACHE", "0")
+BENCH_API_KEY = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
+
+from email_compact import compact_emails
+from email_rules import prefilter_emails
+from llm_client import AsyncGeminiClient, estimate_tokens, install_async_client
+from llm_replay import ReplayGenaiClient
+from parse_notifications import (
+    COLUMNS,
+    call_llm,
+    dedupe_notification_list,
+    format_emails_for_llm,
+    parse_llm_output,
+)
+
+COURSES = ["CSE 110", "CSE 101", "MATH 20C", "COGS 9", "PHYS 2A", "ECON 1", "BILD 1"]
+PROFESSORS = ["Professor Smith", "Professor Lee", "Professor Garcia", "TA Chen"]
+
+
+# ──────────────────────────────────────────────
+# Synthetic corpus
+# ──────────────────────────────────────────────
+
+def _make_inbox(rng: random.Random, n_emails: int, today: datetime) -> dict:
+    """
+    One inbox: emails, the pipe lines a well-behaved model would return per subject,
+    and truth ids for every row summary (same id = same real-world item).
+    """
+    emails, lines_by_subject, truth_by_summary = [], {}, {}
+    items = []  # (truth_id, course, line fields) for later reminders
+
+    def add(subject, sender, body, lines=(), list_id=""):
+        subject = f"{subject} #{len(emails)}"
+        if lines and rng.random() < 0.5:
+            # Real mail carries signatures, quoted history and tracking links the compactor should strip.
+            body += (
+                f"\n\nDetails: https://canvas.ucsd.edu/courses/{rng.randint(1000, 9999)}?utm_source=email&utm_medium=notify\n"
+                f"\n-- \n{rng.choice(PROFESSORS)}\nUC San Diego\n\n"
+                f"On Mon, Jan 5, 2026 at 9:00 AM Student <student@ucsd.edu> wrote:\n"
+                + "> Hi, quick question about the course logistics and the upcoming deadline.\n" * rng.randint(3, 12)
+            )
+        emails.append({"from": sender, "subject": subject, "body": body, "list_id": list_id})
+        lines_by_subject[subject] = [" | ".join(str(f.get(c) or "null") for c in COLUMNS) for f in lines]
+
+    for i in range(n_emails):
+        kind = rng.choices(
+            ["assignment", "exam", "reminder", "grades", "canvas", "digest", "promo", "drive", "newsletter"],
+            weights=[18, 8, 14, 8, 10, 6, 6, 5, 6],
+        )[0]
+        course = rng.choice(COURSES)
+        due = (today + timedelta(days=rng.randint(-2, 20))).strftime("%Y-%m-%d")
+
+        if kind == "reminder" and items:
+            truth_id, fields = rng.choice(items)
+            dup = dict(fields)
+            if rng.random() < 0.5:
+                dup["summary"] = fields["summary"].rstrip(".") + " soon."  # near-duplicate wording
+            truth_by_summary.setdefault(dup["summary"], truth_id)
+            add(f"Reminder: {fields['summary']}", f"{fields['source']} <prof@ucsd.edu>", dup["summary"], [dup])
+        elif kind in ("assignment", "reminder"):
+            title = f"Homework {rng.randint(1, 9)}"
+            fields = {
+                "source": course, "category": "assignment", "event_date": due, "event_time": "11:59 PM",
+                "urgency": "high", "link": "", "summary": f"{title} for {course} is due on {due}.",
+            }
+            truth_id = f"{course}:{title}:{due}"
+            truth_by_summary.setdefault(fields["summary"], truth_id)
+            items.append((truth_id, fields))
+            add(f"{course}: {title} posted", f"{rng.choice(PROFESSORS)} <prof@ucsd.edu>", fields["summary"], [fields])
+        elif kind == "exam":
+            fields = {
+                "source": course, "category": "exam", "event_date": due, "event_time": "10:00 AM",
+                "urgency": "high", "link": "", "summary": f"Midterm exam for {course} in Center Hall 105.",
+            }
+            truth_id = f"{course}:midterm:{due}"
+            truth_by_summary.setdefault(fields["summary"], truth_id)
+            items.append((truth_id, fields))
+            add(f"{course} midterm logistics", f"{rng.choice(PROFESSORS)} <prof@ucsd.edu>", fields["summary"], [fields])
+        elif kind == "grades":
+            # Same kind of update for a different course must NOT be merged by dedup.
+            fields = {
+                "source": course, "category": "announcement", "event_date": "", "event_time": "",
+                "urgency": "medium", "link": "", "summary": "Final grades have been posted.",
+            }
+            truth_by_summary.setdefault((course, fields["summary"]), f"{course}:grades")
+            add(f"{course} grades", f"{course} Staff <staff@ucsd.edu>", fields["summary"], [fields])
+        elif kind == "canvas":
+            title = f"Project {rng.randint(1, 5)}"
+            due_dt = today + timedelta(days=rng.randint(1, 20))
+            summary = f"[{course} WI26] {title} is due."
+            truth_by_summary.setdefault(summary, f"{course} WI26:{title}:canvas")
+            add(
+                f"Assignment Created - {title}, {course} WI26",
+                "Canvas <notifications@instructure.com>",
+                f"{title}, {course} WI26 has been created. due: {due_dt.strftime('%b')} {due_dt.day} at 11:59pm",
+            )
+            # The subject counter would break the rule regex; extract rules see the raw subject.
+            emails[-1]["subject"] = emails[-1]["subject"].rsplit(" #", 1)[0]
+        elif kind == "digest":
+            add("Recent Canvas Notifications", "Canvas <notifications@instructure.com>", "You have 5 new notifications.")
+        elif kind == "promo":
+            add("50% off bowls today", "TritonToGo <promo@tritontogo.ucsd.edu>", "Order now!")
+        elif kind == "drive":
+            add("Document shared with you", "Google Drive <drive-shares-dm-noreply@google.com>", "A doc was shared.")
+        else:
+            add("Weekly campus digest", "Campus News <news@ucsd.edu>", "Stories from around campus.",
+                list_id="<weekly.news.ucsd.edu>")
+
+    return {"emails": emails, "lines_by_subject": lines_by_subject, "truth_by_summary": truth_by_summary}
+
+
+def build_corpus(n_inboxes: int, n_emails: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    today = datetime.now()
+    return [_make_inbox(rng, n_emails, today) for _ in range(n_inboxes)]
+
+
+class ScriptedGenai:
+    """Fake genai client: answers each prompt with the scripted lines for the subjects it contains."""
+
+    def __init__(self, lines_by_subject: dict, output_mode: str):
+        self.lines_by_subject = lines_by_subject
+        self.output_mode = output_mode
+        self.aio = SimpleNamespace(models=self)
+
+    def _text(self, contents) -> str:
+        prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str)
+        lines = []
+        for subject in re.findall(r"^SUBJECT: (.*)$", prompt, flags=re.MULTILINE):
+            lines.extend(self.lines_by_subject.get(subject.strip(), []))
+        if self.output_mode == "json":
+            rows = [dict(zip(COLUMNS, [None if v == "null" else v for v in line.split(" | ")])) for line in lines]
+            return json.dumps(rows)
+        return "\n".join(lines)
+
+    async def generate_content(self, model, contents, config=None):
+        text = self._text(contents)
+        usage = SimpleNamespace(prompt_token_count=estimate_tokens(str(contents)), candidates_token_count=estimate_tokens(text))
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+# ──────────────────────────────────────────────
+# Benchmark
+# ──────────────────────────────────────────────
+
+def _truth_id(row: dict, truth_by_summary: dict):
+    summary = row.get("summary", "")
+    return truth_by_summary.get(summary) or truth_by_summary.get((row.get("source"), summary))
+
+
+def run_benchmark(corpus: list[dict], fixtures_dir: str, output_mode: str = "pipe") -> dict:
+    timings = {"prefilter": 0.0, "compact": 0.0, "llm": 0.0, "parse": 0.0, "dedup": 0.0}
+    counts = {"emails": 0, "llm_emails": 0, "rows": 0, "prompt_tokens": 0, "raw_prompt_tokens": 0}
+    dedup = {"dropped": 0, "true_dropped": 0, "true_duplicates": 0}
+
+    for inbox in corpus:
+        emails = inbox["emails"]
+        counts["emails"] += len(emails)
+
+        t0 = time.perf_counter()
+        llm_emails, rule_rows, _ = prefilter_emails(emails)
+        timings["prefilter"] += time.perf_counter() - t0
+
+        raw = ""
+        if llm_emails:
+            counts["raw_prompt_tokens"] += estimate_tokens(format_emails_for_llm(llm_emails))
+            t0 = time.perf_counter()
+            llm_emails, _ = compact_emails(llm_emails)
+            timings["compact"] += time.perf_counter() - t0
+            prompt_text = format_emails_for_llm(llm_emails)
+            counts["llm_emails"] += len(llm_emails)
+
+            # Record once through the real call path, then time the offline replay.
+            install_async_client(BENCH_API_KEY, AsyncGeminiClient(genai_client=ReplayGenaiClient(
+                "record", fixtures_dir, inner=ScriptedGenai(inbox["lines_by_subject"], output_mode))))
+            call_llm(prompt_text, output_mode)
+
+            replay = ReplayGenaiClient("replay", fixtures_dir)
+            install_async_client(BENCH_API_KEY, AsyncGeminiClient(genai_client=replay))
+            t0 = time.perf_counter()
+            raw = call_llm(prompt_text, output_mode)
+            timings["llm"] += time.perf_counter() - t0
+            counts["prompt_tokens"] += estimate_tokens(prompt_text)
+
+        t0 = time.perf_counter()
+        rows = rule_rows + parse_llm_output(raw, output_mode)
+        timings["parse"] += time.perf_counter() - t0
+        counts["rows"] += len(rows)
+
+        t0 = time.perf_counter()
+        kept = dedupe_notification_list(rows)
+        timings["dedup"] += time.perf_counter() - t0
+
+        kept_ids = {id(r) for r in kept}
+        seen = set()
+        for row in rows:
+            truth = _truth_id(row, inbox["truth_by_summary"])
+            is_dup = truth is not None and truth in seen
+            seen.add(truth)
+            dropped = id(row) not in kept_ids
+            dedup["true_duplicates"] += is_dup
+            dedup["dropped"] += dropped
+            dedup["true_dropped"] += dropped and is_dup
+
+    def rate(n, seconds):
+        return round(n / seconds, 1) if seconds > 0 else None
+
+    return {
+        "inboxes": len(corpus),
+        "emails": counts["emails"],
+        "emails_to_llm": counts["llm_emails"],
+        "rows": counts["rows"],
+        "throughput": {
+            "prefilter_emails_per_sec": rate(counts["emails"], timings["prefilter"]),
+            "compact_emails_per_sec": rate(counts["llm_emails"], timings["compact"]),
+            "llm_replay_emails_per_sec": rate(counts["llm_emails"], timings["llm"]),
+            "parse_rows_per_sec": rate(counts["rows"], timings["parse"]),
+            "dedup_rows_per_sec": rate(counts["rows"], timings["dedup"]),
+        },
+        "prompt_tokens_per_email": round(counts["prompt_tokens"] / counts["emails"], 1) if counts["emails"] else 0,
+        "prompt_tokens_per_llm_email": round(counts["prompt_tokens"] / counts["llm_emails"], 1) if counts["llm_emails"] else 0,
+        "prompt_tokens_before_compaction": counts["raw_prompt_tokens"],
+        "prompt_tokens_after_compaction": counts["prompt_tokens"],
+        "dedup": {
+            "precision": round(dedup["true_dropped"] / dedup["dropped"], 3) if dedup["dropped"] else 1.0,
+            "recall": round(dedup["true_dropped"] / dedup["true_duplicates"], 3) if dedup["true_duplicates"] else 1.0,
+            **dedup,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for call_llm + parse + dedup")
+    parser.add_argument("--inboxes", type=int, default=20, help="Number of synthetic inboxes")
+    parser.add_argument("--emails", type=int, default=40, help="Emails per inbox")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the corpus")
+    parser.add_argument("--output-mode", choices=["pipe", "json"], default="pipe", help="LLM response format")
+    parser.add_argument("--fixtures-dir", type=str, help="Keep recorded fixtures here (default: temp dir)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    fixtures_dir = args.fixtures_dir or tempfile.mkdtemp(prefix="llm-fixtures-")
+    corpus = build_corpus(args.inboxes, args.emails, args.seed)
+    report = run_benchmark(corpus, fixtures_dir, args.output_mode)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Inboxes: {report['inboxes']}  emails: {report['emails']}  sent to LLM: {report['emails_to_llm']}  rows: {report['rows']}")
+    for name, value in report["throughput"].items():
+        print(f"  {name:<28} {value}")
+    print(f"  prompt tokens / email        {report['prompt_tokens_per_email']}")
+    print(f"  prompt tokens / LLM email    {report['prompt_tokens_per_llm_email']}")
+    print(f"  prompt tokens compacted      {report['prompt_tokens_before_compaction']} -> {report['prompt_tokens_after_compaction']}")
+    d = report["dedup"]
+    print(f"  dedup precision / recall     {d['precision']} / {d['recall']}  "
+          f"(dropped {d['dropped']}, true duplicates {d['true_duplicates']})")
+    print(f"Fixtures: {fixtures_dir}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Load test for /api/canvas/courses under gunicorn, against a local fake Canvas (no network, no Supabase).
+
+Starts a fake Canvas REST API that answers every call after a fixed delay, then for each worker
+count starts gunicorn (gunicorn.conf.py, app built by bench_app()), drives it with concurrent
+keep-alive clients for a fixed time and reports requests/sec and latency percentiles.
+--modes compares the legacy sync canvasapi crawl (CANVAS_ASYNC=0) with the async path.
+
+Usage:
+  python3 bench_server.py
+  python3 bench_server.py --workers 1 2 4 8 --threads 4 --clients 32 --duration 15 --canvas-latency 0.05
+  python3 bench_server.py --worker-class gevent
+  python3 bench_server.py --workers 1 --modes sync async --clients 8 16 32
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+BENCH_USER_ID = "bench-user"
+
+
+class FakeCanvasHandler(BaseHTTPRequestHandler):
+    """Just enough of the Canvas REST API for canvas_api.fetch_canvas_info."""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+    courses = 4
+    assignments = 20
+    announcements = 5
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        path = urlsplit(self.path).path.rstrip("/")
+        parts = path.split("/")
+        if path == "/api/v1/courses":
+            body = [{"id": i, "name": f"CSE {100 + i} - WI26"} for i in range(1, self.courses + 1)]
+        elif path.endswith("/enrollments"):
+            body = [{"id": 1, "type": "StudentEnrollment",
+                     "grades": {"current_score": 93.5, "current_grade": "A", "final_score": 90.1, "final_grade": "A-"}}]
+        elif path.endswith("/assignments"):
+            course_id = int(parts[4])
+            body = [{"id": course_id * 1000 + i, "name": f"Assignment {i}", "due_at": "2026-03-0%dT07:59:00Z" % (1 + i % 9),
+                     "description": "<p>" + "Read the spec carefully. " * 20 + "</p>", "points_possible": 10,
+                     "course_id": course_id} for i in range(self.assignments)]
+        elif path == "/api/v1/announcements":
+            body = [{"id": 9000 + i, "title": f"Announcement {i}", "message": "<p>" + "Reminder. " * 30 + "</p>",
+                     "posted_at": "2026-02-01T18:00:00Z", "context_code": "course_1"} for i in range(self.announcements)]
+        else:
+            body = {"errors": [{"message": f"not faked: {path}"}]}
+            self._send(404, body)
+            return
+        self._send(200, body)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def bench_app():
+    """gunicorn app factory: the real app, authenticated as BENCH_USER_ID, with Supabase side effects stubbed."""
+    from flask import session
+
+    import canvas_api
+    import routes.canvas
+    from app import app
+
+    canvas_api.get_api_key = lambda user_id: "bench-token"
+    routes.canvas.apply_canvas_info = lambda *args, **kwargs: None
+
+    @app.before_request
+    def _bench_login():
+        session["user_id"] = BENCH_USER_ID
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(port: int, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def _client(port: int, path: str, stop_at: float, latencies: list, errors: list):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_load(port: int, clients: int, duration: float, path: str = "/api/canvas/courses") -> dict:
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    threads = [threading.Thread(target=_client, args=(port, path, stop_at, latencies, errors)) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / duration,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+    }
+
+
+def bench_workers(workers: int, args, canvas_url: str, mode: str = "async", clients: int = None) -> dict:
+    port = _free_port()
+    clients = clients or args.clients[0]
+    env = {**os.environ, "CANVAS_API_URL": canvas_url, "GUNICORN_ACCESS_LOG": "", "GUNICORN_LOG_LEVEL": "warning",
+           "CANVAS_ASYNC": "1" if mode == "async" else "0"}
+    cmd = [
+        sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers),
+        "--threads", str(args.threads),
+        "--worker-class", args.worker_class,
+        "bench_server:bench_app()",
+    ]
+    # The routes print progress to stdout; keep only stderr (gunicorn errors).
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), env=env, stdout=subprocess.DEVNULL)
+    try:
+        _wait_for(port, proc)
+        run_load(port, min(clients, 4), 2.0)  # warm-up: imports, first connections
+        result = run_load(port, clients, args.duration)
+    finally:
+        proc.send_signal(signal.SIGTERM)  # graceful shutdown path
+        proc.wait(timeout=60)
+    return {"mode": mode, "workers": workers, "clients": clients, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of /api/canvas/courses vs gunicorn worker count and fetch path")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker (gthread)")
+    parser.add_argument("--worker-class", default="gthread")
+    parser.add_argument("--clients", type=int, nargs="+", default=[32], help="Concurrent keep-alive clients")
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["async"],
+                        help="Canvas fetch path: legacy canvasapi crawl (sync) or shared async client (async)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--canvas-latency", type=float, default=0.05, help="Fake Canvas delay per API call (s)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    FakeCanvasHandler.latency = args.canvas_latency
+    canvas = ThreadingHTTPServer(("127.0.0.1", 0), FakeCanvasHandler)
+    canvas.daemon_threads = True
+    threading.Thread(target=canvas.serve_forever, daemon=True).start()
+    canvas_url = f"http://127.0.0.1:{canvas.server_address[1]}"
+
+    results = [bench_workers(w, args, canvas_url, mode, c)
+               for mode in args.modes for w in args.workers for c in args.clients]
+    canvas.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"\n/api/canvas/courses, {args.worker_class} x {args.threads} threads, "
+          f"fake Canvas {args.canvas_latency * 1000:.0f} ms/call")
+    print(f"{'mode':>5} {'workers':>7} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    base = results[0]["rps"] or 1.0
+    for r in results:
+        print(f"{r['mode']:>5} {r['workers']:>7} {r['clients']:>7} {r['rps']:>8.1f} {r['p50_ms']:>8.0f} "
+              f"{r['p95_ms']:>8.0f} {r['errors']:>7}   x{r['rps'] / base:.2f}")
+
+
+if __name__ == "__main__":
+    main()
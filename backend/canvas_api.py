@@ -1,32 +1,83 @@
+import os
+import threading
+
 from canvasapi import Canvas
+from supabase import create_client
+from metrics import instrument_supabase, timed
+
+from ttl_cache import TTLCache
+
+API_URL = os.environ.get("CANVAS_API_URL", "https://canvas.ucsd.edu")
+CANVAS_TOKEN_CACHE_TTL = float(os.environ.get("CANVAS_TOKEN_CACHE_TTL", "300"))
+
+
+class _Secret:
+    """Holds a token without exposing it through repr/str (logs, tracebacks, debug dumps)."""
+
+    __slots__ = ("_value",)
+
+    def __init__(self, value):
+        self._value = value or None
+
+    def reveal(self):
+        return self._value
+
+    def __repr__(self):
+        return "<secret>" if self._value else "<secret: empty>"
 
-API_URL = "https://canvas.ucsd.edu"
+    __str__ = __repr__
+
+    def __reduce__(self):
+        raise TypeError("secrets are not picklable")
+
+
+_client = None
+_client_lock = threading.Lock()
+# user_id -> _Secret (empty when the user has no token, so repeated misses also skip the query)
+_tokens = TTLCache(maxsize=1024, ttl=CANVAS_TOKEN_CACHE_TTL)
+
+
+def _supabase():
+    """One Supabase client shared by every lookup in this process."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = instrument_supabase(create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")))
+    return _client
+
+
+def _load_api_key(user_id) -> _Secret:
+    res = _supabase().table("profiles").select("canvas_token").eq("id", user_id).execute()
+    return _Secret(res.data[0].get("canvas_token") if res.data else None)
 
 
 def get_api_key(user_id):
-    """Fetch the user's Canvas API key from the database."""
-    import os
-    from supabase import create_client
-    supabase_url = os.environ.get("SUPABASE_URL")
-    supabase_key = os.environ.get("SUPABASE_KEY")
-    supabase = create_client(supabase_url, supabase_key)
-    
-    res = supabase.table("profiles").select("canvas_token").eq("id", user_id).execute()
-    if res.data and len(res.data) > 0:
-        return res.data[0].get("canvas_token")
-    return None
+    """Fetch the user's Canvas API key (cached for CANVAS_TOKEN_CACHE_TTL seconds)."""
+    return _tokens.get_or_load(str(user_id), lambda: _load_api_key(user_id)).reveal()
+
+
+def invalidate_api_key(user_id):
+    """Forget the cached key after the user's canvas_token changes."""
+    _tokens.pop(str(user_id))
 
 
 def fetch_canvas_info(user_id):
     api_key = get_api_key(user_id)
+    if not api_key:
+        raise ValueError("Canvas token not set")
     canvas = Canvas(API_URL, api_key)
 
     courses = []
-    for course in canvas.get_courses(enrollment_state="active"):
+    # canvasapi pages lazily; materialize each list so the timing covers the HTTP calls.
+    with timed("canvas", "courses"):
+        active_courses = list(canvas.get_courses(enrollment_state="active"))
+    for course in active_courses:
         if "WI26" not in course.name:
             continue
 
-        enrollments = course.get_enrollments(type=["StudentEnrollment"], user_id="self")
+        with timed("canvas", "enrollments"):
+            enrollments = list(course.get_enrollments(type=["StudentEnrollment"], user_id="self"))
         current_grade = None
         for enrollment in enrollments:
             grades = enrollment.grades
@@ -45,7 +96,9 @@ def fetch_canvas_info(user_id):
             "announcements": [],
         }
 
-        for assignment in course.get_assignments():
+        with timed("canvas", "assignments"):
+            assignments = list(course.get_assignments())
+        for assignment in assignments:
             course_data["assignments"].append({
                 "id": assignment.id,
                 "name": assignment.name,
@@ -54,7 +107,9 @@ def fetch_canvas_info(user_id):
                 "points_possible": assignment.points_possible,
             })
 
-        for announcement in canvas.get_announcements([course.id]):
+        with timed("canvas", "announcements"):
+            announcements = list(canvas.get_announcements([course.id]))
+        for announcement in announcements:
             course_data["announcements"].append({
                 "id": announcement.id,
                 "title": announcement.title,
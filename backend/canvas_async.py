@@ -0,0 +1,108 @@
+"""
+Async Canvas fetch on the shared upstream client (async_http).
+
+Same result as canvas_api.fetch_canvas_info, but via the Canvas REST API directly: the course list
+first, then every course's enrollments, assignments and announcements concurrently (bounded by
+CANVAS_MAX_CONCURRENCY), instead of one request after another through canvasapi.
+"""
+import asyncio
+import os
+import re
+import time
+
+import async_http
+import canvas_api
+import tracing
+from metrics import observe_stage
+
+CANVAS_MAX_CONCURRENCY = int(os.environ.get("CANVAS_MAX_CONCURRENCY", "8"))
+_NEXT_LINK_RE = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+
+async def _get_all(url: str, token: str, params=None, semaphore: asyncio.Semaphore = None) -> list:
+    """GET a Canvas list endpoint, following Link: rel="next" pagination."""
+    items = []
+    headers = {"Authorization": f"Bearer {token}"}
+    endpoint = url.rstrip("/").rsplit("/", 1)[-1]
+    while url:
+        if semaphore:
+            async with semaphore:
+                resp = await _timed_get(url, headers, params, endpoint)
+        else:
+            resp = await _timed_get(url, headers, params, endpoint)
+        resp.raise_for_status()
+        items.extend(resp.json())
+        match = _NEXT_LINK_RE.search(resp.headers.get("Link", ""))
+        url, params = (match.group(1), None) if match else (None, None)
+    return items
+
+
+async def _timed_get(url, headers, params, endpoint):
+    start = time.perf_counter()
+    trace_span = tracing.start_span(f"canvas {endpoint}", tracing.KIND_CLIENT, stage="canvas", target=endpoint)
+    if trace_span is not None:
+        headers = {**headers, "traceparent": trace_span.traceparent}
+    try:
+        resp = await async_http.client().get(url, headers=headers, params=params)
+    except Exception as e:
+        observe_stage("canvas", endpoint, time.perf_counter() - start, error=True)
+        tracing.end_span(trace_span, e)
+        raise
+    observe_stage("canvas", endpoint, time.perf_counter() - start, error=resp.status_code >= 400)
+    tracing.end_span(trace_span, f"HTTP {resp.status_code}" if resp.status_code >= 400 else None)
+    return resp
+
+
+async def _course_data(course: dict, base: str, token: str, semaphore) -> dict:
+    course_id = course["id"]
+    enrollments, assignments, announcements = await asyncio.gather(
+        _get_all(f"{base}/courses/{course_id}/enrollments", token,
+                 {"type[]": "StudentEnrollment", "user_id": "self"}, semaphore),
+        _get_all(f"{base}/courses/{course_id}/assignments", token, {"per_page": 100}, semaphore),
+        _get_all(f"{base}/announcements", token, {"context_codes[]": f"course_{course_id}", "per_page": 100}, semaphore),
+    )
+    current_grade = None
+    for enrollment in enrollments:
+        grades = enrollment.get("grades") or {}
+        current_grade = {
+            "current_score": grades.get("current_score"),
+            "current_grade": grades.get("current_grade"),
+            "final_score": grades.get("final_score"),
+            "final_grade": grades.get("final_grade"),
+        }
+    return {
+        "id": course_id,
+        "name": course.get("name"),
+        "grades": current_grade,
+        "assignments": [
+            {
+                "id": a.get("id"),
+                "name": a.get("name"),
+                "due_at": a.get("due_at"),
+                "description": a.get("description"),
+                "points_possible": a.get("points_possible"),
+            }
+            for a in assignments
+        ],
+        "announcements": [
+            {
+                "id": n.get("id"),
+                "title": n.get("title"),
+                "message": n.get("message"),
+                "posted_at": n.get("posted_at"),
+            }
+            for n in announcements
+        ],
+    }
+
+
+async def fetch_canvas_info_async(user_id) -> dict:
+    """{"courses": [...]} for the user's active WI26 courses, like canvas_api.fetch_canvas_info."""
+    api_key = canvas_api.get_api_key(user_id)
+    if not api_key:
+        raise ValueError("Canvas token not set")
+    base = f"{canvas_api.API_URL.rstrip('/')}/api/v1"
+    semaphore = asyncio.Semaphore(CANVAS_MAX_CONCURRENCY)
+    courses = await _get_all(f"{base}/courses", api_key, {"enrollment_state": "active", "per_page": 100}, semaphore)
+    courses = [c for c in courses if "WI26" in (c.get("name") or "")]
+    return {"courses": list(await asyncio.gather(*(_course_data(c, base, api_key, semaphore) for c in courses)))}
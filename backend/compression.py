@@ -0,0 +1,80 @@
+"""
+Response compression negotiated from Accept-Encoding (brotli when installed, else gzip).
+
+init_compression(app) registers an after_request hook that compresses text-like responses
+(JSON, HTML, plain text) at least COMPRESS_MIN_SIZE bytes long. Streamed responses such as the
+/api/events SSE stream, 304s and anything already encoded are left alone. Levels favour speed: the
+payloads are regenerated per request, so a cheap pass that removes most of the repetition in the
+JSON beats spending CPU on the last few percent.
+"""
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "5"))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "4"))
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "application/javascript",
+}
+
+
+def _encodings() -> list:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encoding) -> str | None:
+    """Best supported coding for the request's Accept-Encoding (q=0 respected), or None."""
+    return accept_encoding.best_match(_encodings())
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response):
+    """after_request hook: compress the body in place when the client accepts it and it is worth it."""
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # The compressed bytes are a different representation: keep conditional requests working
+    # (If-None-Match uses weak comparison) without claiming byte-for-byte equality.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Compress eligible responses of app unless COMPRESS_RESPONSES=0."""
+    if os.environ.get("COMPRESS_RESPONSES", "1").lower() in ("0", "false", "no"):
+        return
+    app.after_request(compress_response)
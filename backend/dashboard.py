@@ -0,0 +1,203 @@
+"""
+Materialized per-user dashboard timeline.
+
+One row per user in public.dashboard_timelines holds the merged, sorted timeline (parsed
+notifications + Canvas assignments and announcements) as JSON, so GET /api/dashboard is a single
+read instead of a notifications query plus two Canvas crawls. Writers keep it current
+incrementally: notification writes and finished syncs merge only the items they changed, and a
+Canvas fetch replaces only the Canvas items. Updates are compare-and-set on the row's version, so
+concurrent writers in different workers do not lose each other's changes.
+"""
+import logging
+import os
+from datetime import datetime, timezone
+
+from supabase import create_client
+from metrics import instrument_supabase
+from logging_config import user_ref
+
+from parse_notifications import CATEGORY_ORDER, canvas_urgency
+
+DASHBOARD_TABLE = "dashboard_timelines"
+DASHBOARD_MAX_ITEMS = int(os.environ.get("DASHBOARD_MAX_ITEMS", "500"))
+URGENCY_ORDER = {"ultra high": 0, "high": 1, "medium": 2, "low": 3}
+_CAS_RETRIES = 3
+
+log = logging.getLogger(__name__)
+
+
+def _supabase():
+    return instrument_supabase(create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")))
+
+
+def _clean(value) -> str:
+    value = "" if value is None else str(value)
+    return "" if value.upper() == "EMPTY" else value
+
+
+def _local_date_time(iso_ts) -> tuple[str, str]:
+    """Canvas timestamps are UTC; show them in the server's local time as (YYYY-MM-DD, HH:MM)."""
+    if not iso_ts:
+        return "", ""
+    try:
+        ts = datetime.fromisoformat(str(iso_ts).replace("Z", "+00:00")).astimezone()
+    except ValueError:
+        return str(iso_ts)[:10], ""
+    return ts.strftime("%Y-%m-%d"), ts.strftime("%H:%M")
+
+
+def item_from_notification(row: dict) -> dict:
+    return {
+        "key": f"n:{row.get('id')}",
+        "kind": "notification",
+        "id": row.get("id"),
+        "title": row.get("summary", ""),
+        "category": (row.get("category") or "").lower(),
+        "source": row.get("source", ""),
+        "course": "",
+        "date": _clean(row.get("event_date")),
+        "time": _clean(row.get("event_time")),
+        "urgency": (row.get("urgency") or "medium").lower(),
+        "link": _clean(row.get("link")),
+        "completed": bool(row.get("completed")),
+    }
+
+
+def items_from_canvas(canvas_info: dict, today: datetime = None) -> list[dict]:
+    """Timeline items for every assignment and announcement in fetch_canvas_info() output."""
+    items = []
+    for course in (canvas_info or {}).get("courses", []):
+        for a in course.get("assignments", []):
+            date, time = _local_date_time(a.get("due_at"))
+            # Same rule as parsed Canvas mail: High, Ultra High within three days.
+            urgency = canvas_urgency(date, today)
+            items.append({
+                "key": f"ca:{a.get('id')}",
+                "kind": "canvas_assignment",
+                "id": a.get("id"),
+                "title": a.get("name", ""),
+                "category": "assignment",
+                "source": "Canvas",
+                "course": course.get("name", ""),
+                "date": date,
+                "time": time,
+                "urgency": urgency.lower(),
+                "link": "",
+                "completed": False,
+                "points_possible": a.get("points_possible"),
+            })
+        for n in course.get("announcements", []):
+            date, time = _local_date_time(n.get("posted_at"))
+            items.append({
+                "key": f"cn:{n.get('id')}",
+                "kind": "canvas_announcement",
+                "id": n.get("id"),
+                "title": n.get("title", ""),
+                "category": "announcement",
+                "source": "Canvas",
+                "course": course.get("name", ""),
+                "date": date,
+                "time": time,
+                "urgency": "medium",
+                "link": "",
+                "completed": False,
+            })
+    return items
+
+
+def sort_timeline(items: list[dict]) -> list[dict]:
+    """Open items first, then urgency (Ultra High > High > Medium > Low), date (undated last), category."""
+    items.sort(key=lambda x: (
+        bool(x.get("completed")),
+        URGENCY_ORDER.get(x.get("urgency", ""), 4),
+        x.get("date") or "9999-99-99",
+        x.get("time") or "99:99",
+        CATEGORY_ORDER.get(x.get("category", ""), 6),
+    ))
+    return items
+
+
+def _merge(items: list[dict], upserts: list[dict] = (), drop_kinds: tuple = ()) -> list[dict]:
+    by_key = {i["key"]: i for i in items if i.get("kind") not in drop_kinds}
+    for item in upserts:
+        by_key[item["key"]] = item
+    return sort_timeline(list(by_key.values()))[:DASHBOARD_MAX_ITEMS]
+
+
+def get_timeline(user_id, supabase=None) -> dict | None:
+    """The stored timeline row ({user_id, items, version, updated_at, canvas_synced_at}) or None."""
+    supabase = supabase or _supabase()
+    res = supabase.table(DASHBOARD_TABLE).select("*").eq("user_id", user_id).limit(1).execute()
+    return res.data[0] if res.data else None
+
+
+def rebuild_timeline(user_id, canvas_info: dict = None, supabase=None) -> dict:
+    """Build the timeline from all of the user's notifications (plus Canvas items if given) and store it."""
+    supabase = supabase or _supabase()
+    rows = supabase.table("notifications").select("*").eq("user_id", user_id).execute().data or []
+    upserts = [item_from_notification(r) for r in rows]
+    drop = ("notification",)
+    if canvas_info is not None:
+        upserts += items_from_canvas(canvas_info)
+        drop += ("canvas_assignment", "canvas_announcement")
+    return _apply(user_id, upserts, drop, canvas_synced=canvas_info is not None, supabase=supabase)
+
+
+def _apply(user_id, upserts, drop_kinds=(), canvas_synced=False, supabase=None) -> dict:
+    supabase = supabase or _supabase()
+    for _ in range(_CAS_RETRIES):
+        current = get_timeline(user_id, supabase)
+        now = datetime.now(timezone.utc).isoformat()
+        if current is None:
+            row = {"user_id": user_id, "items": _merge([], upserts), "version": 1, "updated_at": now}
+            if canvas_synced:
+                row["canvas_synced_at"] = now
+            try:
+                return supabase.table(DASHBOARD_TABLE).insert(row).execute().data[0]
+            except Exception:
+                continue  # another writer created it first; merge into theirs
+        update = {
+            "items": _merge(current.get("items") or [], upserts, drop_kinds),
+            "version": current["version"] + 1,
+            "updated_at": now,
+        }
+        if canvas_synced:
+            update["canvas_synced_at"] = now
+        res = (
+            supabase.table(DASHBOARD_TABLE)
+            .update(update)
+            .eq("user_id", user_id)
+            .eq("version", current["version"])
+            .execute()
+        )
+        if res.data:
+            return res.data[0]
+    raise RuntimeError(f"dashboard timeline for {user_id} kept changing; gave up after {_CAS_RETRIES} tries")
+
+
+def apply_notification_changes(user_id, rows: list[dict], supabase=None):
+    """Merge created/updated notification rows into the user's timeline. Never raises."""
+    if not user_id or not rows:
+        return None
+    try:
+        return _apply(user_id, [item_from_notification(r) for r in rows if r.get("id") is not None], supabase=supabase)
+    except Exception as e:
+        log.warning("notification refresh failed: %s", e, extra={"user": user_ref(user_id)})
+        return None
+
+
+def apply_canvas_info(user_id, canvas_info: dict, supabase=None):
+    """Replace the Canvas items in the user's timeline with a fresh fetch_canvas_info() result. Never raises."""
+    if not user_id or canvas_info is None:
+        return None
+    try:
+        return _apply(
+            user_id,
+            items_from_canvas(canvas_info),
+            drop_kinds=("canvas_assignment", "canvas_announcement"),
+            canvas_synced=True,
+            supabase=supabase,
+        )
+    except Exception as e:
+        log.warning("Canvas refresh failed: %s", e, extra={"user": user_ref(user_id)})
+        return None
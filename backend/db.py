@@ -3,13 +3,14 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 from supabase import create_client
+from metrics import instrument_supabase
 
 load_dotenv(Path(__file__).resolve().parent / ".env")
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase = instrument_supabase(create_client(SUPABASE_URL, SUPABASE_KEY))
 
 
 # ──────────────────────────────────────────────
@@ -10,10 +10,15 @@ from werkzeug.serving import make_server
 from flask import Flask, redirect, request, session, url_for
 from dotenv import load_dotenv
 
+from gmail_mime import extract_body
+from metrics import timed
+
 load_dotenv()
 
 # Scopes required to read Gmail
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+# Headers kept when a message is fetched without its body (format="metadata")
+_METADATA_HEADERS = ["Subject", "From", "Date", "List-Id"]
 
 def get_gmail_service(creds=None):
     """Shows basic usage of the Gmail API."""
@@ -79,15 +84,18 @@ def get_emails_last_month(max_results=50, creds=None):
     last_month = today - datetime.timedelta(days=30)
     query = f"after:{last_month.strftime('%Y/%m/%d')}"
     
-    results = service.users().messages().list(userId="me", q=query, maxResults=max_results).execute()
+    with timed("gmail", "messages.list"):
+        results = service.users().messages().list(userId="me", q=query, maxResults=max_results).execute()
     messages = results.get("messages", [])
     if not messages:
         return []
 
     email_list = []
     for msg in messages:
-        msg_detail = service.users().messages().get(userId="me", id=msg["id"], format="full").execute()
-        headers = msg_detail.get("payload", {}).get("headers", [])
+        with timed("gmail", "messages.get"):
+            msg_detail = service.users().messages().get(userId="me", id=msg["id"], format="full").execute()
+        payload = msg_detail.get("payload", {})
+        headers = payload.get("headers", [])
         snippet = msg_detail.get("snippet", "")
         
         email_data = {
@@ -96,20 +104,27 @@ def get_emails_last_month(max_results=50, creds=None):
             "subject": _get_header(headers, "Subject"),
             "from": _get_header(headers, "From"),
             "date": _get_header(headers, "Date"),
-            "body": snippet
+            "list_id": _get_header(headers, "List-Id"),
+            # Full text from the MIME parts; the ~200-char snippet only as a fallback
+            "body": extract_body(payload) or snippet
         }
         email_list.append(email_data)
     return email_list
 
 def fetch_emails_with_creds(creds, max_results=10):
+    """Fetch recent inbox messages (headers and snippet; get_emails_last_month has the bodies for parsing)."""
     service = build("gmail", "v1", credentials=creds)
-    results = service.users().messages().list(userId="me", labelIds=["INBOX"], maxResults=max_results).execute()
+    with timed("gmail", "messages.list"):
+        results = service.users().messages().list(userId="me", labelIds=["INBOX"], maxResults=max_results).execute()
     messages = results.get("messages", [])
     if not messages:
         return []
     email_list = []
     for msg in messages:
-        msg_detail = service.users().messages().get(userId="me", id=msg["id"], format="full").execute()
+        with timed("gmail", "messages.get"):
+            msg_detail = service.users().messages().get(
+                userId="me", id=msg["id"], format="metadata", metadataHeaders=_METADATA_HEADERS
+            ).execute()
         headers = msg_detail.get("payload", {}).get("headers", [])
         email_data = {
             "id": msg_detail["id"],
@@ -117,6 +132,7 @@ def fetch_emails_with_creds(creds, max_results=10):
             "subject": _get_header(headers, "Subject"),
             "from": _get_header(headers, "From"),
             "date": _get_header(headers, "Date"),
+            "list_id": _get_header(headers, "List-Id"),
         }
         email_list.append(email_data)
     return email_list
@@ -0,0 +1,144 @@
+"""
+Input compaction for the LLM parse.
+
+Shrinks each email body before it is sent to Gemini: HTML boilerplate is reduced to text,
+quoted replies, signatures and unsubscribe footers are cut (forwarded messages are kept),
+tracking parameters and redirect URLs are removed, and the result is capped at a per-email
+token budget (LLM_MAX_BODY_TOKENS).
+"""
+import html
+import os
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from llm_client import estimate_tokens
+
+DEFAULT_MAX_BODY_TOKENS = int(os.environ.get("LLM_MAX_BODY_TOKENS", "400"))
+
+_HTML_HINT_RE = re.compile(r"<(?:html|body|div|p|br|table|span|a)\b", re.IGNORECASE)
+_DROP_BLOCK_RE = re.compile(r"<(script|style|head|title)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_BLOCK_TAG_RE = re.compile(r"<\s*(?:br|/p|/div|/tr|/li|/h[1-6]|/table)\b[^>]*>", re.IGNORECASE)
+_LINK_TAG_RE = re.compile(r"<a\b[^>]*href=[\"']([^\"']+)[\"'][^>]*>(.*?)</a\s*>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# Everything from the first match on is a quoted reply or forwarded history.
+_REPLY_CUT_RES = [
+    re.compile(r"^On .{0,200}wrote:\s*$", re.MULTILINE),
+    re.compile(r"^-{2,}\s*Original Message\s*-{2,}", re.MULTILINE | re.IGNORECASE),
+    re.compile(r"^_{10,}\s*$", re.MULTILINE),
+    re.compile(r"^From: .+\n(?:Sent|Date): .+", re.MULTILINE),
+]
+# A forwarded message's header block looks like an Outlook reply header, but the message after it
+# is the content being shared: keep it, and only cut the quoted history inside it.
+_FORWARD_MARKER_RE = re.compile(
+    r"^(?:-{2,}\s*Forwarded message\s*-{2,}|Begin forwarded message:)\s*$", re.MULTILINE | re.IGNORECASE
+)
+_HEADER_BLOCK_RE = re.compile(r"(?:[ \t]*\n)*(?:[A-Za-z-]+:[ \t].*\n)+")
+# Everything from the first match on is a signature.
+_SIGNATURE_CUT_RES = [
+    re.compile(r"^-- ?$", re.MULTILINE),
+    re.compile(r"^Sent from my \w+", re.MULTILINE | re.IGNORECASE),
+    re.compile(r"^Get Outlook for ", re.MULTILINE | re.IGNORECASE),
+]
+_FOOTER_LINE_RE = re.compile(
+    r"unsubscribe|view (?:this email )?in (?:your )?browser|manage (?:your )?(?:email )?preferences|"
+    r"privacy policy|you are receiving this|no longer wish to receive",
+    re.IGNORECASE,
+)
+
+_URL_RE = re.compile(r"https?://[^\s<>\"')\]]+")
+_TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "_hsenc", "_hsmi", "mkt_tok", "trk", "ref_src"}
+_TRACKING_HOSTS_RE = re.compile(
+    r"(?:^|\.)(?:urldefense\.com|safelinks\.protection\.outlook\.com|list-manage\.com|sendgrid\.net|"
+    r"mandrillapp\.com|mailchi\.mp|click\.[\w.-]+)$",
+    re.IGNORECASE,
+)
+MAX_URL_LENGTH = 200
+
+
+def html_to_text(raw: str) -> str:
+    """Fast, dependency-free HTML -> text: drops script/style/head, keeps link targets and line breaks."""
+    text = _DROP_BLOCK_RE.sub(" ", raw)
+    text = _COMMENT_RE.sub(" ", text)
+    text = _LINK_TAG_RE.sub(lambda m: f"{_TAG_RE.sub('', m.group(2)).strip()} {m.group(1)}", text)
+    text = _BLOCK_TAG_RE.sub("\n", text)
+    text = _TAG_RE.sub(" ", text)
+    return html.unescape(text)
+
+
+def _clean_url(match: re.Match) -> str:
+    url = match.group(0)
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return ""
+    if _TRACKING_HOSTS_RE.search(parts.hostname or "") or len(url) > MAX_URL_LENGTH:
+        return ""
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+def _cut_at_first(text: str, patterns) -> str:
+    cut = len(text)
+    for pattern in patterns:
+        m = pattern.search(text)
+        if m and m.start() > 0:
+            cut = min(cut, m.start())
+    return text[:cut]
+
+
+def _cut_quoted_history(text: str) -> str:
+    forward = _FORWARD_MARKER_RE.search(text)
+    if forward is None:
+        return _cut_at_first(text, _REPLY_CUT_RES)
+    note = _cut_at_first(text[: forward.start()], _REPLY_CUT_RES)
+    if len(note) < forward.start():
+        return note
+    headers = _HEADER_BLOCK_RE.match(text, forward.end() + 1)
+    keep = headers.end() if headers else forward.end()
+    return text[:keep] + _cut_at_first(text[keep:], _REPLY_CUT_RES)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens * 4
+    cut = text.rfind(" ", 0, limit)
+    return text[: cut if cut > limit // 2 else limit].rstrip() + " …[truncated]"
+
+
+def compact_body(body: str, max_tokens: int = DEFAULT_MAX_BODY_TOKENS) -> str:
+    """Return a compacted email body for the LLM (see module docstring)."""
+    text = body or ""
+    if _HTML_HINT_RE.search(text):
+        text = html_to_text(text)
+    text = text.replace("\r\n", "\n")
+    text = _cut_quoted_history(text)
+    text = _cut_at_first(text, _SIGNATURE_CUT_RES)
+    text = _URL_RE.sub(_clean_url, text)
+
+    lines = []
+    for line in text.split("\n"):
+        line = " ".join(line.split())
+        if not line or line.startswith(">") or _FOOTER_LINE_RE.search(line):
+            continue
+        lines.append(line)
+    return truncate_to_tokens("\n".join(lines), max_tokens)
+
+
+def compact_emails(emails: list[dict], max_body_tokens: int = DEFAULT_MAX_BODY_TOKENS) -> tuple[list[dict], dict]:
+    """
+    Compact every email body. Returns (compacted copies, stats) where stats has body token
+    estimates before and after.
+    """
+    out = []
+    before = after = 0
+    for email in emails:
+        body = email.get("body", "") or ""
+        compacted = compact_body(body, max_body_tokens)
+        before += estimate_tokens(body)
+        after += estimate_tokens(compacted)
+        out.append({**email, "body": compacted})
+    return out, {"body_tokens_before": before, "body_tokens_after": after}
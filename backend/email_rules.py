@@ -0,0 +1,185 @@
+"""
+Rule-based pre-classifier for Gmail messages.
+
+Runs before the LLM so obvious mail never costs tokens:
+- "ignore" rules drop known-noise senders (Canvas digests, TritonToGo, Drive shares, ...).
+- "extract" rules turn well-formatted Canvas / Gradescope notifications straight into rows.
+- Everything else is left for call_llm.
+
+Rules live in email_rules.json (override with EMAIL_RULES_PATH). Each rule matches on
+optional "from", "subject", "list_id" and "body" regexes (all must match); named groups from
+the matches fill the "row" templates of extract rules. Patterns are case-insensitive except for
+the fields listed in "case_sensitive". An "unless" object of the same fields vetoes the rule when
+any of its patterns matches, so mail that needs the LLM (e.g. an announcement carrying a date)
+is not turned into a row.
+"""
+import json
+import os
+import re
+from datetime import datetime
+
+from parse_notifications import COLUMNS, normalize_notification_row
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "email_rules.json")
+
+_MATCH_FIELDS = ("from", "subject", "list_id", "body")
+
+_rules_cache = {}
+
+
+def _compile_patterns(patterns: dict, case_sensitive) -> dict:
+    return {
+        field: re.compile(patterns[field], 0 if field in case_sensitive else re.IGNORECASE)
+        for field in _MATCH_FIELDS
+        if patterns.get(field)
+    }
+
+
+def _compile_rule(rule: dict) -> dict:
+    compiled = dict(rule)
+    case_sensitive = set(rule.get("case_sensitive", []))
+    compiled["_patterns"] = _compile_patterns(rule, case_sensitive)
+    compiled["_unless"] = _compile_patterns(rule.get("unless", {}), case_sensitive)
+    return compiled
+
+
+def load_rules(path: str = None) -> dict:
+    """Load and compile the rule file. Cached per path + mtime so edits are picked up without a restart."""
+    path = path or os.environ.get("EMAIL_RULES_PATH") or DEFAULT_RULES_PATH
+    mtime = os.path.getmtime(path)
+    cached = _rules_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    rules = {
+        "ignore": [_compile_rule(r) for r in raw.get("ignore", [])],
+        "extract": [_compile_rule(r) for r in raw.get("extract", [])],
+    }
+    _rules_cache[path] = (mtime, rules)
+    return rules
+
+
+def _email_fields(email: dict) -> dict:
+    return {
+        "from": email.get("from", "") or "",
+        "subject": email.get("subject", "") or "",
+        "list_id": email.get("list_id", "") or "",
+        "body": email.get("body", "") or email.get("snippet", "") or "",
+    }
+
+
+def _match_rule(rule: dict, fields: dict) -> dict | None:
+    """Return the named groups captured by the rule, or None if any pattern fails or an "unless" pattern hits."""
+    groups = {}
+    for field, pattern in rule["_patterns"].items():
+        m = pattern.search(fields[field])
+        if not m:
+            return None
+        groups.update({k: v.strip() for k, v in m.groupdict().items() if v})
+    if any(pattern.search(fields[field]) for field, pattern in rule["_unless"].items()):
+        return None
+    return groups
+
+
+_DUE_RE = re.compile(
+    r"(?P<month>[A-Za-z]{3,9})\.? (?P<day>\d{1,2})(?:,? (?P<year>\d{4}))?"
+    r"(?: (?:at|by) (?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>[ap])\.?m\.?)?",
+    re.IGNORECASE,
+)
+
+
+def _parse_due(text: str, today: datetime) -> tuple[str, str]:
+    """
+    Parse Canvas/Gradescope style due strings ("Feb 3 at 11:59pm", "March 10, 2026 by 5pm")
+    into (event_date, event_time). Missing years roll forward to the next occurrence.
+    """
+    m = _DUE_RE.search(text or "")
+    if not m:
+        return "", ""
+    month_name = m.group("month")[:3].title()
+    try:
+        month = datetime.strptime(month_name, "%b").month
+        year = int(m.group("year")) if m.group("year") else today.year
+        due = datetime(year, month, int(m.group("day")))
+    except ValueError:
+        return "", ""
+    if not m.group("year") and (today - due).days > 180:
+        due = due.replace(year=year + 1)
+
+    event_time = ""
+    if m.group("hour"):
+        hour = int(m.group("hour"))
+        minute = int(m.group("minute") or 0)
+        if 1 <= hour <= 12 and minute < 60:
+            event_time = f"{hour:02d}:{minute:02d} {m.group('ampm').upper()}M"
+    return due.strftime("%Y-%m-%d"), event_time
+
+
+def _build_row(rule: dict, groups: dict, email: dict, today: datetime) -> dict | None:
+    if any(not groups.get(name) for name in rule.get("require", [])):
+        return None
+    try:
+        row = {k: str(v).format(**groups) for k, v in rule.get("row", {}).items()}
+    except (KeyError, IndexError):
+        return None
+
+    if groups.get("due") and not row.get("event_date"):
+        row["event_date"], row["event_time"] = _parse_due(groups["due"], today)
+        if not row["event_date"]:
+            return None
+    if not row.get("link"):
+        m = re.search(r"https?://\S+", _email_fields(email)["body"])
+        row["link"] = m.group(0).rstrip(").,>") if m else ""
+
+    for col in COLUMNS:
+        row.setdefault(col, "")
+    return normalize_notification_row(row, today)
+
+
+def classify_email(email: dict, rules: dict = None, today: datetime = None) -> tuple[str, str, dict | None]:
+    """
+    Classify one email.
+    Returns (action, rule_name, row) where action is "ignore", "extract" or "llm".
+    """
+    rules = rules or load_rules()
+    today = today or datetime.now()
+    fields = _email_fields(email)
+
+    for rule in rules["ignore"]:
+        if _match_rule(rule, fields) is not None:
+            return "ignore", rule.get("name", ""), None
+
+    for rule in rules["extract"]:
+        groups = _match_rule(rule, fields)
+        if groups is None:
+            continue
+        row = _build_row(rule, groups, email, today)
+        if row is not None:
+            return "extract", rule.get("name", ""), row
+
+    return "llm", "", None
+
+
+def prefilter_emails(emails: list[dict], rules: dict = None) -> tuple[list[dict], list[dict], dict]:
+    """
+    Split a batch of emails before the LLM call.
+    Returns (emails_for_llm, extracted_rows, stats) where stats counts each action and rule.
+    """
+    rules = rules or load_rules()
+    today = datetime.now()
+    for_llm, rows = [], []
+    stats = {"ignore": 0, "extract": 0, "llm": 0, "rules": {}}
+
+    for email in emails:
+        action, rule_name, row = classify_email(email, rules, today)
+        stats[action] += 1
+        if rule_name:
+            stats["rules"][rule_name] = stats["rules"].get(rule_name, 0) + 1
+        if action == "llm":
+            for_llm.append(email)
+        elif action == "extract":
+            rows.append(row)
+
+    return for_llm, rows, stats
@@ -0,0 +1,203 @@
+"""
+Cross-process fan-out for event_hub through the public.user_events table
+(triton-hub/supabase/user_events.sql). Enabled with EVENT_BROKER=supabase.
+
+publish() in any process (gunicorn workers, run_gmail / parse_notifications runs, the reminder
+scheduler, the urgency engine) appends a row instead of delivering in-process. An Outbox thread
+batches those inserts so the caller never waits on them; whatever is still queued is flushed at exit.
+
+Every web worker runs one EventRelay thread that polls the table and publishes new rows on its own
+hub under the row id. All workers therefore see the same events with the same ids, and a client can
+resume with Last-Event-ID on whichever worker it reconnects to. The relay costs one query per worker
+per EVENT_RELAY_POLL_SECONDS, however many clients are connected.
+
+Rows are read by created_at with a short lookback (EVENT_RELAY_LOOKBACK_SECONDS, which also absorbs
+clock skew between the database and this host) rather than strictly by id, because a row with a
+lower id can commit after one with a higher id; ids already delivered are skipped. Rows older than
+EVENT_RETENTION_SECONDS are deleted by the relays.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from supabase import create_client
+from metrics import instrument_supabase
+
+EVENT_BROKER = os.environ.get("EVENT_BROKER", "local").lower()
+EVENT_RELAY_POLL_SECONDS = float(os.environ.get("EVENT_RELAY_POLL_SECONDS", "1"))
+EVENT_RELAY_LOOKBACK_SECONDS = float(os.environ.get("EVENT_RELAY_LOOKBACK_SECONDS", "10"))
+EVENT_RETENTION_SECONDS = float(os.environ.get("EVENT_RETENTION_SECONDS", "3600"))
+EVENT_OUTBOX_FLUSH_SECONDS = 0.2
+
+_TABLE = "user_events"
+_PAGE_SIZE = 500
+_CLEANUP_EVERY_SECONDS = 300
+
+log = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return EVENT_BROKER == "supabase"
+
+
+def _supabase():
+    """One Supabase client shared by the outbox and the relay of this process."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = instrument_supabase(create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")))
+    return _client
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class Outbox:
+    """Queues events and inserts them into user_events in batches from a background thread."""
+
+    def __init__(self, supabase_factory=_supabase, flush_seconds: float = EVENT_OUTBOX_FLUSH_SECONDS):
+        self._supabase = supabase_factory
+        self.flush_seconds = flush_seconds
+        self._rows: list[dict] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def put(self, user_id, event_type: str, data: dict = None):
+        # Round-trip through JSON now: rows may carry dates, and the caller may keep mutating data.
+        row = {"user_id": str(user_id), "type": event_type, "data": json.loads(json.dumps(data or {}, default=str))}
+        with self._lock:
+            self._rows.append(row)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-outbox", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def flush(self) -> int:
+        """Insert everything queued so far; returns how many rows were written."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        written = 0
+        for i in range(0, len(rows), _PAGE_SIZE):
+            batch = rows[i:i + _PAGE_SIZE]
+            try:
+                self._supabase().table(_TABLE).insert(batch).execute()
+                written += len(batch)
+            except Exception as e:  # live updates must not break the write that caused them
+                log.warning("dropped %d event(s): %s", len(batch), e)
+        return written
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.flush_seconds)  # let a burst (e.g. a bulk update) share one insert
+            self._wake.clear()
+            self.flush()
+
+    def _reset_after_fork(self):
+        self._rows = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+
+class EventRelay:
+    """Publishes new user_events rows on an in-process hub."""
+
+    def __init__(
+        self,
+        hub,
+        supabase_factory=_supabase,
+        poll_seconds: float = EVENT_RELAY_POLL_SECONDS,
+        lookback_seconds: float = EVENT_RELAY_LOOKBACK_SECONDS,
+        retention_seconds: float = EVENT_RETENTION_SECONDS,
+        clock=time.time,
+    ):
+        self._hub = hub
+        self._supabase = supabase_factory
+        self.poll_seconds = poll_seconds
+        self.lookback_seconds = lookback_seconds
+        self.retention_seconds = retention_seconds
+        self._clock = clock
+        # Events from before this process started are not replayed.
+        self._since = clock()
+        self._seen: dict[int, float] = {}
+        self._next_cleanup = self._since + _CLEANUP_EVERY_SECONDS
+
+    def poll_once(self) -> int:
+        """Publish rows not delivered yet; returns how many."""
+        now = self._clock()
+        since = _iso(self._since - self.lookback_seconds)
+        delivered = 0
+        offset = 0
+        while True:
+            rows = (
+                self._supabase().table(_TABLE).select("id,user_id,type,data").gte("created_at", since)
+                .order("id").range(offset, offset + _PAGE_SIZE - 1).execute().data or []
+            )
+            for row in rows:
+                if row["id"] in self._seen:
+                    continue
+                self._seen[row["id"]] = now
+                self._hub.publish(row["user_id"], row["type"], row.get("data"), event_id=row["id"])
+                delivered += 1
+            if len(rows) < _PAGE_SIZE:
+                break
+            offset += _PAGE_SIZE
+        self._since = now
+        horizon = now - 3 * self.lookback_seconds
+        for event_id in [i for i, seen_at in self._seen.items() if seen_at < horizon]:
+            del self._seen[event_id]
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + _CLEANUP_EVERY_SECONDS
+            self._supabase().table(_TABLE).delete().lt("created_at", _iso(now - self.retention_seconds)).execute()
+        return delivered
+
+    def run(self, stop: threading.Event):
+        while not stop.wait(self.poll_seconds):
+            try:
+                self.poll_once()
+            except Exception as e:
+                log.warning("event relay poll failed: %s", e)
+
+
+_outbox = Outbox()
+_relay_stop: threading.Event | None = None
+
+
+def publish(user_id, event_type: str, data: dict = None):
+    """Queue an event for every process's subscribers."""
+    _outbox.put(user_id, event_type, data)
+
+
+def start_relay(hub) -> threading.Event:
+    """Start this process's relay thread (once); set the returned event to stop it."""
+    global _relay_stop
+    if _relay_stop is None:
+        _relay_stop = threading.Event()
+        relay = EventRelay(hub)
+        threading.Thread(target=relay.run, args=(_relay_stop,), name="event-relay", daemon=True).start()
+    return _relay_stop
+
+
+def _reset_after_fork():
+    # Threads do not survive fork(); each gunicorn worker starts its own relay and outbox thread.
+    global _client, _relay_stop
+    _client = None
+    _relay_stop = None
+    _outbox._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+atexit.register(_outbox.flush)
@@ -0,0 +1,178 @@
+"""
+In-process publish/subscribe hub for live per-user events (new / updated notifications, sync progress).
+
+Publishing appends to a short per-user replay buffer and to each open subscription's bounded queue;
+there is no background thread and nothing per client beyond a deque and a threading.Event, so a
+subscription costs the same whether it is served by a thread or a greenlet. Each event gets a
+per-process increasing id, which clients send back as Last-Event-ID (SSE) or ?after= (long-poll)
+to resume without gaps. A subscriber that falls further behind than EVENT_HUB_QUEUE_SIZE is sent a
+single "resync" event instead of the backlog and should refetch /api/profile/notifications.
+
+On its own the hub only sees events published in this process. With EVENT_BROKER=supabase,
+publish() instead goes through event_broker: every process (gunicorn workers, CLI sync runs, the
+reminder scheduler) writes to one table, and each web worker's relay publishes the rows on its hub
+under the table's ids.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import event_broker
+
+EVENT_HUB_QUEUE_SIZE = int(os.environ.get("EVENT_HUB_QUEUE_SIZE", "256"))
+EVENT_HUB_REPLAY_SIZE = int(os.environ.get("EVENT_HUB_REPLAY_SIZE", "100"))
+
+
+@dataclass
+class Event:
+    id: int
+    type: str
+    data: dict
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "type": self.type, "data": self.data, "created_at": self.created_at}
+
+
+class Subscription:
+    """One client's view of a user's event stream. Not shared between threads other than via the hub."""
+
+    def __init__(self, hub: "EventHub", user_id: str, max_queue: int):
+        self._hub = hub
+        self.user_id = user_id
+        self._queue: deque[Event] = deque()
+        self._max_queue = max_queue
+        self._ready = threading.Event()
+        self.overflowed = False
+        self.closed = False
+
+    def _push(self, event: Event):
+        # Called with the hub lock held.
+        if len(self._queue) >= self._max_queue:
+            self._queue.clear()
+            self.overflowed = True
+        else:
+            self._queue.append(event)
+        self._ready.set()
+
+    def get(self, timeout: float = None) -> list[Event]:
+        """Wait up to timeout seconds for events; returns [] on timeout. A "resync" event replaces an overflow."""
+        if not self._ready.wait(timeout):
+            return []
+        with self._hub._lock:
+            events = list(self._queue)
+            self._queue.clear()
+            self._ready.clear()
+            if self.overflowed:
+                self.overflowed = False
+                events = [Event(id=self._hub.last_event_id(self.user_id, locked=True), type="resync", data={})]
+        return events
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._hub._unsubscribe(self)
+            self._ready.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventHub:
+    """Fan-out of per-user events to every open Subscription of that user."""
+
+    def __init__(self, max_queue: int = EVENT_HUB_QUEUE_SIZE, replay_size: int = EVENT_HUB_REPLAY_SIZE):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._recent: dict[str, deque[Event]] = {}
+        self.max_queue = max_queue
+        self.replay_size = replay_size
+
+    def publish(self, user_id: str, event_type: str, data: dict = None, event_id: int = None) -> Event:
+        """Deliver an event to the user's subscribers and keep it for replay. event_id comes from the broker."""
+        with self._lock:
+            event = Event(id=next(self._ids) if event_id is None else event_id, type=event_type, data=data or {})
+            self._recent.setdefault(str(user_id), deque(maxlen=self.replay_size)).append(event)
+            for sub in self._subscribers.get(str(user_id), ()):
+                sub._push(event)
+        return event
+
+    def subscribe(self, user_id: str, after: int = None) -> Subscription:
+        """
+        Open a subscription. With after (a previously seen event id), events newer than it that are
+        still in the replay buffer are queued first; if the buffer no longer reaches back that far the
+        subscription starts with a "resync" event.
+        """
+        user_id = str(user_id)
+        sub = Subscription(self, user_id, self.max_queue)
+        with self._lock:
+            if after is not None:
+                recent = self._recent.get(user_id) or ()
+                # Ids are global, so a gap before the oldest kept event only matters once the buffer is full.
+                if recent and len(recent) == recent.maxlen and recent[0].id > after + 1:
+                    sub.overflowed = True
+                    sub._ready.set()
+                else:
+                    for event in recent:
+                        if event.id > after:
+                            sub._push(event)
+            self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def _unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def last_event_id(self, user_id: str, locked: bool = False) -> int:
+        def _last():
+            recent = self._recent.get(str(user_id))
+            return recent[-1].id if recent else 0
+
+        if locked:
+            return _last()
+        with self._lock:
+            return _last()
+
+    def subscriber_count(self, user_id: str = None) -> int:
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(str(user_id), ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+
+_hub = EventHub()
+log = logging.getLogger(__name__)
+
+
+def get_hub() -> EventHub:
+    return _hub
+
+
+def publish(user_id, event_type: str, data: dict = None):
+    """
+    Publish on the process-wide hub, or through the broker when it is enabled (the event then reaches
+    subscribers once a relay picks it up; returns None). Never raises: live updates must not break
+    the write that caused them.
+    """
+    if not user_id:
+        return None
+    try:
+        if event_broker.enabled():
+            event_broker.publish(user_id, event_type, data)
+            return None
+        return _hub.publish(user_id, event_type, data)
+    except Exception as e:
+        log.warning("publish %s failed: %s", event_type, e)
+        return None
@@ -0,0 +1,89 @@
+"""
+Body extraction for Gmail API messages (format="full").
+
+Walks the MIME part tree without copying it, decodes base64url bodies, prefers text/plain,
+falls back to text/html converted to text, skips attachments, and stops decoding once the
+per-message byte cap (GMAIL_MAX_BODY_BYTES) is reached.
+"""
+import base64
+import binascii
+import os
+import re
+
+from email_compact import html_to_text
+
+DEFAULT_MAX_BODY_BYTES = int(os.environ.get("GMAIL_MAX_BODY_BYTES", str(32 * 1024)))
+
+_CHARSET_RE = re.compile(r"charset=\"?([\w.-]+)", re.IGNORECASE)
+
+
+def _header(part: dict, name: str) -> str:
+    for h in part.get("headers") or ():
+        if h.get("name", "").lower() == name:
+            return h.get("value", "")
+    return ""
+
+
+def _is_attachment(part: dict) -> bool:
+    body = part.get("body") or {}
+    if part.get("filename") or body.get("attachmentId"):
+        return True
+    return _header(part, "content-disposition").lower().startswith("attachment")
+
+
+def _iter_leaf_parts(payload: dict):
+    """Depth-first leaf parts in document order (iterative, so deep nesting cannot recurse out)."""
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        children = part.get("parts")
+        if children:
+            stack.extend(reversed(children))
+        else:
+            yield part
+
+
+def _decode_part(part: dict, max_bytes: int) -> str:
+    """Decode at most max_bytes of a part's base64url body."""
+    data = (part.get("body") or {}).get("data")
+    if not data or max_bytes <= 0:
+        return ""
+    # 4 base64 chars -> 3 bytes: only slice (and decode) what the cap allows.
+    chars = -(-max_bytes // 3) * 4
+    chunk = data[:chars]
+    try:
+        raw = base64.urlsafe_b64decode(chunk + "=" * (-len(chunk) % 4))[:max_bytes]
+    except (binascii.Error, ValueError):
+        return ""
+    m = _CHARSET_RE.search(_header(part, "content-type"))
+    charset = m.group(1) if m else "utf-8"
+    try:
+        return raw.decode(charset, errors="replace")
+    except LookupError:
+        return raw.decode("utf-8", errors="replace")
+
+
+def extract_body(payload: dict, max_bytes: int = DEFAULT_MAX_BODY_BYTES) -> str:
+    """
+    Plain-text body of a Gmail message payload, or "" if it has no text parts.
+    All text/plain parts are used when present; otherwise text/html parts are converted.
+    """
+    if not payload:
+        return ""
+
+    for wanted in ("text/plain", "text/html"):
+        texts = []
+        budget = max_bytes
+        for part in _iter_leaf_parts(payload):
+            if budget <= 0:
+                break
+            if (part.get("mimeType") or "").lower() != wanted or _is_attachment(part):
+                continue
+            text = _decode_part(part, budget)
+            if text:
+                budget -= len(text.encode("utf-8", errors="ignore"))
+                texts.append(text)
+        if texts:
+            body = "\n".join(texts)
+            return (html_to_text(body) if wanted == "text/html" else body).strip()
+    return ""
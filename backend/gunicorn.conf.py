@@ -0,0 +1,55 @@
+"""
+Gunicorn settings for production:  gunicorn -c gunicorn.conf.py wsgi:app
+
+The routes spend most of their time waiting on Gmail, Canvas, Gemini and Supabase, so each worker
+runs a thread pool (gthread) by default. Every setting can be overridden with the environment
+variables below or on the command line.
+
+/api/events streams stay open for minutes, which would pin one gthread thread per connected client.
+Run a second instance on greenlets for them and route /api/events* to it from the proxy:
+
+    GUNICORN_WORKER_CLASS=gevent GUNICORN_BIND=127.0.0.1:8081 gunicorn -c gunicorn.conf.py wsgi:app
+
+    location /api/events { proxy_pass http://127.0.0.1:8081; proxy_buffering off; }
+
+Set EVENT_BROKER=supabase for both instances (and the CLI jobs) so events published by any process
+reach streams served by any worker.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8080')}")
+
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+# Threads per worker (gthread) / max concurrent greenlets per worker (gevent).
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# A Canvas crawl or Gmail + Gemini parse can take tens of seconds; kill a worker only when it is truly stuck.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+# On SIGTERM, stop accepting and give in-flight requests this long to finish.
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+
+# Recycle workers now and then so slow leaks in client libraries cannot accumulate.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Not preloaded: each worker builds its own clients, caches and (optionally) reminder thread after fork.
+preload_app = False
+
+# Empty GUNICORN_ACCESS_LOG disables the access log.
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+# Behind a TLS-terminating proxy, trust its X-Forwarded-* headers.
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def worker_int(worker):
+    worker.log.info("worker %s interrupted; finishing in-flight requests", worker.pid)
+
+
+def worker_exit(server, worker):
+    server.log.info("worker %s exited", worker.pid)
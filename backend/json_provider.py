@@ -0,0 +1,67 @@
+"""
+Faster JSON for Flask responses: app.json backed by orjson when it is installed.
+
+install_json_provider(app) swaps Flask's DefaultJSONProvider for OrjsonProvider, so every jsonify() /
+make_response(dict) in the routes gets it without changes. orjson serializes the large Canvas and
+notification lists several times faster and writes UTF-8 bytes directly. Without orjson (or with
+JSON_PROVIDER=std) the app keeps Flask's stdlib provider.
+
+Output stays compatible with the default provider: sorted keys, compact separators, trailing
+newline, and dates / UUIDs / dataclasses converted by the same Flask default() hook. Anything
+orjson refuses (e.g. integers over 64 bits) falls back to the stdlib encoder for that call.
+"""
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding and decoding."""
+
+    def _options(self, sort_keys: bool) -> int:
+        # Datetimes go through Flask's default() (HTTP date format), as with the stdlib provider.
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def _dump_bytes(self, obj, sort_keys: bool) -> bytes:
+        return orjson.dumps(obj, default=self.default, option=self._options(sort_keys))
+
+    def dumps(self, obj, **kwargs) -> str:
+        # indent / separators / cls etc. are stdlib-only; honour them by taking the stdlib path.
+        if set(kwargs) - {"sort_keys", "default"}:
+            return super().dumps(obj, **kwargs)
+        try:
+            return self._dump_bytes(obj, kwargs.get("sort_keys", self.sort_keys)).decode("utf-8")
+        except (orjson.JSONEncodeError, TypeError):
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)  # pretty-printed for debugging
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            data = self._dump_bytes(obj, self.sort_keys) + b"\n"
+        except (orjson.JSONEncodeError, TypeError):
+            return super().response(*args, **kwargs)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+
+def install_json_provider(app) -> str:
+    """Use orjson for app.json when available; returns the provider name in use ("orjson" or "std")."""
+    if orjson is None or os.environ.get("JSON_PROVIDER", "orjson").lower() == "std":
+        return "std"
+    app.json_provider_class = OrjsonProvider
+    app.json = OrjsonProvider(app)
+    return "orjson"
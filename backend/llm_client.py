@@ -0,0 +1,342 @@
+"""
+Async Gemini client with model fallback hedging.
+
+Models are tried in priority order, but not strictly one after another:
+- if the current model fails, the next one is started immediately;
+- if it is merely slow (no answer within LLM_HEDGE_DELAY seconds), the next one is started
+  alongside it and whichever finishes first wins (the rest are cancelled).
+Models that answered 429 / RESOURCE_EXHAUSTED are put on a cooldown and skipped until it expires.
+
+Priority order comes from a ModelRouter (model_router.py), which ranks models by live latency and
+error statistics; the hedge delay also shrinks to the primary's recent p90 latency when known.
+The static system prompt is served from a per-model context cache when possible (prompt_cache.py).
+
+google.genai's aio transport binds to the event loop it is first used on, so synchronous callers
+drive every request through the shared upstream loop (async_http.run / iter_sync) rather than a
+fresh asyncio.run() loop per call.
+"""
+import asyncio
+import atexit
+import hashlib
+import logging
+import os
+import re
+import time
+
+import async_http
+from model_router import ModelRouter, load_router_states, save_router_states
+from prompt_cache import CONTEXT_CACHE_ENABLED, PromptCache
+import tracing
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MODELS = ["gemini-flash-latest", "gemini-2.0-flash", "gemini-1.5-flash", "gemini-pro-latest"]
+
+# Seconds to wait on a model before hedging with the next one.
+DEFAULT_HEDGE_DELAY = float(os.environ.get("LLM_HEDGE_DELAY", "8"))
+# Floor for the adaptive hedge delay (seconds).
+MIN_HEDGE_DELAY = float(os.environ.get("LLM_MIN_HEDGE_DELAY", "1"))
+# Seconds to skip a model after it reports quota exhaustion (unless the error says otherwise).
+DEFAULT_RATE_LIMIT_COOLDOWN = float(os.environ.get("LLM_RATE_LIMIT_COOLDOWN", "60"))
+# Upper bound on concurrent requests for one prompt.
+DEFAULT_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", "2"))
+
+_RETRY_DELAY_RE = re.compile(r"retry(?:_| )?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", re.IGNORECASE)
+
+
+class AllModelsFailed(Exception):
+    """Raised when every candidate model errored (or is cooling down)."""
+
+
+def is_rate_limit_error(err: Exception) -> bool:
+    err_str = str(err).lower()
+    return "429" in err_str or "resource_exhausted" in err_str
+
+
+def _retry_delay_from_error(err: Exception, default: float) -> float:
+    m = _RETRY_DELAY_RE.search(str(err))
+    return float(m.group(1)) if m else default
+
+
+class AsyncGeminiClient:
+    """Hedged wrapper around google.genai's async client (client.aio)."""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        models: list[str] = None,
+        hedge_delay: float = DEFAULT_HEDGE_DELAY,
+        rate_limit_cooldown: float = DEFAULT_RATE_LIMIT_COOLDOWN,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        genai_client=None,
+        router: ModelRouter = None,
+        prompt_cache: PromptCache = None,
+    ):
+        if genai_client is None:
+            from google import genai
+            genai_client = genai.Client(api_key=api_key)
+        self._client = genai_client
+        self.models = list(models or DEFAULT_MODELS)
+        self.hedge_delay = hedge_delay
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.max_in_flight = max(1, max_in_flight)
+        self.router = router or ModelRouter(self.models)
+        if prompt_cache is None and CONTEXT_CACHE_ENABLED:
+            prompt_cache = PromptCache(genai_client)
+        self.prompt_cache = prompt_cache
+
+    def cooling_down(self, model_id: str) -> bool:
+        return self.router.is_rate_limited(model_id)
+
+    def mark_rate_limited(self, model_id: str, seconds: float = None):
+        seconds = self.rate_limit_cooldown if seconds is None else seconds
+        self.router.mark_rate_limited(model_id, seconds)
+
+    def candidate_models(self) -> list[str]:
+        """Models best-first; those on cooldown come last (only tried once everything else failed)."""
+        ranked = self.router.rank()
+        available = [m for m in ranked if not self.cooling_down(m)]
+        return available or ranked
+
+    def _hedge_delay_for(self, model_id: str) -> float:
+        expected = self.router.expected_latency(model_id)
+        if expected is None:
+            return self.hedge_delay
+        return min(self.hedge_delay, max(MIN_HEDGE_DELAY, expected))
+
+    async def _with_prompt_cache(self, model_id: str, config):
+        if self.prompt_cache is None:
+            return config
+        return await self.prompt_cache.apply(model_id, config)
+
+    def _drop_prompt_cache(self, model_id: str, config):
+        if self.prompt_cache is not None:
+            self.prompt_cache.invalidate(model_id, config)
+
+    async def _generate_once(self, model_id: str, contents, config):
+        with tracing.span(f"gemini {model_id}", tracing.KIND_CLIENT, stage="llm", target=model_id):
+            return await self._generate_once_untraced(model_id, contents, config)
+
+    async def _generate_once_untraced(self, model_id: str, contents, config):
+        request_config = await self._with_prompt_cache(model_id, config)
+        try:
+            response = await self._client.aio.models.generate_content(
+                model=model_id,
+                contents=contents,
+                config=request_config,
+            )
+        except Exception as err:
+            if request_config is config or not PromptCache.is_cache_error(err):
+                raise
+            # Cache vanished server-side: forget it and retry with the inline prompt.
+            self._drop_prompt_cache(model_id, config)
+            response = await self._client.aio.models.generate_content(
+                model=model_id,
+                contents=contents,
+                config=config,
+            )
+        return (response.text or "").strip()
+
+    async def generate(self, contents, config=None) -> str:
+        """Return the text of the first successful model response. Raises AllModelsFailed."""
+        queue = self.candidate_models()
+        pending: dict[asyncio.Task, tuple[str, float]] = {}
+        errors = []
+        winner_started = None
+        if not queue:
+            raise AllModelsFailed("no models configured")
+
+        def launch_next():
+            model_id = queue.pop(0)
+            task = asyncio.ensure_future(self._generate_once(model_id, contents, config))
+            pending[task] = (model_id, time.monotonic())
+            return model_id
+
+        hedge_delay = self._hedge_delay_for(launch_next())
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending.keys(),
+                    timeout=hedge_delay if queue and len(pending) < self.max_in_flight else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Slow model: hedge with the next one.
+                    log.info("no response within %.1fs; hedging with %s", hedge_delay, queue[0])
+                    hedge_delay = self._hedge_delay_for(launch_next())
+                    continue
+
+                for task in done:
+                    model_id, started = pending.pop(task)
+                    elapsed = time.monotonic() - started
+                    err = task.exception()
+                    if err is None:
+                        self.router.record_success(model_id, elapsed)
+                        winner_started = started
+                        return task.result()
+                    errors.append((model_id, err))
+                    if is_rate_limit_error(err):
+                        self.mark_rate_limited(model_id, _retry_delay_from_error(err, self.rate_limit_cooldown))
+                        log.warning("%s hit its rate limit or has no quota; trying the next model", model_id)
+                    else:
+                        self.router.record_failure(model_id, elapsed)
+                        log.warning("%s failed: %s; trying the next model", model_id, err)
+
+                # Nothing left in flight: start the next model right away instead of waiting out the hedge delay.
+                if queue and not pending:
+                    hedge_delay = self._hedge_delay_for(launch_next())
+        finally:
+            now = time.monotonic()
+            for task, (model_id, started) in pending.items():
+                task.cancel()
+                # Started before the winner but overtaken by a hedge: count it against the slow model.
+                if winner_started is not None and started < winner_started:
+                    self.router.record_failure(model_id, now - started)
+
+        raise AllModelsFailed("; ".join(f"{m}: {e}" for m, e in errors))
+
+
+    async def generate_stream(self, contents, config=None):
+        """
+        Async generator of response text chunks (generate_content_stream).
+        Falls back to the next model only while nothing has been yielded yet; once text has
+        been handed on, a mid-stream failure is raised instead of mixing two models' output.
+        """
+        queue = self.candidate_models()
+        errors = []
+        for model_id in queue:
+            started = time.monotonic()
+            yielded = False
+            # Not made current: the generator yields to its caller while the span is open.
+            trace_span = tracing.start_span(f"gemini {model_id} stream", tracing.KIND_CLIENT, stage="llm", target=model_id)
+            try:
+                request_config = await self._with_prompt_cache(model_id, config)
+                try:
+                    stream = await self._client.aio.models.generate_content_stream(
+                        model=model_id,
+                        contents=contents,
+                        config=request_config,
+                    )
+                except Exception as err:
+                    if request_config is config or not PromptCache.is_cache_error(err):
+                        raise
+                    self._drop_prompt_cache(model_id, config)
+                    stream = await self._client.aio.models.generate_content_stream(
+                        model=model_id,
+                        contents=contents,
+                        config=config,
+                    )
+                async for chunk in stream:
+                    text = chunk.text or ""
+                    if text:
+                        yielded = True
+                        yield text
+            except Exception as err:
+                tracing.end_span(trace_span, err)
+                if yielded:
+                    self.router.record_failure(model_id, time.monotonic() - started)
+                    raise
+                errors.append((model_id, err))
+                if is_rate_limit_error(err):
+                    self.mark_rate_limited(model_id, _retry_delay_from_error(err, self.rate_limit_cooldown))
+                    log.warning("%s hit its rate limit or has no quota; trying the next model", model_id)
+                else:
+                    self.router.record_failure(model_id, time.monotonic() - started)
+                    log.warning("%s failed: %s; trying the next model", model_id, err)
+                continue
+            tracing.end_span(trace_span)
+            self.router.record_success(model_id, time.monotonic() - started)
+            return
+
+        raise AllModelsFailed("; ".join(f"{m}: {e}" for m, e in errors) or "no models configured")
+
+
+def iter_sync(async_iterable):
+    """Drive an async iterator from synchronous code on the shared upstream loop (async_http.py)."""
+    iterator = async_iterable.__aiter__()
+    try:
+        while True:
+            try:
+                yield async_http.run(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            async_http.run(aclose())
+
+
+_default_clients: dict[str, AsyncGeminiClient] = {}
+# Keys whose router statistics are saved at exit (clients from get_async_client, not installed test doubles).
+_persisted_keys: set[str] = set()
+
+
+def _fingerprint(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()[:8]
+
+
+def _reset_after_fork():
+    # A genai client first used on the parent's loop cannot be used on the child's; start afresh.
+    _default_clients.clear()
+    _persisted_keys.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_async_client(api_key: str) -> AsyncGeminiClient:
+    """
+    Process-wide client per API key, so routing stats and cooldowns are shared between calls; they
+    start from the statistics saved by earlier runs and are saved again at exit.
+    With LLM_REPLAY_MODE=record|replay, requests go through the offline fixture layer (llm_replay.py).
+    """
+    client = _default_clients.get(api_key)
+    if client is None:
+        from llm_replay import ReplayGenaiClient, replay_mode_from_env
+
+        replay_mode = replay_mode_from_env()
+        genai_client = None
+        if replay_mode == "replay":
+            genai_client = ReplayGenaiClient("replay")
+        elif replay_mode == "record":
+            from google import genai
+            genai_client = ReplayGenaiClient("record", inner=genai.Client(api_key=api_key))
+        client = AsyncGeminiClient(api_key=api_key, genai_client=genai_client)
+        if replay_mode is None:
+            client.router.load_state(load_router_states().get(_fingerprint(api_key), {}))
+            _persisted_keys.add(api_key)
+        _default_clients[api_key] = client
+    return client
+
+
+def install_async_client(api_key: str, client: AsyncGeminiClient):
+    """Replace the process-wide client for api_key (offline harnesses, benchmarks)."""
+    _default_clients[api_key] = client
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count for budgeting and reports (~4 characters per token)."""
+    return (len(text or "") + 3) // 4
+
+
+def save_router_stats():
+    """Save the routing statistics of this process's clients for the next run (registered at exit)."""
+    routers = {_fingerprint(key): _default_clients[key].router for key in _persisted_keys if key in _default_clients}
+    try:
+        save_router_states(routers)
+    except OSError as e:
+        log.warning("could not save LLM routing stats: %s", e)
+
+
+atexit.register(save_router_stats)
+
+
+def router_stats() -> dict:
+    """
+    Routing statistics keyed by a short API-key fingerprint: the ones saved by earlier runs, overlaid
+    with any client live in this process.
+    """
+    stats = {key: ModelRouter.from_state(state).snapshot() for key, state in load_router_states().items()}
+    stats.update({_fingerprint(key): client.router.snapshot() for key, client in _default_clients.items()})
+    return stats
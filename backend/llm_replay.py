@@ -0,0 +1,176 @@
+"""
+Offline record/replay layer for Gemini calls.
+
+ReplayGenaiClient stands in for google.genai.Client inside AsyncGeminiClient:
+- "record": forwards to a real (or fake) client and saves each prompt/response pair as a JSON fixture;
+- "replay": answers from fixtures only, with no network; a missing fixture raises ReplayMiss.
+
+Enable for the normal call path with LLM_REPLAY_MODE=record|replay (fixtures in LLM_FIXTURES_DIR,
+default backend/fixtures/llm). Fixtures are keyed by prompt + output format, not by model, so a
+replay works whichever model the router would have picked.
+"""
+import hashlib
+import json
+import os
+from types import SimpleNamespace
+
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "llm")
+
+REPLAY_MODES = ("record", "replay")
+
+
+class ReplayMiss(Exception):
+    """No fixture recorded for this prompt."""
+
+
+def _config_value(config, name):
+    if config is None:
+        return None
+    if isinstance(config, dict):
+        return config.get(name)
+    return getattr(config, name, None)
+
+
+def fixture_key(contents, config=None, cached_prompts: dict = None) -> str:
+    """
+    Stable key for a request: prompt contents, system instruction and response format.
+    A context-cache reference is resolved back to the prompt it holds, so keys do not depend on
+    whether the prompt was cached when recording or replaying.
+    """
+    system_instruction = _config_value(config, "system_instruction")
+    if system_instruction is None and cached_prompts:
+        system_instruction = cached_prompts.get(_config_value(config, "cached_content"))
+    payload = json.dumps(
+        {
+            "contents": contents,
+            "system_instruction": system_instruction,
+            "response_mime_type": _config_value(config, "response_mime_type"),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _usage_dict(response) -> dict:
+    usage = getattr(response, "usage_metadata", None)
+    return {
+        "prompt_token_count": getattr(usage, "prompt_token_count", None),
+        "candidates_token_count": getattr(usage, "candidates_token_count", None),
+    }
+
+
+def _response(text: str, usage: dict):
+    return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(**(usage or {})))
+
+
+class _ReplayStream:
+    def __init__(self, chunks: list[str], usage: dict):
+        self._chunks = chunks
+        self._usage = usage
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            yield _response(chunk, self._usage)
+
+
+class _ReplayModels:
+    def __init__(self, owner: "ReplayGenaiClient"):
+        self._owner = owner
+
+    async def generate_content(self, model, contents, config=None):
+        owner = self._owner
+        key = fixture_key(contents, config, owner.cached_prompts)
+        if owner.mode == "replay":
+            fixture = owner.load(key)
+            return _response(fixture["response_text"], fixture.get("usage"))
+
+        response = await owner.inner.aio.models.generate_content(model=model, contents=contents, config=config)
+        text = response.text or ""
+        owner.save(key, model, contents, config, text, [text], _usage_dict(response))
+        return response
+
+    async def generate_content_stream(self, model, contents, config=None):
+        owner = self._owner
+        key = fixture_key(contents, config, owner.cached_prompts)
+        if owner.mode == "replay":
+            fixture = owner.load(key)
+            chunks = fixture.get("chunks") or [fixture["response_text"]]
+            return _ReplayStream(chunks, fixture.get("usage"))
+
+        stream = await owner.inner.aio.models.generate_content_stream(model=model, contents=contents, config=config)
+        chunks = []
+        usage = {}
+        async for chunk in stream:
+            chunks.append(chunk.text or "")
+            usage = _usage_dict(chunk)
+        owner.save(key, model, contents, config, "".join(chunks), chunks, usage)
+        return _ReplayStream(chunks, usage)
+
+
+class _ReplayCaches:
+    def __init__(self, owner: "ReplayGenaiClient"):
+        self._owner = owner
+
+    async def create(self, model, config=None):
+        owner = self._owner
+        if owner.mode == "replay":
+            cache = SimpleNamespace(name=f"cachedContents/replay-{model}-{len(owner.cached_prompts)}")
+        else:
+            cache = await owner.inner.aio.caches.create(model=model, config=config)
+        owner.cached_prompts[cache.name] = _config_value(config, "system_instruction")
+        return cache
+
+    async def delete(self, name):
+        owner = self._owner
+        if owner.mode == "record":
+            await owner.inner.aio.caches.delete(name=name)
+        owner.cached_prompts.pop(name, None)
+
+
+class ReplayGenaiClient:
+    """Drop-in for the parts of google.genai.Client that AsyncGeminiClient uses (client.aio.models / .caches)."""
+
+    def __init__(self, mode: str, fixtures_dir: str = None, inner=None):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"mode must be one of {REPLAY_MODES}")
+        if mode == "record" and inner is None:
+            raise ValueError("record mode needs the client to record from")
+        self.mode = mode
+        self.fixtures_dir = fixtures_dir or os.environ.get("LLM_FIXTURES_DIR") or DEFAULT_FIXTURES_DIR
+        self.inner = inner
+        # context-cache name -> system instruction it holds
+        self.cached_prompts: dict[str, str] = {}
+        self.aio = SimpleNamespace(models=_ReplayModels(self), caches=_ReplayCaches(self))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.fixtures_dir, f"{key}.json")
+
+    def load(self, key: str) -> dict:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ReplayMiss(f"no LLM fixture {key[:12]} in {self.fixtures_dir}") from None
+
+    def save(self, key, model, contents, config, text, chunks, usage):
+        os.makedirs(self.fixtures_dir, exist_ok=True)
+        fixture = {
+            "key": key,
+            "model": model,
+            "contents": contents if isinstance(contents, str) else json.loads(json.dumps(contents, default=str)),
+            "response_mime_type": _config_value(config, "response_mime_type"),
+            "response_text": text,
+            "chunks": chunks,
+            "usage": usage,
+        }
+        with open(self._path(key), "w", encoding="utf-8") as f:
+            json.dump(fixture, f, indent=2)
+
+
+def replay_mode_from_env() -> str | None:
+    mode = (os.environ.get("LLM_REPLAY_MODE") or "").strip().lower()
+    return mode if mode in REPLAY_MODES else None
@@ -0,0 +1,150 @@
+"""
+Logging for the web app: leveled per-module loggers, text or JSON lines, a queue so request
+threads never wait on the stream write, and sampling for high-volume events.
+
+Modules log through the standard library:
+
+    log = logging.getLogger(__name__)
+    log.info("canvas fetch done", extra={"user": user_ref(user_id), "courses": 4})
+    log.debug("email fetched", extra={"message_id": mid, "sample_rate": 0.01})
+
+configure_logging() (called once from app.py) installs a QueueHandler on the root logger; a single
+QueueListener thread formats and writes the records to stderr. Calls below LOG_LEVEL return after a
+level check, so debug detail costs next to nothing in production. A record carrying
+extra={"sample_rate": r} is kept with probability r (the kept record still reports r, so counts can
+be scaled back up).
+
+    LOG_LEVEL   DEBUG / INFO (default) / WARNING / ERROR
+    LOG_FORMAT  text (default) or json
+
+httpx and httpcore log every request at INFO; they are held at WARNING so upstream crawls do not
+flood the log (their failures still surface through the callers' own records).
+"""
+import atexit
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+# Third-party loggers that are too chatty at INFO.
+_QUIET_LOGGERS = ("httpx", "httpcore")
+
+_listener: logging.handlers.QueueListener | None = None
+_lock = threading.Lock()
+
+
+def user_ref(user_id) -> str:
+    """Short stable hash of a user id, for logs that must not carry the id itself."""
+    if not user_id:
+        return "-"
+    return hashlib.sha256(str(user_id).encode("utf-8")).hexdigest()[:12]
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS and not k.startswith("_")}
+
+
+class TextFormatter(logging.Formatter):
+    """`2026-03-01 12:00:00,123 INFO routes.canvas: message key=value ...`"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, extra fields, exc (if any)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Drop records with a sample_rate attribute with probability 1 - sample_rate."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        return rate is None or random.random() < rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stdlib version formats the whole record (traceback included) in the calling thread so it
+        # can be pickled; this queue never leaves the process, so only merge args here and leave the
+        # formatting to the listener thread.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging(level: str = None, fmt: str = None, stream=None):
+    """Install the queue-backed root handler once per process. Safe to call more than once."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+        fmt = (fmt or os.environ.get("LOG_FORMAT", "text")).lower()
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+        log_queue = queue.SimpleQueue()
+        handler = _QueueHandler(log_queue)
+        handler.addFilter(SamplingFilter())
+
+        root = logging.getLogger()
+        root.handlers = [handler]
+        root.setLevel(level)
+        for name in _QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(logging.WARNING)
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _restart_after_fork():
+    # The writer thread does not survive fork(); records queued in the child need a new one.
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
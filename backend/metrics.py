@@ -0,0 +1,239 @@
+"""
+In-process metrics: latency histograms and error counters per stage and per Flask route,
+rendered in the Prometheus text format by GET /metrics (routes/metrics.py).
+
+Stages are labelled (stage, target), for example:
+  gmail     messages.list / messages.get
+  canvas    courses / enrollments / assignments / announcements
+  llm       the Gemini model id
+  dedup     batch / existing
+  supabase  the table (or rpc/<function>) a PostgREST request hit
+
+Record with `with timed("canvas", "assignments"): ...` or observe_stage(); Supabase clients are
+instrumented once with instrument_supabase(client). Values live in this process only: under
+gunicorn every worker keeps its own set, so scrape each worker or run one worker per scrape target.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from flask import g, request
+
+import tracing
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+log = logging.getLogger(__name__)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.labelnames), 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_label_str(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(str(labels.get(n, "")) for n in self.labelnames))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _label_str(self.labelnames, key, 'le="%g"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            cumulative += counts[-1]
+            labels = _label_str(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help_text: str, labelnames=()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "triton_stage_duration_seconds", "Time spent in one upstream call or processing stage.", ("stage", "target")
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "triton_stage_errors_total", "Stage calls that raised or returned an error.", ("stage", "target")
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "triton_http_request_duration_seconds", "Flask request handling time.", ("method", "route", "status")
+)
+
+
+def observe_stage(stage: str, target: str, seconds: float, error: bool = False):
+    if not METRICS_ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, stage=stage, target=target)
+    if error:
+        STAGE_ERRORS.inc(stage=stage, target=target)
+
+
+def count_error(stage: str, target: str):
+    """An error with no meaningful duration (e.g. a rate-limit rejection)."""
+    if METRICS_ENABLED:
+        STAGE_ERRORS.inc(stage=stage, target=target)
+
+
+@contextmanager
+def timed(stage: str, target: str):
+    """
+    Time the block as one (stage, target) observation; an exception also counts as an error.
+    Inside a sampled request the block is also a "<stage> <target>" trace span.
+    """
+    start = time.perf_counter()
+    error = False
+    with tracing.span(f"{stage} {target}", tracing.KIND_CLIENT, stage=stage, target=target):
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            observe_stage(stage, target, time.perf_counter() - start, error)
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def _supabase_target(url) -> str:
+    path = urlsplit(str(url)).path
+    marker = "/rest/v1/"
+    return path.split(marker, 1)[1] if marker in path else path
+
+
+def instrument_supabase(client):
+    """
+    Time every PostgREST request of a supabase client per table, and trace it as a
+    "supabase <table>" span carrying a traceparent header. Returns the client.
+    """
+    if not METRICS_ENABLED and not tracing.enabled():
+        return client
+    try:
+        session = client.postgrest.session
+    except Exception as e:
+        log.warning("could not instrument Supabase client: %s", e)
+        return client
+
+    def on_request(req):
+        req.extensions["metrics_start"] = time.perf_counter()
+        target = _supabase_target(req.url)
+        trace_span = tracing.start_span(f"supabase {target}", tracing.KIND_CLIENT, stage="supabase",
+                                        target=target, **{"http.method": req.method})
+        if trace_span is not None:
+            req.headers["traceparent"] = trace_span.traceparent
+            req.extensions["trace_span"] = trace_span
+
+    def on_response(resp):
+        start = resp.request.extensions.get("metrics_start")
+        if start is not None:
+            observe_stage("supabase", _supabase_target(resp.request.url), time.perf_counter() - start,
+                          error=resp.status_code >= 400)
+        tracing.end_span(resp.request.extensions.get("trace_span"),
+                         f"HTTP {resp.status_code}" if resp.status_code >= 400 else None)
+
+    hooks = session.event_hooks
+    hooks["request"] = [*hooks.get("request", []), on_request]
+    hooks["response"] = [*hooks.get("response", []), on_response]
+    session.event_hooks = hooks
+    return client
+
+
+def init_app(app):
+    """Record request latency per route (URL rule, not raw path, to keep the label set small)."""
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _metrics_observe(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            HTTP_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route,
+                                 status=response.status_code)
+        return response
@@ -0,0 +1,204 @@
+"""
+Adaptive Gemini model routing.
+
+Keeps rolling per-model statistics (latency percentiles, success rate, quota-exhaustion windows)
+and ranks models for each request by expected cost, so traffic shifts away from a degraded
+model instead of every request paying its failure first. Samples older than the window expire,
+which lets a recovered model earn its place back.
+
+LLM calls are made by short-lived CLI runs (run_gmail.py, parse_notifications.py), so the
+statistics are saved to LLM_ROUTER_STATE_PATH when a run ends and loaded when the next one starts;
+the web app's /internal/llm/models endpoint reads the same file. Timestamps are wall-clock so
+samples and cooldowns keep their meaning across processes. An empty path disables persistence.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from metrics import count_error, observe_stage
+
+# Rolling window: at most this many samples per model, none older than this many seconds.
+ROUTER_WINDOW_SIZE = int(os.environ.get("LLM_ROUTER_WINDOW_SIZE", "50"))
+ROUTER_WINDOW_SECONDS = float(os.environ.get("LLM_ROUTER_WINDOW_SECONDS", "600"))
+# Latency assumed for a model with no recent samples (seconds).
+ROUTER_PRIOR_LATENCY = float(os.environ.get("LLM_ROUTER_PRIOR_LATENCY", "5"))
+ROUTER_STATE_PATH = os.environ.get(
+    "LLM_ROUTER_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_router_state.json")
+)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float | None:
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class ModelStats:
+    """Rolling samples for one model: (timestamp, latency_seconds, ok)."""
+
+    def __init__(self, window_size: int = ROUTER_WINDOW_SIZE, window_seconds: float = ROUTER_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.samples: deque = deque(maxlen=window_size)
+        self.rate_limited_until = 0.0
+        self.rate_limit_count = 0
+
+    def _prune(self, now: float):
+        while self.samples and now - self.samples[0][0] > self.window_seconds:
+            self.samples.popleft()
+
+    def record(self, latency: float, ok: bool, now: float):
+        self.samples.append((now, latency, ok))
+        self._prune(now)
+
+    def snapshot(self, now: float) -> dict:
+        self._prune(now)
+        latencies = sorted(lat for _, lat, ok in self.samples if ok)
+        total = len(self.samples)
+        successes = sum(1 for _, _, ok in self.samples if ok)
+        return {
+            "samples": total,
+            "successes": successes,
+            "failures": total - successes,
+            "success_rate": (successes / total) if total else None,
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p90": _percentile(latencies, 90),
+            "latency_p99": _percentile(latencies, 99),
+            "rate_limit_count": self.rate_limit_count,
+            "cooldown_remaining": max(0.0, self.rate_limited_until - now),
+        }
+
+    def to_state(self) -> dict:
+        return {
+            "samples": [list(sample) for sample in self.samples],
+            "rate_limited_until": self.rate_limited_until,
+            "rate_limit_count": self.rate_limit_count,
+        }
+
+    def restore(self, state: dict, now: float):
+        for ts, latency, ok in state.get("samples", []):
+            self.samples.append((float(ts), float(latency), bool(ok)))
+        self._prune(now)
+        self.rate_limited_until = float(state.get("rate_limited_until", 0.0))
+        self.rate_limit_count = int(state.get("rate_limit_count", 0))
+
+
+class ModelRouter:
+    """Thread-safe model ranking shared by every LLM call in the process."""
+
+    def __init__(self, models: list[str], prior_latency: float = ROUTER_PRIOR_LATENCY, clock=time.time):
+        self.models = list(models)
+        self.prior_latency = prior_latency
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = {m: ModelStats() for m in self.models}
+
+    def _stats_for(self, model_id: str) -> ModelStats:
+        if model_id not in self._stats:
+            self._stats[model_id] = ModelStats()
+            self.models.append(model_id)
+        return self._stats[model_id]
+
+    def record_success(self, model_id: str, latency: float):
+        with self._lock:
+            self._stats_for(model_id).record(latency, True, self._clock())
+        observe_stage("llm", model_id, latency)
+
+    def record_failure(self, model_id: str, latency: float):
+        with self._lock:
+            self._stats_for(model_id).record(latency, False, self._clock())
+        observe_stage("llm", model_id, latency, error=True)
+
+    def mark_rate_limited(self, model_id: str, seconds: float):
+        with self._lock:
+            stats = self._stats_for(model_id)
+            now = self._clock()
+            stats.record(0.0, False, now)
+            stats.rate_limited_until = now + seconds
+            stats.rate_limit_count += 1
+        count_error("llm", model_id)
+
+    def is_rate_limited(self, model_id: str) -> bool:
+        with self._lock:
+            return self._stats_for(model_id).rate_limited_until > self._clock()
+
+    def _score(self, snap: dict, position: int) -> float:
+        """Expected seconds until a usable answer; lower is better. Static order breaks ties."""
+        latency = snap["latency_p90"] if snap["latency_p90"] is not None else self.prior_latency
+        success = snap["success_rate"] if snap["success_rate"] is not None else 1.0
+        return latency / max(success, 0.05) + position * 0.01
+
+    def rank(self) -> list[str]:
+        """
+        Models best-first. Models inside a quota-exhaustion window go last (soonest to recover first),
+        so a request only reaches them when everything else has failed.
+        """
+        with self._lock:
+            now = self._clock()
+            available, exhausted = [], []
+            for position, model_id in enumerate(self.models):
+                stats = self._stats[model_id]
+                snap = stats.snapshot(now)
+                if stats.rate_limited_until > now:
+                    exhausted.append((stats.rate_limited_until, model_id))
+                else:
+                    available.append((self._score(snap, position), model_id))
+        return [m for _, m in sorted(available)] + [m for _, m in sorted(exhausted)]
+
+    def expected_latency(self, model_id: str) -> float | None:
+        """p90 latency of recent successes, or None without data."""
+        with self._lock:
+            return self._stats_for(model_id).snapshot(self._clock())["latency_p90"]
+
+    def snapshot(self) -> dict:
+        """Per-model statistics plus the current ranking (for the internal stats endpoint)."""
+        ranking = self.rank()
+        with self._lock:
+            now = self._clock()
+            models = {m: self._stats[m].snapshot(now) for m in self.models}
+        return {"ranking": ranking, "models": models}
+
+    def export_state(self) -> dict:
+        with self._lock:
+            return {"models": {m: self._stats[m].to_state() for m in self.models}}
+
+    def load_state(self, state: dict):
+        """Restore saved statistics for the models this router knows; others are ignored."""
+        with self._lock:
+            now = self._clock()
+            for model_id, model_state in state.get("models", {}).items():
+                if model_id in self._stats:
+                    self._stats[model_id] = ModelStats()
+                    self._stats[model_id].restore(model_state, now)
+
+    @classmethod
+    def from_state(cls, state: dict) -> "ModelRouter":
+        router = cls(list(state.get("models", {})))
+        router.load_state(state)
+        return router
+
+
+def load_router_states(path: str = ROUTER_STATE_PATH) -> dict:
+    """Saved router states keyed by API-key fingerprint ({} when there are none)."""
+    if not path:
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            states = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return states if isinstance(states, dict) else {}
+
+
+def save_router_states(routers: dict, path: str = ROUTER_STATE_PATH):
+    """Merge {fingerprint: router} into the state file atomically (other fingerprints are kept)."""
+    if not path or not routers:
+        return
+    states = load_router_states(path)
+    states.update({key: router.export_state() for key, router in routers.items()})
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(states, f, separators=(",", ":"))
+    os.replace(tmp, path)
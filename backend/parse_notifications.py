@@ -15,10 +15,16 @@ Usage:
 
 import os
 import sys
+import json
+import time
 import argparse
-from datetime import datetime
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from metrics import instrument_supabase, observe_stage
+
+from event_hub import publish
+from logging_config import configure_logging
 
 # Load .env from script directory so GOOGLE_API_KEY (or GEMINI_API_KEY) is available
 def _load_env():
@@ -44,8 +50,8 @@ _load_env()
 
 # Fixed prompt from the assignment
 # Fixed prompt from the assignment
-SYSTEM_PROMPT_TEMPLATE = """You are an assistant that parses student notifications.
-Today is {today}.
+SYSTEM_PROMPT = """You are an assistant that parses student notifications.
+The current date is given at the top of the content to parse.
 
 System Prompt (Context):
 You are a notification parser for a college student. Your job is to extract ONLY the most important academic notifications from emails.
@@ -77,142 +83,340 @@ Task:
 4. IMPORTANT: Deduplicate aggressively for the SAME course/source only.
    - If two lines describe the same task or announcement from the SAME source (same class/course), keep ONE.
    - If the same KIND of update applies to DIFFERENT courses (e.g. "final grades posted" for MATH 20C vs COGS 9), keep BOTH — one line per class.
-5. Return the results in plain text, one notification per line, columns separated by '|'.
-6. Do NOT emit markdown formatting or headers.
 """
 
 COLUMNS = ["source", "category", "event_date", "event_time", "urgency", "link", "summary"]
 
+# Output modes: "pipe" (plain text, one row per line, '|' separated) or "json" (schema-constrained JSON array).
+OUTPUT_MODES = ("pipe", "json")
 
-def call_llm(user_text: str) -> str:
-    """Call Google AI Studio (Gemini) API. Requires GOOGLE_API_KEY or GEMINI_API_KEY in .env or environment."""
+OUTPUT_FORMAT_INSTRUCTIONS = {
+    "pipe": """5. Return the results in plain text, one notification per line, columns separated by '|'.
+6. Do NOT emit markdown formatting or headers.
+""",
+    "json": """5. Return the results as a JSON array with one object per notification, using the keys
+   source, category, event_date, event_time, urgency, link, summary (use null for unknown values).
+6. Do NOT emit markdown formatting, code fences or any text outside the JSON array.
+""",
+}
+
+# Gemini response schema for the "json" output mode (mirrors COLUMNS).
+RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "source": {"type": "STRING"},
+            "category": {
+                "type": "STRING",
+                "enum": ["exam", "assignment", "event", "announcement", "personal", "spam"],
+            },
+            "event_date": {"type": "STRING", "nullable": True},
+            "event_time": {"type": "STRING", "nullable": True},
+            "urgency": {"type": "STRING"},
+            "link": {"type": "STRING", "nullable": True},
+            "summary": {"type": "STRING"},
+        },
+        "required": ["source", "category", "summary"],
+        "propertyOrdering": COLUMNS,
+    },
+}
+
+
+# The only per-day part of the prompt; sent with the content so the system prompt stays static (cacheable).
+DATE_CONTEXT_TEMPLATE = "Today is {today}."
+
+
+def build_system_prompt(output_mode: str = "pipe") -> str:
+    """Static system prompt for an output mode (identical for every call, so it can be context-cached)."""
+    return SYSTEM_PROMPT + OUTPUT_FORMAT_INSTRUCTIONS[output_mode]
+
+
+def format_emails_for_llm(emails: list[dict]) -> str:
+    """Build the CONTENT TO PARSE block from Gmail email dicts (from / subject / body)."""
+    return "\n\n---\n\n".join(
+        [
+            f"FROM: {email.get('from', 'Unknown')}\nSUBJECT: {email.get('subject', 'No Subject')}\nBODY:\n{email.get('body', '')}"
+            for email in emails
+        ]
+    )
+
+
+def _llm_api_key() -> str:
     api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
     if not api_key:
         raise SystemExit("Set GOOGLE_API_KEY or GEMINI_API_KEY in .env or your environment.")
+    return api_key
+
 
+def build_llm_request(user_text: str, output_mode: str = "pipe"):
+    """
+    Return (contents, config) for one parse call. The static system prompt is sent exactly once, as
+    the system_instruction (context-cached per model when possible, see prompt_cache.py); contents
+    carry today's date and the emails to parse.
+    """
     try:
-        from google import genai
         from google.genai import types
-        from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, before_sleep_log
-        import logging
     except ImportError:
         raise SystemExit(
             "Missing dependencies. With venv activated, run:\n"
             "  pip install -r requirements.txt"
         )
 
-    client = genai.Client(api_key=api_key)
     today_str = datetime.now().strftime("%Y-%m-%d")
-    system_prompt = SYSTEM_PROMPT_TEMPLATE.format(today=today_str)
-
-    # Retry helper specifically for 429s (Rate Limit)
-    # We'll retry a few times with exponential backoff
-    @retry(
-        reraise=True,
-        wait=wait_exponential(multiplier=1, min=4, max=60),
-        stop=stop_after_attempt(5)
-    )
-    def generate_with_retry(model_id, prompt):
-        return client.models.generate_content(
-            model=model_id,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                temperature=0,
-            ),
-        )
+    config_kwargs = {
+        "system_instruction": build_system_prompt(output_mode),
+        "temperature": 0,
+    }
+    if output_mode == "json":
+        config_kwargs["response_mime_type"] = "application/json"
+        config_kwargs["response_schema"] = RESPONSE_SCHEMA
+    contents = f"{DATE_CONTEXT_TEMPLATE.format(today=today_str)}\n\nCONTENT TO PARSE:\n{user_text}"
+    return contents, types.GenerateContentConfig(**config_kwargs)
+
+
+def call_llm(user_text: str, output_mode: str = "pipe") -> str:
+    """
+    Call Google AI Studio (Gemini) API. Requires GOOGLE_API_KEY or GEMINI_API_KEY in .env or environment.
+    output_mode "json" asks for schema-constrained JSON instead of pipe-delimited lines.
+    """
+    api_key = _llm_api_key()
+    import async_http
+    from llm_client import AllModelsFailed, get_async_client
 
-    # Try current Gemini models (gemini-flash-latest is most reliable for free tier)
-    models = ["gemini-flash-latest", "gemini-2.0-flash", "gemini-1.5-flash", "gemini-pro-latest"]
-    
-    for model_id in models:
-        try:
-            response = client.models.generate_content(
-                model=model_id,
-                contents=f"{system_prompt}\n\nCONTENT TO PARSE:\n{user_text}"
-            )
-            return (response.text or "").strip()
-        except Exception as e:
-            # If rate limited OR any other error (like 404), try the next model
-            err_str = str(e).lower()
-            if "429" in err_str or "resource_exhausted" in err_str:
-                print(f"Model {model_id} hit rate limit or has no quota. Trying next model...", file=sys.stderr)
-            else:
-                print(f"Error with {model_id}: {e}. Trying next model...", file=sys.stderr)
-            continue # Keep trying!
-    
-    print("Error: All Gemini models failed to parse content.", file=sys.stderr)
-    return "[]"
+    contents, config = build_llm_request(user_text, output_mode)
+
+    # Models are tried in priority order with hedging: a slow model gets a backup request
+    # after LLM_HEDGE_DELAY seconds, a failing one is replaced immediately, and models that
+    # returned 429 are skipped until their cooldown expires. Every call runs on the one shared
+    # loop: the genai client's async transport cannot move between event loops.
+    client = get_async_client(api_key)
+    try:
+        return async_http.run(client.generate(contents, config))
+    except AllModelsFailed as e:
+        print(f"Error: All Gemini models failed to parse content. ({e})", file=sys.stderr)
+        return "[]"
+
+
+def stream_llm_chunks(user_text: str, output_mode: str = "pipe"):
+    """Like call_llm, but yields response text chunks as Gemini generates them (generate_content_stream)."""
+    api_key = _llm_api_key()
+    from llm_client import AllModelsFailed, get_async_client, iter_sync
+
+    contents, config = build_llm_request(user_text, output_mode)
+    client = get_async_client(api_key)
+    try:
+        yield from iter_sync(client.generate_stream(contents, config))
+    except AllModelsFailed as e:
+        print(f"Error: All Gemini models failed to parse content. ({e})", file=sys.stderr)
+
+
+def iter_lines(chunks):
+    """Re-split a stream of text chunks into complete lines (the last partial line is flushed at the end)."""
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split("\n")
+        yield from lines
+    if pending:
+        yield pending
 
 
-def parse_llm_output(raw_output: str) -> list[dict]:
+def call_llm_stream(user_text: str):
+    """Streaming call_llm for the pipe format: yields complete notification lines as they arrive."""
+    yield from iter_lines(stream_llm_chunks(user_text, "pipe"))
+
+
+CATEGORY_ORDER = {"exam": 1, "assignment": 2, "event": 3, "announcement": 4, "personal": 5}
+
+
+# "within a few days" -> the event day and the three days before it
+ULTRA_HIGH_WINDOW_DAYS = 3
+
+
+def _event_day(event_date: str):
+    try:
+        return datetime.strptime(event_date or "", "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def canvas_urgency(event_date: str, today: datetime = None) -> str:
+    """Urgency of a Canvas item: "Ultra High" inside the window before its event date, otherwise "High"."""
+    day = _event_day(event_date)
+    if day is None:
+        return "High"
+    delta = (day - (today or datetime.now()).date()).days
+    return "Ultra High" if 0 <= delta <= ULTRA_HIGH_WINDOW_DAYS else "High"
+
+
+def next_canvas_urgency_change(event_date: str, now: datetime = None) -> datetime | None:
+    """Local midnight at which canvas_urgency() next changes for event_date, or None if it never will."""
+    day = _event_day(event_date)
+    if day is None:
+        return None
+    now = now or datetime.now()
+    window_start = datetime.combine(day - timedelta(days=ULTRA_HIGH_WINDOW_DAYS), datetime.min.time())
+    window_end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+    for boundary in (window_start, window_end):
+        if boundary > now:
+            return boundary
+    return None
+
+
+def normalize_notification_row(row: dict, today: datetime = None) -> dict | None:
     """
-    Parse LLM plain-text response into list of notification dicts.
-    Expects one notification per line, columns separated by '|'.
+    Apply the post-parse rules to one notification row (null cleanup, Canvas urgency, spam filter).
+    Returns the row, or None if it should be dropped.
     """
-    rows = []
-    today = datetime.now()
-    
-    for line in raw_output.strip().split("\n"):
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
-            
-        parts = [p.strip() for p in line.split("|")]
-        if len(parts) < len(COLUMNS):
-            continue
-            
-        # If summary contained '|', join extra parts into summary
-        if len(parts) > len(COLUMNS):
-            parts = parts[: len(COLUMNS) - 1] + ["|".join(parts[len(COLUMNS) - 1 :])]
-            
-        row = dict(zip(COLUMNS, parts))
-        
-        # 1. Clean up nulls
-        for k in row:
-            if row[k].lower() == "null":
-                row[k] = ""
-
-        # 2. Logic: Canvas Urgency
-        # "If the information is from canvas make sure the data automatically has a high urgency
-        # and then ultra high if its within a few days."
-        source = row.get("source", "").lower()
-        if "canvas" in source:
-            current_urgency = row.get("urgency", "high").lower()
-            # Set minimum to high if not already
-            if "ultra" not in current_urgency:
-                row["urgency"] = "High"
-            
-            # Check date for "Ultra High"
-            e_date_str = row.get("event_date", "")
-            if e_date_str:
-                try:
-                    e_date = datetime.strptime(e_date_str, "%Y-%m-%d")
-                    delta = (e_date - today).days
-                    # "within a few days" -> let's say <= 3 days
-                    if 0 <= delta <= 3:
-                        row["urgency"] = "Ultra High"
-                except ValueError:
-                    pass # Date parsing failed, keep as High
-
-        # 3. Filter Spam (if prompt missed it)
-        category = row.get("category", "").lower()
-        if "spam" in category or "scam" in category:
-            continue
-            
-        rows.append(row)
+    if today is None:
+        today = datetime.now()
 
-    # Sort: Exam > Assignment > Event > Announcement > Personal
-    cat_order = {"exam": 1, "assignment": 2, "event": 3, "announcement": 4, "personal": 5}
-    
+    # 1. Clean up nulls
+    for k in row:
+        if str(row[k]).lower() == "null":
+            row[k] = ""
+
+    # 2. Logic: Canvas Urgency
+    # "If the information is from canvas make sure the data automatically has a high urgency
+    # and then ultra high if its within a few days."
+    source = row.get("source", "").lower()
+    if "canvas" in source:
+        row["urgency"] = canvas_urgency(row.get("event_date", ""), today)
+
+    # 3. Filter Spam (if prompt missed it)
+    category = row.get("category", "").lower()
+    if "spam" in category or "scam" in category:
+        return None
+
+    return row
+
+
+def sort_notifications(rows: list[dict]) -> list[dict]:
+    """Sort in place: Exam > Assignment > Event > Announcement > Personal, then by event_date."""
     rows.sort(key=lambda x: (
-        cat_order.get(x.get("category", "").lower(), 6),
+        CATEGORY_ORDER.get(x.get("category", "").lower(), 6),
         x.get("event_date", "9999-99-99")
     ))
-    
     return rows
 
 
+class JsonRowDecoder:
+    """
+    Incremental decoder for a JSON array of row objects.
+    feed() accepts the response in arbitrary chunks and returns every object completed so far,
+    so rows can be handed on before the full response has arrived. Text outside top-level
+    objects (brackets, commas, stray code fences) is skipped.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._start = None
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> list[dict]:
+        self._buf += chunk
+        out = []
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif ch == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        obj = json.loads(buf[self._start : i + 1])
+                        if isinstance(obj, dict):
+                            out.append(obj)
+                    except ValueError:
+                        pass  # Malformed object: skip it, keep decoding the rest
+                    self._start = None
+            i += 1
+
+        # Drop consumed text so the buffer only holds the object in progress.
+        keep_from = self._start if self._start is not None else i
+        self._buf = buf[keep_from:]
+        self._pos = i - keep_from
+        if self._start is not None:
+            self._start = 0
+        return out
+
+
+def row_from_json(obj: dict, today: datetime = None) -> dict | None:
+    """Map one decoded JSON object onto COLUMNS (strings, '' for missing) and apply the row rules."""
+    row = {c: "" if obj.get(c) is None else str(obj.get(c)).strip() for c in COLUMNS}
+    return normalize_notification_row(row, today)
+
+
+def iter_json_rows(chunks, today: datetime = None):
+    """Yield normalized rows from a JSON-array response delivered as an iterable of text chunks."""
+    today = today or datetime.now()
+    decoder = JsonRowDecoder()
+    for chunk in chunks:
+        for obj in decoder.feed(chunk):
+            row = row_from_json(obj, today)
+            if row is not None:
+                yield row
+
+
+def row_from_pipe_line(line: str, today: datetime = None) -> dict | None:
+    """Parse one '|'-separated line into a normalized row, or None for blank/malformed/dropped lines."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    parts = [p.strip() for p in line.split("|")]
+    if len(parts) < len(COLUMNS):
+        return None
+
+    # If summary contained '|', join extra parts into summary
+    if len(parts) > len(COLUMNS):
+        parts = parts[: len(COLUMNS) - 1] + ["|".join(parts[len(COLUMNS) - 1 :])]
+
+    return normalize_notification_row(dict(zip(COLUMNS, parts)), today)
+
+
+def iter_llm_rows(chunks, output_mode: str = "pipe", today: datetime = None):
+    """
+    Yield normalized rows from a streamed LLM response (iterable of text chunks) as soon as
+    each row is complete. Unlike parse_llm_output, rows come in response order (unsorted).
+    """
+    today = today or datetime.now()
+    if output_mode == "json":
+        yield from iter_json_rows(chunks, today)
+        return
+    for line in iter_lines(chunks):
+        row = row_from_pipe_line(line, today)
+        if row is not None:
+            yield row
+
+
+def parse_llm_output(raw_output: str, output_mode: str = "pipe") -> list[dict]:
+    """
+    Parse LLM response into list of notification dicts.
+    "pipe" mode expects one notification per line, columns separated by '|';
+    "json" mode expects a JSON array of objects keyed by COLUMNS.
+    """
+    return sort_notifications(list(iter_llm_rows([raw_output.strip()], output_mode)))
+
+
 def _normalize_source_key(source) -> str:
     return " ".join(str(source or "").lower().split())
 
@@ -271,14 +475,24 @@ def is_similar_notification(new_notif, existing_notif, threshold=0.82):
     return similarity >= threshold
 
 
-def dedupe_notification_list(notifications: list[dict]) -> list[dict]:
-    """Drop exact or near-duplicates within one batch (e.g. Gemini output) before upload."""
-    out: list[dict] = []
+def iter_deduped(notifications):
+    """Yield notifications that are not exact or near-duplicates of one already yielded (works on streams)."""
+    seen: list[dict] = []
+    spent = 0.0  # comparison time only; on a stream the wait for the next row is not dedup work
     for n in notifications:
-        if any(notifications_exact_duplicate(n, e) or is_similar_notification(n, e) for e in out):
+        start = time.perf_counter()
+        duplicate = any(notifications_exact_duplicate(n, e) or is_similar_notification(n, e) for e in seen)
+        spent += time.perf_counter() - start
+        if duplicate:
             continue
-        out.append(n)
-    return out
+        seen.append(n)
+        yield n
+    observe_stage("dedup", "batch", spent)
+
+
+def dedupe_notification_list(notifications: list[dict]) -> list[dict]:
+    """Drop exact or near-duplicates within one batch (e.g. Gemini output) before upload."""
+    return list(iter_deduped(notifications))
 
 def check_existing_notifications(supabase_client):
     """Fetch existing notifications from Supabase to check for duplicates"""
@@ -289,6 +503,13 @@ def check_existing_notifications(supabase_client):
         print(f"Warning: Could not fetch existing notifications: {e}", file=sys.stderr)
         return []
 
+def _refresh_dashboard(user_id, rows, supabase):
+    # Imported here: dashboard builds on this module's row rules.
+    from dashboard import apply_notification_changes
+
+    apply_notification_changes(user_id, rows, supabase)
+
+
 def upload_to_supabase(notifications: list[dict], user_id: str = None) -> bool:
     """Upload parsed notifications to Supabase with intelligent deduplication."""
     supabase_url = os.environ.get("SUPABASE_URL")
@@ -303,7 +524,7 @@ def upload_to_supabase(notifications: list[dict], user_id: str = None) -> bool:
         return False
     
     try:
-        supabase: Client = create_client(supabase_url, supabase_key)
+        supabase: Client = instrument_supabase(create_client(supabase_url, supabase_key))
         
         # Get existing notifications for deduplication
         print(f"Checking for duplicates in Supabase for user {user_id}...", file=sys.stderr)
@@ -323,6 +544,7 @@ def upload_to_supabase(notifications: list[dict], user_id: str = None) -> bool:
         
         notifications = dedupe_notification_list(notifications)
 
+        dedup_started = time.perf_counter()
         for notif in notifications:
             # Attach user_id to the notification
             if user_id:
@@ -354,6 +576,7 @@ def upload_to_supabase(notifications: list[dict], user_id: str = None) -> bool:
             
             if not is_duplicate:
                 unique_notifications.append(notif)
+        observe_stage("dedup", "existing", time.perf_counter() - dedup_started)
         
         if duplicates_skipped > 0:
             print(f"Skipped {duplicates_skipped} exact duplicate(s).", file=sys.stderr)
@@ -365,7 +588,10 @@ def upload_to_supabase(notifications: list[dict], user_id: str = None) -> bool:
             return True
         
         print(f"Uploading {len(unique_notifications)} new notifications to Supabase...", file=sys.stderr)
-        supabase.table("notifications").insert(unique_notifications).execute()
+        inserted = supabase.table("notifications").insert(unique_notifications).execute().data or []
+        for row in inserted:
+            publish(user_id, "notification.created", row)
+        _refresh_dashboard(user_id, inserted, supabase)
         print("Successfully uploaded notifications to Supabase.", file=sys.stderr)
         return True
         
@@ -374,12 +600,91 @@ def upload_to_supabase(notifications: list[dict], user_id: str = None) -> bool:
         return False
 
 
+def upload_stream_to_supabase(notifications, user_id: str = None, batch_size: int = 10) -> bool:
+    """
+    Streaming variant of upload_to_supabase: consumes an iterable of rows (e.g. from iter_llm_rows)
+    and inserts new ones in batches of batch_size as they arrive, so the first rows land in the
+    UI before the LLM has finished. Dedup rules are the same as upload_to_supabase.
+    """
+    supabase_url = os.environ.get("SUPABASE_URL")
+    supabase_key = os.environ.get("SUPABASE_KEY")
+
+    if not user_id:
+        user_id = os.environ.get("USER_ID")
+
+    if not supabase_url or not supabase_key:
+        print("Warning: SUPABASE_URL or SUPABASE_KEY not set. Falling back to stdout.", file=sys.stderr)
+        return False
+
+    try:
+        supabase: Client = instrument_supabase(create_client(supabase_url, supabase_key))
+
+        query = supabase.table("notifications").select("summary,event_date,category,source")
+        if user_id:
+            query = query.eq("user_id", user_id)
+        existing_notifications = query.execute().data or []
+
+        batch = []
+        inserted_rows = []
+        uploaded = 0
+        skipped = 0
+
+        def flush():
+            nonlocal uploaded
+            if batch:
+                inserted = supabase.table("notifications").insert(batch).execute().data or []
+                uploaded += len(batch)
+                inserted_rows.extend(inserted)
+                for row in inserted:
+                    publish(user_id, "notification.created", row)
+                publish(user_id, "sync.progress", {"stage": "upload", "uploaded": uploaded})
+                print(f"Uploaded {len(batch)} notification(s) ({uploaded} so far).", file=sys.stderr)
+                batch.clear()
+
+        dedup_spent = 0.0
+        for notif in iter_deduped(notifications):
+            started = time.perf_counter()
+            duplicate = any(
+                notifications_exact_duplicate(notif, existing) or is_similar_notification(notif, existing)
+                for existing in existing_notifications
+            )
+            dedup_spent += time.perf_counter() - started
+            if duplicate:
+                skipped += 1
+                continue
+            if user_id:
+                notif["user_id"] = user_id
+            batch.append(notif)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        observe_stage("dedup", "existing", dedup_spent)
+        _refresh_dashboard(user_id, inserted_rows, supabase)
+
+        if skipped:
+            print(f"Skipped {skipped} duplicate/similar notification(s).", file=sys.stderr)
+        if not uploaded:
+            print("No new notifications to upload.", file=sys.stderr)
+        return True
+
+    except Exception as e:
+        print(f"Error uploading to Supabase: {e}", file=sys.stderr)
+        return False
+
+
 def main():
     parser = argparse.ArgumentParser(description="Parse student notifications with LLM")
     parser.add_argument("--text", type=str, help="Raw notification text (otherwise read from stdin)")
     parser.add_argument("--dry-run", action="store_true", help="Print prompt and sample output; no API call")
     parser.add_argument("--format", choices=["table", "lines", "json"], default="table", help="Output format")
+    parser.add_argument(
+        "--output-mode",
+        choices=OUTPUT_MODES,
+        default=os.environ.get("LLM_OUTPUT_MODE", "pipe"),
+        help="LLM response format: pipe-delimited lines or schema-constrained JSON",
+    )
     args = parser.parse_args()
+    configure_logging()
 
     if args.text is not None:
         user_text = args.text
@@ -393,7 +698,8 @@ def main():
     if args.dry_run:
         today_str = datetime.now().strftime("%Y-%m-%d")
         print("=== System prompt (first 5 lines) ===")
-        print("\n".join(SYSTEM_PROMPT_TEMPLATE.format(today=today_str).split("\n")[:5]) + "\n...")
+        print("\n".join(build_system_prompt(args.output_mode).split("\n")[:5]) + "\n...")
+        print(DATE_CONTEXT_TEMPLATE.format(today=today_str))
         print("\n=== User text ===")
         print(user_text)
         print("\n=== Expected output format (example) ===")
@@ -407,8 +713,8 @@ def main():
         print("Set GOOGLE_API_KEY or GEMINI_API_KEY in .env or your environment, or use --dry-run.", file=sys.stderr)
         sys.exit(1)
 
-    raw_output = call_llm(user_text)
-    notifications = dedupe_notification_list(parse_llm_output(raw_output))
+    raw_output = call_llm(user_text, args.output_mode)
+    notifications = dedupe_notification_list(parse_llm_output(raw_output, args.output_mode))
 
     # Arguments usage: if user specifically asked for 'json' or 'lines' output, we probably shouldn't SILENTLY upload to Supabase?
     # But for this task, the primary goal is Supabase integration.
@@ -433,7 +739,6 @@ def main():
             for n in notifications:
                 print(" | ".join(str(n.get(c, "") or "") for c in COLUMNS))
         elif args.format == "json":
-            import json
             print(json.dumps(notifications, indent=2))
 
 if __name__ == "__main__":
@@ -0,0 +1,205 @@
+"""
+Opt-in sampling profiler for sync runs and slow Flask requests, written as folded stacks
+("frame;frame;frame count" lines) that flamegraph.pl, speedscope or inferno render directly.
+
+One sampler thread wakes every PROFILE_INTERVAL_MS and, for every thread being recorded, walks
+its current Python stack and adds it to two profiles:
+  .wall.folded  one count per sample: where the thread spent wall-clock time, waiting included
+  .cpu.folded   microseconds of thread CPU time since the previous sample (Linux / BSD only)
+
+    run_gmail.py --profile          (or PROFILE_RUN=1): profile the whole run, all threads
+    PROFILE_SLOW_REQUEST_MS=2000    record every request, keep the profile of those slower than this
+
+Files go to PROFILE_DIR (default profiles/) as <route>-<user hash>-<timestamp>.{wall,cpu}.folded.
+When neither option is set nothing is registered and no sampler thread runs.
+"""
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from logging_config import user_ref
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_SLOW_REQUEST_MS = float(os.environ.get("PROFILE_SLOW_REQUEST_MS", "0"))
+PROFILE_MAX_DEPTH = 128
+
+log = logging.getLogger(__name__)
+_sequence = itertools.count(1)
+
+
+def _thread_cpu_clock(thread_id: int):
+    if not hasattr(time, "pthread_getcpuclockid"):
+        return None
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except (OSError, OverflowError):
+        return None
+
+
+def _fold(frame) -> str:
+    frames = []
+    while frame is not None and len(frames) < PROFILE_MAX_DEPTH:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class Recording:
+    """Samples for one thread, or for every thread when thread_id is None."""
+
+    def __init__(self, name: str, thread_id: int = None):
+        self.name = name
+        self.thread_id = thread_id
+        self.wall = Counter()
+        self.cpu = Counter()
+        self.started = time.perf_counter()
+        self._cpu_clocks = {}
+        self._cpu_last = {}
+
+    def sample(self, frames: dict, skip: int):
+        names = {t.ident: t.name for t in threading.enumerate()} if self.thread_id is None else None
+        for tid, frame in frames.items():
+            if tid == skip or (self.thread_id is not None and tid != self.thread_id):
+                continue
+            stack = _fold(frame)
+            if names is not None:
+                stack = f"thread {names.get(tid, tid)};{stack}"
+            self.wall[stack] += 1
+            used = self._cpu_delta(tid)
+            if used:
+                self.cpu[stack] += used
+
+    def _cpu_delta(self, tid: int) -> int:
+        if tid not in self._cpu_clocks:
+            self._cpu_clocks[tid] = _thread_cpu_clock(tid)
+        clock = self._cpu_clocks[tid]
+        if clock is None:
+            return 0
+        try:
+            now = time.clock_gettime_ns(clock)
+        except OSError:  # thread exited
+            self._cpu_clocks[tid] = None
+            return 0
+        last = self._cpu_last.get(tid, now)
+        self._cpu_last[tid] = now
+        return (now - last) // 1000
+
+    def write(self, directory: str = None) -> list[str]:
+        """Write the non-empty profiles; returns their paths."""
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}"
+        stem = os.path.join(directory, f"{self.name}-{stamp}")
+        paths = []
+        for kind, counts in (("wall", self.wall), ("cpu", self.cpu)):
+            if not counts:
+                continue
+            path = f"{stem}.{kind}.folded"
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in counts.most_common():
+                    f.write(f"{stack} {count}\n")
+            paths.append(path)
+        return paths
+
+
+class Sampler:
+    """One daemon thread sampling every active Recording; it exits when none are left."""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        self._recordings = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, recording: Recording) -> Recording:
+        with self._lock:
+            self._recordings.add(recording)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        return recording
+
+    def stop(self, recording: Recording) -> Recording:
+        with self._lock:
+            self._recordings.discard(recording)
+        return recording
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                active = list(self._recordings)
+                if not active:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for recording in active:
+                recording.sample(frames, me)
+            del frames
+            time.sleep(self.interval)
+
+
+_sampler = Sampler()
+
+
+def profile_name(label: str, user_id=None) -> str:
+    """File-name-safe "<label>-<user hash>"."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_") or "root"
+    return f"{slug}-{user_ref(user_id)}"
+
+
+@contextmanager
+def profile_run(label: str, user_id=None, directory: str = None):
+    """Profile every thread for the duration of the block and write the folded stacks at the end."""
+    recording = _sampler.start(Recording(profile_name(label, user_id)))
+    try:
+        yield recording
+    finally:
+        _sampler.stop(recording)
+        for path in recording.write(directory):
+            log.info("profile written: %s", path)
+
+
+def init_app(app, threshold_ms: float = None):
+    """Record each request's thread; keep the profile when the request took longer than threshold_ms."""
+    threshold_ms = PROFILE_SLOW_REQUEST_MS if threshold_ms is None else threshold_ms
+    if threshold_ms <= 0:
+        return
+    from flask import g, request, session
+
+    @app.before_request
+    def _profile_start():
+        g._profile = _sampler.start(Recording("", threading.get_ident()))
+
+    @app.after_request
+    def _profile_streamed(response):
+        if response.is_streamed and "_profile" in g:
+            # SSE and other streams stay open on purpose; their duration says nothing about speed.
+            _sampler.stop(g.pop("_profile"))
+        return response
+
+    @app.teardown_request
+    def _profile_end(exc):
+        recording = g.pop("_profile", None)
+        if recording is None:
+            return
+        _sampler.stop(recording)
+        elapsed_ms = (time.perf_counter() - recording.started) * 1000
+        if elapsed_ms < threshold_ms:
+            return
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        recording.name = profile_name(f"{request.method} {route}", session.get("user_id"))
+        try:
+            paths = recording.write()
+        except OSError as e:
+            log.warning("could not write profile: %s", e)
+            return
+        log.warning("slow request profiled", extra={"route": route, "ms": round(elapsed_ms), "files": paths})
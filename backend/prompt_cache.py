@@ -0,0 +1,174 @@
+"""
+Server-side Gemini context cache for the static parse system prompt.
+
+Cached contents are per model, so PromptCache keeps one cache per (model, prompt) and recreates
+it once a day (LLM_CONTEXT_CACHE_TTL). Requests then reference the cache by name instead of
+re-sending the system instruction. If a model cannot cache the prompt (no caching on the tier,
+...), that is remembered until the next refresh and requests fall back to the inline
+system_instruction. Prompts below the model's minimum cacheable size are never sent to
+caches.create at all.
+
+LLM calls come from one-shot CLI runs, so cache names and expiries are saved to
+LLM_CONTEXT_CACHE_STATE_PATH and reused by the next run instead of creating a new cache each
+time. A cache that is replaced (daily refresh, or its prompt changed) is deleted server-side.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+log = logging.getLogger(__name__)
+
+CONTEXT_CACHE_ENABLED = os.environ.get("LLM_CONTEXT_CACHE", "1").lower() not in ("0", "false", "no")
+CONTEXT_CACHE_TTL = int(os.environ.get("LLM_CONTEXT_CACHE_TTL", str(24 * 60 * 60)))
+CONTEXT_CACHE_STATE_PATH = os.environ.get(
+    "LLM_CONTEXT_CACHE_STATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_prompt_cache.json"),
+)
+# Gemini's minimum cacheable prompt (tokens): 1,024 for Flash models, 4,096 for Pro.
+CONTEXT_CACHE_MIN_TOKENS = int(os.environ.get("LLM_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+CONTEXT_CACHE_MIN_TOKENS_PRO = 4096
+# Recreate this many seconds before the server-side TTL runs out.
+_REFRESH_MARGIN = 300
+
+
+def _config_get(config, name):
+    if config is None:
+        return None
+    if isinstance(config, dict):
+        return config.get(name)
+    return getattr(config, name, None)
+
+
+def with_cached_content(config, cache_name: str):
+    """Copy of config that references cache_name and no longer carries the system instruction."""
+    if isinstance(config, dict):
+        return {**config, "cached_content": cache_name, "system_instruction": None}
+    return config.model_copy(update={"cached_content": cache_name, "system_instruction": None})
+
+
+def min_cache_tokens(model_id: str) -> int:
+    return max(CONTEXT_CACHE_MIN_TOKENS, CONTEXT_CACHE_MIN_TOKENS_PRO if "pro" in model_id else 0)
+
+
+class PromptCache:
+    """One context cache per (model, system prompt), shared by every request and saved between runs."""
+
+    def __init__(
+        self,
+        genai_client,
+        ttl_seconds: int = CONTEXT_CACHE_TTL,
+        clock=time.time,
+        state_path: str = CONTEXT_CACHE_STATE_PATH,
+    ):
+        self._client = genai_client
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self.state_path = state_path
+        # key -> (cache name or None if unavailable, expiry timestamp)
+        self._entries: dict[str, tuple[str | None, float]] = self._load()
+        self._locks: dict[tuple, asyncio.Lock] = {}
+
+    @staticmethod
+    def _key(model_id: str, system_instruction: str) -> str:
+        digest = hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()[:16]
+        return f"{model_id}:{digest}"
+
+    def _load(self) -> dict:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                entries = json.load(f).get("entries", {})
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            return {}
+        return {key: (name, float(expires)) for key, (name, expires) in entries.items()}
+
+    def _save(self):
+        if not self.state_path:
+            return
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"entries": self._entries}, f, separators=(",", ":"))
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            log.warning("could not save context cache state: %s", e)
+
+    def _fresh(self, key: str):
+        entry = self._entries.get(key)
+        if entry and entry[1] > self._clock():
+            return entry
+        return None
+
+    async def _delete(self, names: list[str]):
+        for name in names:
+            try:
+                await self._client.aio.caches.delete(name=name)
+            except Exception as e:  # already expired server-side, or no permission: nothing left to do
+                log.info("could not delete context cache %s: %s", name, e)
+
+    def _replaced(self, model_id: str, key: str) -> list[str]:
+        """Forget the expired entries of model_id (other prompts included); returns their cache names."""
+        now = self._clock()
+        stale = [k for k, (_, expires) in self._entries.items()
+                 if k.startswith(f"{model_id}:") and (k == key or expires <= now)]
+        return [name for name in (self._entries.pop(k)[0] for k in stale) if name]
+
+    async def get(self, model_id: str, system_instruction: str) -> str | None:
+        """Name of a live cache holding system_instruction for model_id, creating it if needed."""
+        key = self._key(model_id, system_instruction)
+        entry = self._fresh(key)
+        if entry:
+            return entry[0]
+        from llm_client import estimate_tokens
+
+        if estimate_tokens(system_instruction) < min_cache_tokens(model_id):
+            return None
+
+        # asyncio locks belong to one event loop; callers outside async_http.run (tests) bring their own.
+        lock_key = (key, id(asyncio.get_running_loop()))
+        lock = self._locks.setdefault(lock_key, asyncio.Lock())
+        async with lock:
+            entry = self._fresh(key)
+            if entry:
+                return entry[0]
+            replaced = self._replaced(model_id, key)
+            name = None
+            try:
+                cache = await self._client.aio.caches.create(
+                    model=model_id,
+                    config={
+                        "system_instruction": system_instruction,
+                        "display_name": f"triton-hub-parse-{key.split(':')[1]}",
+                        "ttl": f"{self.ttl_seconds}s",
+                    },
+                )
+                name = cache.name
+            except Exception as e:
+                log.warning("context cache unavailable for %s; sending the prompt inline (%s)", model_id, e)
+            self._entries[key] = (name, self._clock() + max(60, self.ttl_seconds - _REFRESH_MARGIN))
+            self._save()
+            await self._delete(replaced)
+        self._locks.pop(lock_key, None)
+        return name
+
+    def invalidate(self, model_id: str, config):
+        """Forget model_id's cache for this config's prompt (e.g. it expired server-side); the next request recreates it."""
+        system_instruction = _config_get(config, "system_instruction")
+        if isinstance(system_instruction, str) and self._entries.pop(self._key(model_id, system_instruction), None):
+            self._save()
+
+    @staticmethod
+    def is_cache_error(err: Exception) -> bool:
+        return "cachedcontent" in str(err).lower().replace("_", "").replace(" ", "")
+
+    async def apply(self, model_id: str, config):
+        """Swap the config's system_instruction for a cache reference when one is available."""
+        system_instruction = _config_get(config, "system_instruction")
+        if not system_instruction or not isinstance(system_instruction, str) or _config_get(config, "cached_content"):
+            return config
+        name = await self.get(model_id, system_instruction)
+        return with_cached_content(config, name) if name else config
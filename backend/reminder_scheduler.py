@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Deadline reminders.
+
+ReminderScheduler loads upcoming deadlines (open notifications with an event_date, and Canvas
+assignments from the materialized dashboard timelines) and fires a "reminder.due" event at each
+configured offset before them (REMINDER_OFFSETS_MINUTES, default one day and one hour).
+
+Pending reminders live in a hierarchical timer wheel: inserting or cancelling is O(1), and each
+tick only touches the timers that are due (plus an occasional cascade of one coarse slot), so
+hundreds of thousands of reminders cost little more than their memory. State (pending timers and
+the delta-sync high-water mark) is saved to REMINDER_STATE_PATH, so a restart resumes from the file
+and only fetches rows changed since, instead of rescanning every notification.
+
+Run as a worker:  python reminder_scheduler.py            (recommended for production)
+In the web app:   REMINDER_SCHEDULER=1 starts the same loop in a background thread
+
+Only one process runs the loop at a time: it holds an exclusive lock on REMINDER_LOCK_PATH, and
+every other process waits on standby, taking over if the holder exits. Reminders are published
+through event_hub.publish, so with EVENT_BROKER=supabase they reach the /api/events streams of every
+web worker wherever the loop runs; with the local broker only streams served by the same process
+get them, which is only enough for a single-process server.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows (waitress)
+    fcntl = None
+    import msvcrt
+import time
+from datetime import datetime, timedelta, timezone
+
+from supabase import create_client
+from metrics import instrument_supabase
+
+import event_broker
+from event_hub import publish
+from logging_config import configure_logging, user_ref
+
+log = logging.getLogger(__name__)
+
+REMINDER_OFFSETS_MINUTES = tuple(
+    int(m) for m in os.environ.get("REMINDER_OFFSETS_MINUTES", "1440,60").split(",") if m.strip()
+)
+REMINDER_STATE_PATH = os.environ.get(
+    "REMINDER_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".reminder_state.json")
+)
+REMINDER_LOCK_PATH = os.environ.get("REMINDER_LOCK_PATH", f"{REMINDER_STATE_PATH}.lock")
+REMINDER_POLL_SECONDS = float(os.environ.get("REMINDER_POLL_SECONDS", "60"))
+REMINDER_SAVE_SECONDS = float(os.environ.get("REMINDER_SAVE_SECONDS", "60"))
+# Reminders that came due while the scheduler was down are still sent if at most this late.
+REMINDER_MISSED_GRACE_SECONDS = float(os.environ.get("REMINDER_MISSED_GRACE_SECONDS", "3600"))
+# Time of day used for deadlines that only have a date.
+REMINDER_DEFAULT_TIME = os.environ.get("REMINDER_DEFAULT_TIME", "09:00")
+
+_STATE_VERSION = 1
+_TIME_FORMATS = ("%H:%M", "%I:%M %p", "%I:%M%p", "%I %p", "%H:%M:%S")
+
+
+class _Timer:
+    __slots__ = ("key", "due", "payload", "alive")
+
+    def __init__(self, key, due: float, payload):
+        self.key = key
+        self.due = due
+        self.payload = payload
+        self.alive = True
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel (Varghese & Lauck). Level 0 has one slot per tick; each higher level's
+    slot spans a whole revolution of the level below. Timers beyond the top level wait in an overflow
+    list that is re-examined once per top-level slot.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, wheel_sizes=(256, 64, 64, 64), start: float = None):
+        self.tick_seconds = tick_seconds
+        self._sizes = wheel_sizes
+        self._spans = [1]
+        for size in wheel_sizes[:-1]:
+            self._spans.append(self._spans[-1] * size)
+        self._range = self._spans[-1] * wheel_sizes[-1]
+        self._levels = [[[] for _ in range(size)] for size in wheel_sizes]
+        self._overflow: list[_Timer] = []
+        self._ready: list[_Timer] = []
+        self._timers: dict = {}
+        self._now = int((time.time() if start is None else start) // tick_seconds)
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def add(self, key, due: float, payload=None):
+        """Schedule (or reschedule) key to fire at epoch time due."""
+        self.cancel(key)
+        timer = _Timer(key, due, payload)
+        self._timers[key] = timer
+        self._place(timer)
+
+    def cancel(self, key) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        timer.alive = False  # dropped lazily when its slot is reached
+        return True
+
+    def _place(self, timer: _Timer):
+        due_tick = math.ceil(timer.due / self.tick_seconds)
+        delta = due_tick - self._now
+        if delta <= 0:
+            self._ready.append(timer)
+            return
+        if delta >= self._range:
+            self._overflow.append(timer)
+            return
+        for level, span in enumerate(self._spans):
+            if delta < span * self._sizes[level]:
+                self._levels[level][(due_tick // span) % self._sizes[level]].append(timer)
+                return
+
+    def _cascade(self, level: int):
+        slot_index = (self._now // self._spans[level]) % self._sizes[level]
+        slot = self._levels[level][slot_index]
+        self._levels[level][slot_index] = []
+        for timer in slot:
+            if timer.alive:
+                self._place(timer)
+
+    def advance(self, now: float = None) -> list[_Timer]:
+        """Move the wheel to now (epoch seconds) and return the timers that became due, oldest first."""
+        target = int((time.time() if now is None else now) // self.tick_seconds)
+        due = [t for t in self._ready if t.alive]
+        self._ready = []
+        while self._now < target:
+            self._now += 1
+            # Cascade every level whose slot boundary we just crossed, coarsest first.
+            for level in range(len(self._sizes) - 1, 0, -1):
+                if self._now % self._spans[level] == 0:
+                    if level == len(self._sizes) - 1:
+                        overflow, self._overflow = self._overflow, []
+                        for timer in overflow:
+                            if timer.alive:
+                                self._place(timer)
+                    self._cascade(level)
+            slot_index = self._now % self._sizes[0]
+            slot = self._levels[0][slot_index]
+            if slot:
+                self._levels[0][slot_index] = []
+                due.extend(t for t in slot if t.alive)
+            if self._ready:
+                due.extend(t for t in self._ready if t.alive)
+                self._ready = []
+        for timer in due:
+            self._timers.pop(timer.key, None)
+            timer.alive = False
+        due.sort(key=lambda t: t.due)
+        return due
+
+    def next_due(self) -> float | None:
+        """Earliest pending due time (O(n); for sleeping, not for the hot path)."""
+        return min((t.due for t in self._timers.values()), default=None)
+
+    def items(self):
+        """(key, due, payload) for every pending timer."""
+        return [(t.key, t.due, t.payload) for t in self._timers.values()]
+
+
+def deadline_timestamp(event_date: str, event_time: str = "") -> float | None:
+    """Local epoch time of a YYYY-MM-DD date plus an optional time ("14:30", "11:59 PM"), or None."""
+    try:
+        day = datetime.strptime((event_date or "").strip(), "%Y-%m-%d")
+    except ValueError:
+        return None
+    for raw in ((event_time or "").strip().upper(), REMINDER_DEFAULT_TIME):
+        for fmt in _TIME_FORMATS:
+            try:
+                t = datetime.strptime(raw, fmt)
+            except ValueError:
+                continue
+            return day.replace(hour=t.hour, minute=t.minute).timestamp()
+    return day.timestamp()
+
+
+class ReminderScheduler:
+    """Reminders keyed by item (one timer per offset), fired through on_fire(payload)."""
+
+    def __init__(self, offsets_minutes=REMINDER_OFFSETS_MINUTES, on_fire=None, clock=time.time, wheel=None):
+        self.offsets = tuple(sorted(set(offsets_minutes), reverse=True))
+        self._on_fire = on_fire or _publish_reminder
+        self._clock = clock
+        self.wheel = wheel or TimerWheel(start=clock())
+        # user_id -> item keys of Canvas assignments currently scheduled (to drop removed ones)
+        self._canvas_items: dict[str, set] = {}
+        self.since: str | None = None
+
+    def schedule(self, user_id, item_key: str, deadline: float, title: str, link: str = "") -> int:
+        """(Re)schedule reminders for one item; returns how many are still in the future."""
+        self.cancel(item_key)
+        now = self._clock()
+        scheduled = 0
+        for offset in self.offsets:
+            fire_at = deadline - offset * 60
+            if fire_at <= now:
+                continue
+            self.wheel.add((item_key, offset), fire_at, {
+                "user_id": str(user_id),
+                "item": item_key,
+                "title": title,
+                "link": link,
+                "deadline": datetime.fromtimestamp(deadline, timezone.utc).isoformat(),
+                "minutes_before": offset,
+            })
+            scheduled += 1
+        return scheduled
+
+    def cancel(self, item_key: str):
+        for offset in self.offsets:
+            self.wheel.cancel((item_key, offset))
+
+    def schedule_notification(self, row: dict) -> int:
+        """Schedule an open notification row by event_date/event_time; completed rows are cancelled."""
+        item_key = f"n:{row.get('id')}"
+        deadline = deadline_timestamp(row.get("event_date"), row.get("event_time"))
+        if row.get("completed") or deadline is None:
+            self.cancel(item_key)
+            return 0
+        return self.schedule(row.get("user_id"), item_key, deadline, row.get("summary", ""), _link(row.get("link")))
+
+    def schedule_canvas_items(self, user_id, items: list[dict]) -> int:
+        """Schedule the Canvas assignments of a dashboard timeline, dropping ones no longer in it."""
+        user_id = str(user_id)
+        seen = set()
+        scheduled = 0
+        for item in items or []:
+            if item.get("kind") != "canvas_assignment":
+                continue
+            item_key = f"{item['key']}@{user_id}"
+            seen.add(item_key)
+            deadline = deadline_timestamp(item.get("date"), item.get("time"))
+            if deadline is None:
+                self.cancel(item_key)
+                continue
+            title = f"[{item.get('course')}] {item.get('title')}" if item.get("course") else item.get("title", "")
+            scheduled += self.schedule(user_id, item_key, deadline, title, item.get("link", ""))
+        for gone in self._canvas_items.get(user_id, set()) - seen:
+            self.cancel(gone)
+        self._canvas_items[user_id] = seen
+        return scheduled
+
+    def tick(self, now: float = None) -> int:
+        """Fire every reminder that is due; returns how many fired."""
+        fired = self.wheel.advance(self._clock() if now is None else now)
+        for timer in fired:
+            try:
+                self._on_fire(timer.payload)
+            except Exception as e:
+                log.warning("reminder delivery failed for %s: %s", timer.key, e)
+        return len(fired)
+
+    def save(self, path: str = REMINDER_STATE_PATH):
+        """Write pending timers and the sync high-water mark atomically."""
+        state = {
+            "version": _STATE_VERSION,
+            "saved_at": self._clock(),
+            "since": self.since,
+            "timers": [[key[0], key[1], due, payload] for key, due, payload in self.wheel.items()],
+        }
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def load(self, path: str = REMINDER_STATE_PATH) -> bool:
+        """Restore saved state; returns False if there is none (or it is from another format version)."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        if state.get("version") != _STATE_VERSION:
+            return False
+        now = self._clock()
+        for item_key, offset, due, payload in state.get("timers", []):
+            if offset not in self.offsets or due < now - REMINDER_MISSED_GRACE_SECONDS:
+                continue
+            self.wheel.add((item_key, offset), due, payload)
+            if item_key.startswith("ca:"):
+                self._canvas_items.setdefault(payload["user_id"], set()).add(item_key)
+        self.since = state.get("since")
+        return True
+
+
+def _link(value) -> str:
+    return "" if not value or str(value).upper() == "EMPTY" else str(value)
+
+
+def _publish_reminder(payload: dict):
+    publish(payload["user_id"], "reminder.due", payload)
+    log.info("reminder sent", extra={"user": user_ref(payload["user_id"]), "item": payload["item"],
+                                     "minutes_before": payload["minutes_before"]})
+
+
+def _supabase():
+    return instrument_supabase(create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")))
+
+
+def sync_from_supabase(scheduler: ReminderScheduler, supabase, page_size: int = 1000):
+    """
+    Pull deadlines into the scheduler. Without a high-water mark this loads every open notification
+    dated today or later and every dashboard timeline; afterwards only rows updated since.
+    """
+    started = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+    since = scheduler.since
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    offset = 0
+    while True:
+        query = supabase.table("notifications").select("id,user_id,summary,event_date,event_time,link,completed")
+        if since:
+            query = query.gt("updated_at", since)
+        else:
+            query = query.eq("completed", False).gte("event_date", today).lte("event_date", "9999-12-31")
+        rows = query.order("id").range(offset, offset + page_size - 1).execute().data or []
+        for row in rows:
+            scheduler.schedule_notification(row)
+        if len(rows) < page_size:
+            break
+        offset += page_size
+
+    offset = 0
+    while True:
+        query = supabase.table("dashboard_timelines").select("user_id,items")
+        if since:
+            query = query.gt("updated_at", since)
+        rows = query.order("user_id").range(offset, offset + page_size - 1).execute().data or []
+        for row in rows:
+            scheduler.schedule_canvas_items(row["user_id"], row.get("items") or [])
+        if len(rows) < page_size:
+            break
+        offset += page_size
+
+    scheduler.since = started
+
+
+def run(stop: threading.Event = None, state_path: str = REMINDER_STATE_PATH,
+        poll_seconds: float = REMINDER_POLL_SECONDS):
+    stop = stop or threading.Event()
+    if not event_broker.enabled():
+        log.warning("EVENT_BROKER is not supabase: reminders only reach /api/events streams served by this process")
+    supabase = _supabase()
+    scheduler = ReminderScheduler()
+    resumed = scheduler.load(state_path)
+    sync_from_supabase(scheduler, supabase)
+    log.info("%d pending reminder(s) (%s)", len(scheduler.wheel), "resumed" if resumed else "full load")
+    next_poll = next_save = time.time()
+    try:
+        while not stop.is_set():
+            scheduler.tick()
+            now = time.time()
+            if now >= next_poll:
+                try:
+                    sync_from_supabase(scheduler, supabase)
+                except Exception as e:
+                    log.warning("reminder sync failed: %s", e)
+                next_poll = now + poll_seconds
+            if now >= next_save:
+                scheduler.save(state_path)
+                next_save = now + REMINDER_SAVE_SECONDS
+            stop.wait(scheduler.wheel.tick_seconds)
+    finally:
+        scheduler.save(state_path)
+
+
+def acquire_lock(path: str = REMINDER_LOCK_PATH):
+    """Take the scheduler lock without blocking; returns the open lock file, or None if another process holds it."""
+    f = open(path, "a+")
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def release_lock(f):
+    """Release a lock from acquire_lock (closing the file drops it; the lock file itself stays)."""
+    f.close()
+
+
+def run_when_leader(stop: threading.Event = None, lock_path: str = REMINDER_LOCK_PATH,
+                    retry_seconds: float = REMINDER_POLL_SECONDS, **run_kwargs):
+    """Run the scheduler loop while holding the lock; until then, retry every retry_seconds."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        lock = acquire_lock(lock_path)
+        if lock is None:
+            stop.wait(retry_seconds)
+            continue
+        try:
+            run(stop=stop, **run_kwargs)
+        finally:
+            release_lock(lock)
+        return
+
+
+def start_in_background(lock_path: str = REMINDER_LOCK_PATH, retry_seconds: float = REMINDER_POLL_SECONDS) -> threading.Event:
+    """
+    Run the scheduler loop in a daemon thread once this process holds the lock (one scheduler per
+    deployment, however many workers import the app); set the returned event to stop it.
+    """
+    stop = threading.Event()
+    threading.Thread(
+        target=run_when_leader,
+        kwargs={"stop": stop, "lock_path": lock_path, "retry_seconds": retry_seconds},
+        name="reminder-scheduler",
+        daemon=True,
+    ).start()
+    return stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fire deadline reminders for notifications and Canvas assignments")
+    parser.add_argument("--state", default=REMINDER_STATE_PATH, help="State file (pending reminders + sync mark)")
+    parser.add_argument("--poll-seconds", type=float, default=REMINDER_POLL_SECONDS,
+                        help="How often to pick up new or edited deadlines")
+    args = parser.parse_args()
+    configure_logging()
+    try:
+        run_when_leader(state_path=args.state, poll_seconds=args.poll_seconds)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
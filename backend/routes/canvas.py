@@ -2,12 +2,28 @@
 Canvas API Routes Module
 Handles Canvas-related API endpoints for fetching courses, assignments, and announcements.
 """
+import logging
 import os
 from flask import Blueprint, jsonify, session, request
+import async_http
 from canvas_api import fetch_canvas_info
+from canvas_async import fetch_canvas_info_async
+from dashboard import apply_canvas_info
+from logging_config import user_ref
+
+# CANVAS_ASYNC=0 goes back to the one-call-at-a-time canvasapi crawl.
+CANVAS_ASYNC = os.environ.get("CANVAS_ASYNC", "1") != "0"
 
 
 canvas_bp = Blueprint("canvas", __name__)
+log = logging.getLogger(__name__)
+
+
+def _fetch_canvas_info(user_id):
+    """Course data via the shared async client (concurrent per-course calls) or the legacy sync crawl."""
+    if CANVAS_ASYNC:
+        return async_http.run(fetch_canvas_info_async(user_id))
+    return fetch_canvas_info(user_id)
 
 
 @canvas_bp.route("/canvas/courses", methods=["GET"])
@@ -18,25 +34,21 @@ def get_canvas_courses():
     """
     user_id = session.get("user_id")
     
-    print(f"DEBUG /api/canvas/courses: user_id from session = {user_id}")
-    
     if not user_id:
-        print("ERROR: Not authenticated - no user_id in session")
+        log.info("/api/canvas/courses: not authenticated")
         return jsonify({"error": "Not authenticated"}), 401
     
     try:
-        print(f"Fetching Canvas data for user {user_id}...")
-        result = fetch_canvas_info(user_id)
-        print(f"✅ Successfully fetched {len(result.get('courses', []))} courses")
+        result = _fetch_canvas_info(user_id)
+        apply_canvas_info(user_id, result)
+        log.debug("fetched Canvas courses", extra={"user": user_ref(user_id), "courses": len(result.get("courses", []))})
         return jsonify(result), 200
             
     except ValueError as e:
-        print(f"❌ Canvas token error: {str(e)}")
+        log.warning("Canvas token error: %s", e, extra={"user": user_ref(user_id)})
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"❌ Error fetching Canvas data: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error fetching Canvas data", extra={"user": user_ref(user_id)})
         return jsonify({"error": "Failed to fetch Canvas data", "details": str(e)}), 500
 
 
@@ -48,13 +60,12 @@ def get_canvas_assignments():
     """
     user_id = session.get("user_id")
     
-    print(f"DEBUG /api/canvas/assignments: user_id from session = {user_id}")
-    
     if not user_id:
         return jsonify({"error": "Not authenticated"}), 401
     
     try:
-        result = fetch_canvas_info(user_id)
+        result = _fetch_canvas_info(user_id)
+        apply_canvas_info(user_id, result)
         courses = result.get("courses", [])
         
         # Flatten all assignments from all courses
@@ -66,15 +77,13 @@ def get_canvas_assignments():
                 assignment["course_id"] = course.get("id")
                 all_assignments.append(assignment)
         
-        print(f"✅ Returning {len(all_assignments)} assignments")
+        log.debug("returning assignments", extra={"user": user_ref(user_id), "assignments": len(all_assignments)})
         return jsonify({"assignments": all_assignments}), 200
             
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"❌ Error fetching assignments: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error fetching assignments", extra={"user": user_ref(user_id)})
         return jsonify({"error": "Failed to fetch assignments", "details": str(e)}), 500
 
 
@@ -86,13 +95,12 @@ def get_canvas_announcements():
     """
     user_id = session.get("user_id")
     
-    print(f"DEBUG /api/canvas/announcements: user_id from session = {user_id}")
-    
     if not user_id:
         return jsonify({"error": "Not authenticated"}), 401
     
     try:
-        result = fetch_canvas_info(user_id)
+        result = _fetch_canvas_info(user_id)
+        apply_canvas_info(user_id, result)
         courses = result.get("courses", [])
         
         # Flatten all announcements from all courses
@@ -104,13 +112,11 @@ def get_canvas_announcements():
                 announcement["course_id"] = course.get("id")
                 all_announcements.append(announcement)
         
-        print(f"✅ Returning {len(all_announcements)} announcements")
+        log.debug("returning announcements", extra={"user": user_ref(user_id), "announcements": len(all_announcements)})
         return jsonify({"announcements": all_announcements}), 200
             
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"❌ Error fetching announcements: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error fetching announcements", extra={"user": user_ref(user_id)})
         return jsonify({"error": "Failed to fetch announcements", "details": str(e)}), 500
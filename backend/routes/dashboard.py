@@ -0,0 +1,44 @@
+"""
+Dashboard Routes Module
+Serves the materialized per-user timeline (see dashboard.py) in one read.
+"""
+import logging
+
+from flask import Blueprint, jsonify, make_response, request
+
+from dashboard import get_timeline, rebuild_timeline
+from routes.profile import get_supabase_client, resolve_user_id_from_request
+
+dashboard_bp = Blueprint("dashboard", __name__)
+log = logging.getLogger(__name__)
+
+
+@dashboard_bp.route("/dashboard", methods=["GET"])
+def get_dashboard():
+    """
+    The caller's merged timeline (notifications + Canvas), sorted by urgency then date.
+    Returns { items, version, updated_at, canvas_synced_at }; canvas_synced_at is null until a
+    Canvas fetch or sync has run. ETag is the timeline version, so an unchanged timeline is a 304.
+    """
+    user_id, err = resolve_user_id_from_request()
+    if err:
+        return err[0], err[1]
+    try:
+        supabase = get_supabase_client()
+        timeline = get_timeline(user_id, supabase)
+        if timeline is None:
+            # First visit: materialize from notifications only; Canvas items arrive with the next sync.
+            timeline = rebuild_timeline(user_id, supabase=supabase)
+    except Exception as e:
+        log.error("get_dashboard: %s", e)
+        return jsonify({"error": "Failed to load dashboard"}), 500
+
+    response = make_response(jsonify({
+        "items": timeline.get("items") or [],
+        "version": timeline.get("version"),
+        "updated_at": timeline.get("updated_at"),
+        "canvas_synced_at": timeline.get("canvas_synced_at"),
+    }), 200)
+    response.set_etag(f"dashboard-{user_id}-{timeline.get('version')}", weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
@@ -1,9 +1,20 @@
+import logging
+import os
+
 from flask import Blueprint, jsonify, redirect, session, url_for
 import google.oauth2.credentials
 
+import async_http
 from email_api import fetch_emails_with_creds
+from gmail_async import fetch_emails_async
+
+# GMAIL_ASYNC=0 goes back to fetching messages one at a time through googleapiclient.
+GMAIL_ASYNC = os.environ.get("GMAIL_ASYNC", "1") != "0"
+# Fraction of per-message debug records kept (LOG_LEVEL=DEBUG only).
+EMAIL_LOG_SAMPLE_RATE = float(os.environ.get("EMAIL_LOG_SAMPLE_RATE", "0.1"))
 
 emails = Blueprint("emails", __name__)
+log = logging.getLogger(__name__)
 
 
 @emails.route("/emails")
@@ -12,13 +23,15 @@ def get_emails():
         return redirect(url_for("google_auth.authorize"))
 
     creds = google.oauth2.credentials.Credentials(**session["google_credentials"])
-    email_list = fetch_emails_with_creds(creds)
-
-    for e in email_list:
-        print(f"From: {e['from']}")
-        print(f"Subject: {e['subject']}")
-        print(f"Date: {e['date']}")
-        print(f"Snippet: {e['snippet']}")
-        print("-" * 40)
+    if GMAIL_ASYNC:
+        email_list = async_http.run(fetch_emails_async(creds))
+    else:
+        email_list = fetch_emails_with_creds(creds)
+
+    # Ids only: sender, subject and snippet are the user's mail and stay out of the logs.
+    log.debug("fetched emails", extra={"count": len(email_list)})
+    if log.isEnabledFor(logging.DEBUG):
+        for e in email_list:
+            log.debug("email", extra={"message_id": e["id"], "sample_rate": EMAIL_LOG_SAMPLE_RATE})
 
     return jsonify({"emails": email_list})
@@ -0,0 +1,93 @@
+"""
+Events Routes Module
+Live per-user updates (notification created / updated, sync progress) as Server-Sent Events,
+with a long-poll fallback for clients that cannot hold a stream open.
+
+Both endpoints wait on the client's subscription for as long as the connection is open. Under the
+default gthread workers that is one thread per connected client, so production serves /api/events
+from a separate gevent instance of the same app (see gunicorn.conf.py), where a waiting client is a
+greenlet. With several processes, EVENT_BROKER=supabase is what carries events between them.
+"""
+import json
+import os
+import time
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from event_hub import get_hub
+from routes.profile import resolve_user_id_from_request
+
+events = Blueprint("events", __name__)
+
+EVENT_STREAM_HEARTBEAT = float(os.environ.get("EVENT_STREAM_HEARTBEAT", "15"))
+# Streams are closed after this long so workers are recycled; EventSource reconnects with Last-Event-ID.
+EVENT_STREAM_MAX_SECONDS = float(os.environ.get("EVENT_STREAM_MAX_SECONDS", "300"))
+EVENT_POLL_MAX_TIMEOUT = 30.0
+
+
+def _after_id(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _sse(event) -> str:
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data, default=str)}\n\n"
+
+
+@events.route("/events", methods=["GET"])
+def stream_events():
+    """
+    SSE stream of the caller's events. Auth: Bearer, ?token= or Flask session.
+    Resumes after the Last-Event-ID header (or ?after=) when the events are still buffered.
+    """
+    user_id, err = resolve_user_id_from_request(allow_query_token=True)
+    if err:
+        return err[0], err[1]
+    after = _after_id(request.headers.get("Last-Event-ID") or request.args.get("after"))
+    subscription = get_hub().subscribe(user_id, after=after)
+
+    def generate():
+        deadline = time.monotonic() + EVENT_STREAM_MAX_SECONDS
+        try:
+            yield "retry: 3000\n: connected\n\n"
+            while time.monotonic() < deadline:
+                batch = subscription.get(timeout=min(EVENT_STREAM_HEARTBEAT, deadline - time.monotonic()))
+                if not batch:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield "".join(_sse(event) for event in batch)
+        finally:
+            # Runs on normal end and when the client disconnects (generator closed by the server).
+            subscription.close()
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@events.route("/events/poll", methods=["GET"])
+def poll_events():
+    """
+    Long-poll: waits up to ?timeout= seconds (max 30) for events after ?after= and returns
+    { "events": [...], "last_event_id": n }. Pass last_event_id back as ?after= on the next call.
+    """
+    user_id, err = resolve_user_id_from_request(allow_query_token=True)
+    if err:
+        return err[0], err[1]
+    hub = get_hub()
+    after = _after_id(request.args.get("after"))
+    try:
+        timeout = min(max(float(request.args.get("timeout", "25")), 0.0), EVENT_POLL_MAX_TIMEOUT)
+    except ValueError:
+        return jsonify({"error": "timeout must be a number"}), 400
+
+    if after is None:
+        # First call only establishes the cursor.
+        return jsonify({"events": [], "last_event_id": hub.last_event_id(user_id)}), 200
+    with hub.subscribe(user_id, after=after) as subscription:
+        batch = subscription.get(timeout=timeout)
+    last_id = batch[-1].id if batch else after
+    return jsonify({"events": [e.to_dict() for e in batch], "last_event_id": last_id}), 200
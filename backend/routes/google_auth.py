@@ -1,3 +1,4 @@
+import logging
 import os
 import uuid
 
@@ -9,11 +10,15 @@ import google_auth_oauthlib.flow
 from googleapiclient.discovery import build
 from itsdangerous import URLSafeTimedSerializer
 from supabase import create_client
+from metrics import instrument_supabase
 
 from db import get_user_by_email, create_user
+from logging_config import user_ref
 from sync_service import perform_full_sync
+from user_lookup import find_auth_user_id, forget, remember
 
 google_auth = Blueprint("google_auth", __name__, url_prefix="/auth/google")
+log = logging.getLogger(__name__)
 
 _default_redirect = "http://localhost:8080/auth/google/callback"
 _oauth_redirect = os.getenv("GOOGLE_REDIRECT_URI", _default_redirect)
@@ -45,7 +50,7 @@ def authorize():
     redirect_uri = _oauth_redirect
     flow.redirect_uri = redirect_uri
 
-    print(f"DEBUG: Redirecting to Google with URI: {redirect_uri}")
+    log.debug("redirecting to Google", extra={"redirect_uri": redirect_uri})
 
     authorization_url, state = flow.authorization_url(
         access_type="offline",
@@ -86,45 +91,32 @@ def callback():
     user_id = None
     has_canvas_token = False
 
-    print(f"DEBUG: Handling sync for email: {user_email}")
+    log.debug("OAuth callback")
 
     try:
         supabase_url = os.environ.get("SUPABASE_URL")
         supabase_key = os.environ.get("SUPABASE_KEY")
         if not supabase_url or not supabase_key:
-            print("DEBUG CRITICAL: SUPABASE_URL or SUPABASE_KEY not set.")
+            log.critical("SUPABASE_URL or SUPABASE_KEY not set")
             raise ValueError("Supabase not configured")
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = instrument_supabase(create_client(supabase_url, supabase_key))
 
-        print(f"DEBUG: Querying profiles table for {user_email}...")
         res = supabase.table("profiles").select("id, canvas_token").eq("email", user_email).execute()
 
         if res.data and len(res.data) > 0:
             user_id = res.data[0]["id"]
             canv_tok = res.data[0].get("canvas_token")
             has_canvas_token = bool(canv_tok and canv_tok.strip())
-            print(f"DEBUG: Found existing profile! ID: {user_id}")
+            log.debug("found existing profile", extra={"user": user_ref(user_id)})
         else:
-            print(f"DEBUG: No profile found for {user_email}. Attempting to locate or create user...")
+            log.debug("no profile for this email; locating or creating the auth user")
             try:
-                def _find_user_id():
-                    ulist = supabase.auth.admin.list_users(page=1, per_page=1000)
-                    if not isinstance(ulist, list):
-                        ulist = getattr(ulist, "users", None) or []
-                    for u in ulist:
-                        em = getattr(u, "email", None) or (u.get("email") if isinstance(u, dict) else None)
-                        if em and str(em).lower() == user_email.lower():
-                            uid = getattr(u, "id", None) or (u.get("id") if isinstance(u, dict) else None)
-                            if uid:
-                                return uid
-                    return None
-
-                user_id = _find_user_id()
+                user_id = find_auth_user_id(supabase, user_email)
                 if user_id:
-                    print(f"DEBUG: Found existing auth.user ID: {user_id}")
+                    log.debug("found existing auth user", extra={"user": user_ref(user_id)})
 
                 if not user_id:
-                    print("DEBUG: User totally new. Creating in Auth...")
+                    log.info("new user; creating auth user")
                     try:
                         new_user_res = supabase.auth.admin.create_user({
                             "email": user_email,
@@ -138,44 +130,44 @@ def callback():
                         if not user_id and hasattr(new_user_res, "data"):
                             d = new_user_res.data
                             user_id = getattr(d, "id", None) or (d.get("id") if isinstance(d, dict) else None)
-                        print(f"DEBUG: Created new Auth user ID: {user_id}")
+                        log.info("created auth user", extra={"user": user_ref(user_id)})
+                        remember(user_email, user_id)
                     except Exception as create_e:
                         err_s = str(create_e).lower()
                         if "already" in err_s or "registered" in err_s or "exists" in err_s:
-                            print("DEBUG: User already exists in Auth, re-listing...")
-                            user_id = _find_user_id()
+                            log.info("auth user already exists; looking it up again")
+                            forget(user_email)
+                            user_id = find_auth_user_id(supabase, user_email)
                         else:
                             raise
 
                 if user_id:
-                    print(f"DEBUG: Creating/updating public.profile for {user_id}...")
+                    log.debug("upserting profile", extra={"user": user_ref(user_id)})
                     supabase.table("profiles").upsert(
                         {"id": user_id, "email": user_email, "full_name": full_name or ""},
                         on_conflict="id",
                     ).execute()
             except Exception as auth_inner:
-                print(f"DEBUG ERROR during Auth/Profile setup: {auth_inner}")
-                import traceback
-                traceback.print_exc()
+                log.exception("Auth/profile setup failed: %s", auth_inner)
 
         session["user_id"] = user_id
         session["user_email"] = user_email
 
         if user_id and has_canvas_token:
-            print(f"[sync] User {user_email} is ready. Triggering sync mission.")
+            log.info("user ready; starting full sync", extra={"user": user_ref(user_id)})
             try:
-                perform_full_sync(creds_dict)
+                perform_full_sync(creds_dict, user_id=user_id)
             except Exception as sync_e:
-                print(f"DEBUG WARNING: Sync failed but login continues: {sync_e}")
+                log.warning("sync failed but login continues: %s", sync_e, extra={"user": user_ref(user_id)})
 
     except Exception as e:
-        print(f"DEBUG CRITICAL FAULT: {e}")
+        log.exception("OAuth callback failed: %s", e)
 
     base_f = os.environ.get("FRONTEND_URL", "http://localhost:3000").rstrip("/")
     uid = session.get("user_id")
 
     if not uid or str(uid) == "None":
-        print("[auth] AUTH FLOW FAILED: No user ID identified.")
+        log.error("auth flow failed: no user id identified")
         return redirect(f"{base_f}/login?error=auth_failed")
 
     # Optional: legacy users table sync (People API) — must not break login
@@ -194,7 +186,7 @@ def callback():
             new_user = create_user(email=email, full_name=pname)
             session["user"] = new_user
     except Exception as legacy_e:
-        print(f"DEBUG: Optional legacy users/People sync skipped: {legacy_e}")
+        log.debug("optional legacy users/People sync skipped: %s", legacy_e)
 
     secret = os.environ.get("FLASK_SECRET_KEY", "dev-secret-key")
     oauth_serializer = URLSafeTimedSerializer(secret, salt="oauth-redirect")
@@ -0,0 +1,36 @@
+"""
+Internal Routes Module
+Operational endpoints (LLM routing statistics). Not for the frontend.
+"""
+import hmac
+import os
+
+from flask import Blueprint, jsonify, request
+
+from llm_client import router_stats
+
+internal = Blueprint("internal", __name__)
+
+
+def _internal_request_allowed() -> bool:
+    """
+    True only when INTERNAL_API_TOKEN is set and the request carries it, as X-Internal-Token or as
+    Authorization: Bearer (what Prometheus sends). Fails closed: behind a reverse proxy on the same
+    host every request comes from localhost, so the peer address proves nothing.
+    """
+    expected = os.environ.get("INTERNAL_API_TOKEN", "")
+    if not expected:
+        return False
+    supplied = request.headers.get("X-Internal-Token", "")
+    auth = request.headers.get("Authorization", "")
+    if not supplied and auth.startswith("Bearer "):
+        supplied = auth[7:].strip()
+    return hmac.compare_digest(supplied.encode("utf-8"), expected.encode("utf-8"))
+
+
+@internal.route("/llm/models", methods=["GET"])
+def llm_model_stats():
+    """Rolling latency percentiles, success rates, quota windows and current ranking per Gemini model."""
+    if not _internal_request_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(router_stats()), 200
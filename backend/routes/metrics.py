@@ -0,0 +1,18 @@
+"""
+Metrics Routes Module
+Prometheus scrape endpoint. Same access rule as the /internal routes (INTERNAL_API_TOKEN required).
+"""
+from flask import Blueprint, Response, jsonify
+
+import metrics
+from routes.internal import _internal_request_allowed
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Stage and route latency histograms and error counters in the Prometheus text format."""
+    if not _internal_request_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -2,29 +2,53 @@
 Profile Routes Module
 Handles user profile operations including fetching, updating, and Canvas token management.
 """
+import base64
+import binascii
+import hashlib
+import json
+import logging
 import os
+import re
+import time
+import uuid
+from datetime import datetime
 from pathlib import Path
 
 from dotenv import load_dotenv
 
 load_dotenv(Path(__file__).resolve().parent.parent / ".env")
 
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, jsonify, make_response, request, session
 from supabase import create_client
+from metrics import instrument_supabase
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 
+from canvas_api import invalidate_api_key
+from dashboard import URGENCY_ORDER, apply_notification_changes
+from event_hub import publish
+from ttl_cache import TTLCache
+
 
 profile = Blueprint("profile", __name__)
+log = logging.getLogger(__name__)
 
 SESSION_BEARER_SALT = "session-bearer"
 SESSION_TOKEN_MAX_AGE = 60 * 60 * 24 * 7  # 7 days
+PROFILE_CACHE_TTL = float(os.environ.get("PROFILE_CACHE_TTL", "30"))
+
+# sha256(session token) -> user_id, kept until the token itself expires (wall clock).
+_verified_tokens = TTLCache(
+    maxsize=int(os.environ.get("SESSION_TOKEN_CACHE_SIZE", "4096")), ttl=SESSION_TOKEN_MAX_AGE, clock=time.time
+)
+# user_id -> profile row without canvas_token, for GET /me.
+_profiles = TTLCache(maxsize=4096, ttl=PROFILE_CACHE_TTL)
 
 
 def get_supabase_client():
     """Initialize and return Supabase client."""
     supabase_url = os.environ.get("SUPABASE_URL")
     supabase_key = os.environ.get("SUPABASE_KEY")
-    return create_client(supabase_url, supabase_key)
+    return instrument_supabase(create_client(supabase_url, supabase_key))
 
 
 def _session_token_serializer():
@@ -32,6 +56,27 @@ def _session_token_serializer():
     return URLSafeTimedSerializer(secret, salt=SESSION_BEARER_SALT)
 
 
+def _verify_session_token(raw: str):
+    """
+    user_id from a Bearer session token. A token's signature is checked once; afterwards it is
+    answered from _verified_tokens until it expires. Raises SignatureExpired / BadSignature.
+    """
+    key = hashlib.sha256(raw.encode("utf-8")).digest()
+    user_id = _verified_tokens.get(key)
+    if user_id:
+        return user_id
+    data, signed_at = _session_token_serializer().loads(raw, max_age=SESSION_TOKEN_MAX_AGE, return_timestamp=True)
+    user_id = data.get("user_id")
+    if user_id:
+        _verified_tokens.set(key, user_id, expires_at=signed_at.timestamp() + SESSION_TOKEN_MAX_AGE)
+    return user_id
+
+
+def invalidate_profile_cache(user_id):
+    """Drop the cached /me profile after any write to the user's profiles row."""
+    _profiles.pop(str(user_id))
+
+
 def _profile_response_dict(profile_data, *, include_canvas_secret: bool):
     """Return a copy safe for JSON; optionally strip canvas_token."""
     out = dict(profile_data)
@@ -41,18 +86,20 @@ def _profile_response_dict(profile_data, *, include_canvas_secret: bool):
     return out
 
 
-def resolve_user_id_from_request():
+def resolve_user_id_from_request(allow_query_token: bool = False):
     """
     Resolve user id from Bearer session token or Flask session.
+    allow_query_token also accepts the session token as ?token= (EventSource cannot set headers).
     Returns (user_id, None) on success, or (None, (response, status_code)) on failure.
     """
     auth_header = request.headers.get("Authorization", "")
+    if not auth_header and allow_query_token and request.args.get("token"):
+        auth_header = f"Bearer {request.args['token']}"
     if auth_header.startswith("Bearer "):
         raw = auth_header[7:].strip()
         if raw:
             try:
-                data = _session_token_serializer().loads(raw, max_age=SESSION_TOKEN_MAX_AGE)
-                user_id = data.get("user_id")
+                user_id = _verify_session_token(raw)
                 if user_id:
                     return user_id, None
             except SignatureExpired:
@@ -60,7 +107,7 @@ def resolve_user_id_from_request():
             except BadSignature:
                 return None, (jsonify({"error": "Invalid token"}), 401)
             except Exception as e:
-                print(f"[profile] Bearer token error: {str(e)}")
+                log.info("Bearer token error: %s", e)
                 return None, (jsonify({"error": "Invalid token"}), 401)
     user_id = session.get("user_id")
     if user_id:
@@ -68,35 +115,195 @@ def resolve_user_id_from_request():
     return None, (jsonify({"error": "Not authenticated"}), 401)
 
 
+NOTIFICATION_COLUMNS = {
+    "id", "user_id", "source", "category", "event_date", "event_time",
+    "urgency", "link", "summary", "completed", "created_at", "updated_at",
+}
+NOTIFICATIONS_MAX_PAGE = 200
+
+
+def _encode_cursor(row):
+    raw = json.dumps({"c": row.get("created_at"), "i": row.get("id")}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """
+    Return (timestamp, id) from an opaque cursor, re-serialized from a parsed datetime and an int or
+    UUID id so that nothing from the client reaches a PostgREST filter string verbatim.
+    Raises ValueError if malformed.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        stamp = datetime.fromisoformat(data["c"].replace("Z", "+00:00")).isoformat()
+        row_id = data["i"]
+        if isinstance(row_id, bool) or not isinstance(row_id, (int, str)):
+            raise TypeError("cursor id must be an integer or UUID")
+        if isinstance(row_id, str):
+            row_id = int(row_id) if re.fullmatch(r"-?\d+", row_id) else str(uuid.UUID(row_id))
+        return stamp, row_id
+    except (KeyError, TypeError, ValueError, AttributeError, binascii.Error) as e:
+        raise ValueError("invalid cursor") from e
+
+
+def _csv_arg(name, args=None):
+    """Comma-separated query value (or a JSON list) as a list of stripped strings."""
+    value = (request.args if args is None else args).get(name)
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def _bool_arg(name, args=None):
+    value = (request.args if args is None else args).get(name)
+    if value is None or isinstance(value, bool):
+        return value
+    if str(value).lower() in ("1", "true", "yes"):
+        return True
+    if str(value).lower() in ("0", "false", "no"):
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+
+NOTIFICATION_FILTER_KEYS = {"category", "urgency", "completed", "date_from", "date_to"}
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def _date_arg(name, args):
+    value = args.get(name)
+    if value in (None, ""):
+        return None
+    if not isinstance(value, str) or not _DATE_RE.fullmatch(value):
+        raise ValueError(f"{name} must be YYYY-MM-DD")
+    return value
+
+
+def _apply_notification_filters(query, args=None):
+    """
+    category / urgency (comma lists), completed, date_from / date_to (event_date, YYYY-MM-DD).
+    Reads the query string by default, or the given mapping (e.g. a JSON "filter" object).
+    """
+    args = request.args if args is None else args
+    categories = _csv_arg("category", args)
+    if categories:
+        query = query.in_("category", categories)
+    urgencies = [u.lower() for u in _csv_arg("urgency", args)]
+    if urgencies:
+        unknown = sorted(set(urgencies) - set(URGENCY_ORDER))
+        if unknown:
+            raise ValueError(f"unknown urgency: {', '.join(unknown)}")
+        # Stored urgency casing varies ("High" from parsing, "medium" from the UI). Only known values
+        # get here, so nothing from the client can change the shape of the or() expression.
+        query = query.or_(",".join(f'urgency.ilike."{u}"' for u in urgencies))
+    completed = _bool_arg("completed", args)
+    if completed is not None:
+        query = query.eq("completed", completed)
+    date_from, date_to = _date_arg("date_from", args), _date_arg("date_to", args)
+    if date_from or date_to:
+        # Both bounds always apply so placeholder dates ("EMPTY", "") fall outside any range.
+        query = query.gte("event_date", date_from or "0000-01-01").lte("event_date", date_to or "9999-12-31")
+    return query
+
+
+def _conditional_json(payload, rows):
+    """JSON response with ETag / Last-Modified; answers 304 when the client's copy is current."""
+    response = make_response(jsonify(payload), 200)
+    stamps = [r.get("updated_at") or r.get("created_at") for r in rows if isinstance(r, dict)]
+    stamps = [s for s in stamps if s]
+    if stamps:
+        try:
+            response.last_modified = datetime.fromisoformat(max(stamps).replace("Z", "+00:00"))
+        except ValueError:
+            pass
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.add_etag()
+    return response.make_conditional(request)
+
+
 @profile.route("/notifications", methods=["GET"])
 def list_notifications():
-    """List notifications for the authenticated user (Bearer or Flask session)."""
+    """
+    List notifications for the authenticated user (Bearer or Flask session).
+
+    Without paging parameters this returns the full list (newest first), as before.
+    Query parameters:
+      category, urgency      comma-separated filters
+      completed              true / false
+      date_from, date_to     event_date range (YYYY-MM-DD, inclusive)
+      fields                 comma-separated column projection (id and created_at always included)
+      limit, cursor          keyset pagination; response is {"items", "next_cursor"}
+      updated_since          ISO timestamp; only rows changed after it, oldest change first;
+                             response is {"items", "next_cursor", "updated_since"}
+    Responses carry ETag / Last-Modified; a matching If-None-Match returns 304.
+    """
     user_id, err = resolve_user_id_from_request()
     if err:
         return err[0], err[1]
+
+    paged = any(k in request.args for k in ("limit", "cursor", "updated_since"))
+    try:
+        limit = int(request.args.get("limit", NOTIFICATIONS_MAX_PAGE if paged else 0))
+        if paged and not 1 <= limit <= NOTIFICATIONS_MAX_PAGE:
+            raise ValueError(f"limit must be between 1 and {NOTIFICATIONS_MAX_PAGE}")
+        cursor = _decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        fields = _csv_arg("fields")
+        unknown = set(fields) - NOTIFICATION_COLUMNS
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+        updated_since = request.args.get("updated_since")
+        if updated_since:
+            datetime.fromisoformat(updated_since.replace("Z", "+00:00"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    columns = "*"
+    if fields:
+        keep = set(fields) | {"id", "created_at"} | ({"updated_at"} if updated_since else set())
+        columns = ",".join(sorted(keep))
+
     try:
         supabase = get_supabase_client()
-        res = (
-            supabase.table("notifications")
-            .select("*")
-            .eq("user_id", user_id)
-            .order("created_at", desc=True)
-            .execute()
-        )
-        return jsonify(res.data or []), 200
+        query = supabase.table("notifications").select(columns).eq("user_id", user_id)
+        query = _apply_notification_filters(query)
+
+        if updated_since:
+            # Delta mode: changes after the client's high-water mark, oldest first.
+            query = query.gt("updated_at", updated_since).order("updated_at").order("id")
+            if cursor:
+                query = query.or_(f'updated_at.gt."{cursor[0]}",and(updated_at.eq."{cursor[0]}",id.gt.{cursor[1]})')
+        else:
+            query = query.order("created_at", desc=True).order("id", desc=True)
+            if cursor:
+                query = query.or_(f'created_at.lt."{cursor[0]}",and(created_at.eq."{cursor[0]}",id.lt.{cursor[1]})')
+
+        if paged:
+            # One extra row tells us whether there is another page.
+            query = query.limit(limit + 1)
+        rows = query.execute().data or []
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"[profile] list_notifications: {str(e)}")
+        log.error("list_notifications: %s", e)
         return jsonify({"error": "Failed to fetch notifications"}), 500
 
+    if not paged:
+        return _conditional_json(rows, rows)
 
-@profile.route("/notifications", methods=["POST"])
-def create_notification():
-    """Body: source, category, event_date, event_time, urgency, link, summary (matches frontend CreateNotificationInput)."""
-    user_id, err = resolve_user_id_from_request()
-    if err:
-        return err[0], err[1]
-    data = request.get_json(silent=True) or {}
-    row = {
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        key = {"created_at": last.get("updated_at"), "id": last.get("id")} if updated_since else last
+        next_cursor = _encode_cursor(key)
+    payload = {"items": items, "next_cursor": next_cursor}
+    if updated_since:
+        payload["updated_since"] = max((r.get("updated_at") for r in items if r.get("updated_at")), default=updated_since)
+    return _conditional_json(payload, items)
+
+
+def _notification_row(data, user_id):
+    """Insert row from a create payload, with the same defaults the frontend relies on."""
+    return {
         "user_id": user_id,
         "source": data.get("source", ""),
         "category": data.get("category", "event"),
@@ -107,16 +314,28 @@ def create_notification():
         "summary": data.get("summary", ""),
         "completed": bool(data.get("completed", False)),
     }
+
+
+@profile.route("/notifications", methods=["POST"])
+def create_notification():
+    """Body: source, category, event_date, event_time, urgency, link, summary (matches frontend CreateNotificationInput)."""
+    user_id, err = resolve_user_id_from_request()
+    if err:
+        return err[0], err[1]
+    data = request.get_json(silent=True) or {}
+    row = _notification_row(data, user_id)
     if not row["summary"]:
         return jsonify({"error": "summary is required"}), 400
     try:
         supabase = get_supabase_client()
         res = supabase.table("notifications").insert(row).execute()
         if res.data and len(res.data) > 0:
+            publish(user_id, "notification.created", res.data[0])
+            apply_notification_changes(user_id, res.data[:1], supabase)
             return jsonify(res.data[0]), 201
         return jsonify({"error": "Failed to create notification"}), 500
     except Exception as e:
-        print(f"[profile] create_notification: {str(e)}")
+        log.error("create_notification: %s", e)
         return jsonify({"error": f"Failed to create notification: {str(e)}"}), 500
 
 
@@ -146,13 +365,158 @@ def patch_notification_completed():
             .execute()
         )
         if res.data and len(res.data) > 0:
+            publish(user_id, "notification.updated", res.data[0])
+            apply_notification_changes(user_id, res.data[:1], supabase)
             return jsonify(res.data[0]), 200
         return jsonify({"error": "Notification not found"}), 404
     except Exception as e:
-        print(f"[profile] patch_notification: {str(e)}")
+        log.error("patch_notification: %s", e)
         return jsonify({"error": "Failed to update notification"}), 500
 
 
+NOTIFICATIONS_MAX_BATCH = 500
+
+
+def _parse_ids(ids):
+    if not isinstance(ids, list) or not ids:
+        raise ValueError("ids must be a non-empty list")
+    if len(ids) > NOTIFICATIONS_MAX_BATCH:
+        raise ValueError(f"at most {NOTIFICATIONS_MAX_BATCH} ids per request")
+    try:
+        return sorted({int(i) for i in ids})
+    except (TypeError, ValueError):
+        raise ValueError("ids must be integers") from None
+
+
+@profile.route("/notifications/bulk", methods=["PATCH"])
+def bulk_update_notifications_completed():
+    """
+    Set completed on many notifications in one update.
+    Body: { "completed": <bool>, "ids": [<number>, ...] }
+       or { "completed": <bool>, "filter": { category, urgency, completed, date_from, date_to } }
+    Only the caller's rows are touched. Returns { "updated": [rows], "count": n }.
+    """
+    user_id, err = resolve_user_id_from_request()
+    if err:
+        return err[0], err[1]
+    data = request.get_json(silent=True) or {}
+    completed = data.get("completed")
+    ids, filters = data.get("ids"), data.get("filter")
+    if not isinstance(completed, bool):
+        return jsonify({"error": "completed (boolean) is required"}), 400
+    if (ids is None) == (filters is None):
+        return jsonify({"error": "provide exactly one of ids or filter"}), 400
+    if filters is not None and (not isinstance(filters, dict) or not filters):
+        # An empty filter would mean "every notification"; make that explicit with ids instead.
+        return jsonify({"error": "filter must be a non-empty object"}), 400
+    if filters is not None and set(filters) - NOTIFICATION_FILTER_KEYS:
+        # Unknown keys are not applied, so a typo would silently widen the update to every row.
+        unknown = ", ".join(sorted(set(filters) - NOTIFICATION_FILTER_KEYS))
+        return jsonify({"error": f"unknown filter keys: {unknown}"}), 400
+    if filters is not None and all(v in (None, "", []) for v in filters.values()):
+        return jsonify({"error": "filter must set at least one value"}), 400
+    try:
+        supabase = get_supabase_client()
+        query = supabase.table("notifications").update({"completed": completed}).eq("user_id", user_id)
+        if ids is not None:
+            query = query.in_("id", _parse_ids(ids))
+        else:
+            query = _apply_notification_filters(query, filters)
+        rows = query.execute().data or []
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.error("bulk_update_notifications: %s", e)
+        return jsonify({"error": "Failed to update notifications"}), 500
+    for row in rows:
+        publish(user_id, "notification.updated", row)
+    apply_notification_changes(user_id, rows, supabase)
+    return jsonify({"updated": rows, "count": len(rows)}), 200
+
+
+@profile.route("/notifications/batch", methods=["POST"])
+def batch_notifications():
+    """
+    Mixed create / update operations in one request.
+    Body: { "operations": [ { "op": "create", ...create fields },
+                            { "op": "update", "id": <number>, "completed": <bool> }, ... ] }
+    Every operation is validated before anything is written; nothing is applied if one is invalid.
+    Creates go out as one insert and updates as one update per completed value, so a failure part
+    way through can leave earlier statements applied (PostgREST has no multi-statement transaction).
+    Returns { "results": [ { "op", "status", "data" | "error" }, ... ] } in request order.
+    """
+    user_id, err = resolve_user_id_from_request()
+    if err:
+        return err[0], err[1]
+    operations = (request.get_json(silent=True) or {}).get("operations")
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations must be a non-empty list"}), 400
+    if len(operations) > NOTIFICATIONS_MAX_BATCH:
+        return jsonify({"error": f"at most {NOTIFICATIONS_MAX_BATCH} operations per request"}), 400
+
+    creates = []  # (index, row)
+    updates = {True: [], False: []}  # completed -> [(index, id)]
+    errors = []
+    for i, op in enumerate(operations):
+        kind = op.get("op") if isinstance(op, dict) else None
+        if kind == "create":
+            row = _notification_row(op, user_id)
+            if not row["summary"]:
+                errors.append({"index": i, "error": "summary is required"})
+            creates.append((i, row))
+        elif kind == "update":
+            try:
+                notif_id = int(op.get("id"))
+            except (TypeError, ValueError):
+                errors.append({"index": i, "error": "invalid id"})
+                continue
+            if not isinstance(op.get("completed"), bool):
+                errors.append({"index": i, "error": "completed (boolean) is required"})
+                continue
+            updates[op["completed"]].append((i, notif_id))
+        else:
+            errors.append({"index": i, "error": "op must be create or update"})
+    if errors:
+        return jsonify({"error": "invalid operations", "details": errors}), 400
+
+    results = [None] * len(operations)
+    try:
+        supabase = get_supabase_client()
+        if creates:
+            inserted = supabase.table("notifications").insert([row for _, row in creates]).execute().data or []
+            for (i, _), row in zip(creates, inserted):
+                results[i] = {"op": "create", "status": 201, "data": row}
+                publish(user_id, "notification.created", row)
+        for completed, pending in updates.items():
+            if not pending:
+                continue
+            rows = (
+                supabase.table("notifications")
+                .update({"completed": completed})
+                .eq("user_id", user_id)
+                .in_("id", sorted({notif_id for _, notif_id in pending}))
+                .execute()
+            ).data or []
+            by_id = {row.get("id"): row for row in rows}
+            for row in rows:
+                publish(user_id, "notification.updated", row)
+            for i, notif_id in pending:
+                row = by_id.get(notif_id)
+                results[i] = (
+                    {"op": "update", "status": 200, "data": row}
+                    if row
+                    else {"op": "update", "status": 404, "error": "Notification not found"}
+                )
+    except Exception as e:
+        log.error("batch_notifications: %s", e)
+        return jsonify({"error": "Failed to apply operations"}), 500
+    apply_notification_changes(user_id, [r["data"] for r in results if r and r.get("data")], supabase)
+    for i, result in enumerate(results):
+        if result is None:
+            results[i] = {"op": operations[i]["op"], "status": 500, "error": "Not applied"}
+    return jsonify({"results": results}), 200
+
+
 @profile.route("/me", methods=["GET"])
 def get_profile():
     """
@@ -168,14 +532,13 @@ def get_profile():
         raw = auth_header[7:].strip()
         if raw:
             try:
-                data = _session_token_serializer().loads(raw, max_age=SESSION_TOKEN_MAX_AGE)
-                user_id = data.get("user_id")
+                user_id = _verify_session_token(raw)
             except SignatureExpired:
                 return jsonify({"error": "Session expired"}), 401
             except BadSignature:
                 return jsonify({"error": "Invalid token"}), 401
             except Exception as e:
-                print(f"[profile] Bearer token error: {str(e)}")
+                log.info("Bearer token error: %s", e)
                 return jsonify({"error": "Invalid token"}), 401
     elif one_time_token:
         try:
@@ -191,7 +554,7 @@ def get_profile():
         except BadSignature:
             return jsonify({"error": "Invalid token"}), 400
         except Exception as e:
-            print(f"[profile] One-time token error: {str(e)}")
+            log.info("One-time token error: %s", e)
             return jsonify({"error": "Token verification failed"}), 400
     else:
         user_id = session.get("user_id")
@@ -201,29 +564,33 @@ def get_profile():
     if not user_id:
         return jsonify({"error": "Not authenticated"}), 401
 
-    try:
-        supabase = get_supabase_client()
-        res = supabase.table("profiles").select("*").eq("id", user_id).execute()
+    def load_profile():
+        res = get_supabase_client().table("profiles").select("*").eq("id", user_id).execute()
+        return res.data[0] if res.data else None
 
-        if res.data and len(res.data) > 0:
-            profile_data = res.data[0]
+    def load_safe_profile():
+        row = load_profile()
+        return _profile_response_dict(row, include_canvas_secret=False) if row else None
 
-            if used_one_time:
+    try:
+        if used_one_time:
+            profile_data = load_profile()
+            if profile_data:
                 # First hop from OAuth: allow canvas_token for client setup; issue API session token
                 out = dict(profile_data)
                 session_token = _session_token_serializer().dumps({"user_id": str(user_id)})
                 out["session_token"] = session_token
                 return jsonify(out), 200
+            return jsonify({"error": "Profile not found"}), 404
 
-            # Bearer or Flask session: do not expose raw canvas_token
-            include_secret = False
-            safe = _profile_response_dict(profile_data, include_canvas_secret=include_secret)
+        # Bearer or Flask session: do not expose raw canvas_token (so only the safe copy is cached)
+        safe = _profiles.get_or_load(str(user_id), load_safe_profile)
+        if safe:
             return jsonify(safe), 200
-
         return jsonify({"error": "Profile not found"}), 404
 
     except Exception as e:
-        print(f"[profile] Error fetching profile: {str(e)}")
+        log.error("Error fetching profile: %s", e)
         return jsonify({"error": "Failed to fetch profile"}), 500
 
 
@@ -258,13 +625,15 @@ def update_profile():
 
         supabase = get_supabase_client()
         res = supabase.table("profiles").update(update_data).eq("id", user_id).execute()
+        invalidate_profile_cache(user_id)
+        invalidate_api_key(user_id)
 
         if res.data:
             return jsonify({"message": "Profile updated successfully", "profile": res.data[0]}), 200
         return jsonify({"error": "Failed to update profile"}), 500
 
     except Exception as e:
-        print(f"[profile] Error updating profile: {str(e)}")
+        log.error("Error updating profile: %s", e)
         return jsonify({"error": "Failed to update profile"}), 500
 
 
@@ -288,13 +657,15 @@ def update_canvas_token():
 
         supabase = get_supabase_client()
         res = supabase.table("profiles").update({"canvas_token": canvas_token}).eq("id", user_id).execute()
+        invalidate_profile_cache(user_id)
+        invalidate_api_key(user_id)
 
         if res.data:
             return jsonify({"message": "Canvas token updated successfully"}), 200
         return jsonify({"error": "Failed to update Canvas token"}), 500
 
     except Exception as e:
-        print(f"[profile] Error updating Canvas token: {str(e)}")
+        log.error("Error updating Canvas token: %s", e)
         return jsonify({"error": "Failed to update Canvas token"}), 500
 
 
@@ -311,11 +682,13 @@ def remove_canvas_token():
     try:
         supabase = get_supabase_client()
         res = supabase.table("profiles").update({"canvas_token": None}).eq("id", user_id).execute()
+        invalidate_profile_cache(user_id)
+        invalidate_api_key(user_id)
 
         if res.data:
             return jsonify({"message": "Canvas token removed successfully"}), 200
         return jsonify({"error": "Failed to remove Canvas token"}), 500
 
     except Exception as e:
-        print(f"[profile] Error removing Canvas token: {str(e)}")
+        log.error("Error removing Canvas token: %s", e)
         return jsonify({"error": "Failed to remove Canvas token"}), 500
@@ -3,7 +3,7 @@
 Orchestrator script:
 1. Fetch emails from Gmail (last 30 days) using local OAuth login.
 2. Fetch Canvas assignments/announcements using canvasapi library
-3. Parse Gmail emails using LLM.
+3. Drop/extract obvious emails with local rules, parse the rest using LLM.
 4. Combine and deduplicate all notifications
 5. Upload to Supabase with similarity detection.
 """
@@ -11,8 +11,26 @@ import sys
 import os
 import argparse
 from datetime import datetime
+from itertools import chain
 from email_api import get_emails_last_month
-from parse_notifications import call_llm, parse_llm_output, upload_to_supabase
+from parse_notifications import (
+    OUTPUT_MODES,
+    build_system_prompt,
+    call_llm,
+    canvas_urgency,
+    format_emails_for_llm,
+    iter_llm_rows,
+    parse_llm_output,
+    stream_llm_chunks,
+    upload_stream_to_supabase,
+    upload_to_supabase,
+)
+from email_rules import prefilter_emails
+from email_compact import DEFAULT_MAX_BODY_TOKENS, compact_emails
+from llm_client import estimate_tokens
+from logging_config import configure_logging
+from metrics import timed
+from profiling import profile_run
 
 # Import Canvas library
 try:
@@ -42,7 +60,9 @@ def fetch_canvas_data():
         # Fetch active courses for Winter 2026
         print("Fetching courses...")
         courses = []
-        for course in canvas.get_courses(enrollment_state="active"):
+        with timed("canvas", "courses"):
+            active_courses = list(canvas.get_courses(enrollment_state="active"))
+        for course in active_courses:
             # Only get WI26 courses (or current term)
             if hasattr(course, 'name') and "WI26" in course.name:
                 courses.append(course)
@@ -61,7 +81,9 @@ def fetch_canvas_data():
                 continue
             
             try:
-                for assignment in course.get_assignments():
+                with timed("canvas", "assignments"):
+                    assignments = list(course.get_assignments())
+                for assignment in assignments:
                     due_at = assignment.due_at if hasattr(assignment, 'due_at') else None
                     if not due_at:
                         continue
@@ -83,7 +105,7 @@ def fetch_canvas_data():
                         "category": "assignment",
                         "event_date": event_date,
                         "event_time": event_time,
-                        "urgency": "High",
+                        "urgency": canvas_urgency(event_date),
                         "link": html_url,
                         "summary": f"[{course_name}] {assignment_name} is due."
                     }
@@ -96,7 +118,9 @@ def fetch_canvas_data():
         print("Fetching announcements...")
         try:
             course_ids = [c.id for c in courses if hasattr(c, 'id')]
-            for announcement in canvas.get_announcements(course_ids):
+            with timed("canvas", "announcements"):
+                announcements = list(canvas.get_announcements(course_ids))
+            for announcement in announcements:
                 posted_at = announcement.posted_at if hasattr(announcement, 'posted_at') else None
                 
                 try:
@@ -142,8 +166,37 @@ def main():
     parser.add_argument("--limit", type=int, default=50, help="Max emails to fetch")
     parser.add_argument("--reauth", action="store_true", help="Force re-authentication (switch account)")
     parser.add_argument("--skip-canvas", action="store_true", help="Skip Canvas integration")
+    parser.add_argument(
+        "--output-mode",
+        choices=OUTPUT_MODES,
+        default=os.environ.get("LLM_OUTPUT_MODE", "pipe"),
+        help="LLM response format: pipe-delimited lines or schema-constrained JSON",
+    )
+    parser.add_argument("--stream", action="store_true", help="Stream the LLM response and upload rows as they are generated")
+    parser.add_argument(
+        "--max-body-tokens",
+        type=int,
+        default=DEFAULT_MAX_BODY_TOKENS,
+        help="Per-email body budget after compaction (0 = no cap)",
+    )
+    parser.add_argument("--no-compact", action="store_true", help="Send email bodies to the LLM as-is")
+    parser.add_argument("--no-rules", action="store_true", help="Send every email to the LLM (skip the rule-based pre-classifier)")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=os.environ.get("PROFILE_RUN", "").lower() in ("1", "true", "yes"),
+        help="Write wall-clock and CPU flamegraph profiles of this run to PROFILE_DIR (or PROFILE_RUN=1)",
+    )
     args = parser.parse_args()
+    configure_logging()
 
+    if args.profile:
+        with profile_run("run_gmail", os.environ.get("USER_ID")):
+            run(args)
+    else:
+        run(args)
+
+def run(args):
     # Handle Re-authentication
     if args.reauth:
         if os.path.exists("token.json"):
@@ -165,32 +218,60 @@ def main():
         sys.exit(1)
 
     if emails:
-        # 2. Prepare content for LLM
+        # 2. Drop known noise and extract well-formatted notifications without the LLM
+        if not args.no_rules:
+            emails, rule_notifications, rule_stats = prefilter_emails(emails)
+            print(
+                f"Rules: ignored {rule_stats['ignore']}, extracted {rule_stats['extract']}, "
+                f"{rule_stats['llm']} left for the LLM."
+            )
+            all_notifications.extend(rule_notifications)
+
+    if emails:
+        # 3. Prepare content for LLM (strip quoted replies, signatures, tracking URLs; cap bodies)
         print("\nPreparing email content for parsing...")
-        full_text = "\n\n---\n\n".join(
-            [
-                f"FROM: {email.get('from', 'Unknown')}\nSUBJECT: {email.get('subject', 'No Subject')}\nBODY:\n{email.get('body', '')}"
-                for email in emails
-            ]
+        raw_text = format_emails_for_llm(emails)
+        if not args.no_compact:
+            emails, _ = compact_emails(emails, args.max_body_tokens)
+        full_text = format_emails_for_llm(emails)
+        system_tokens = estimate_tokens(build_system_prompt(args.output_mode))
+        before, after = estimate_tokens(raw_text), estimate_tokens(full_text)
+        saved = 100 * (before - after) / before if before else 0
+        print(
+            f"Prompt tokens (est.): content {before} -> {after} ({saved:.0f}% saved), "
+            f"system prompt {system_tokens} (sent once)."
         )
 
-        # 3. Call LLM
-        print("Sending to LLM for parsing...")
-        raw_output = call_llm(full_text)
+        if args.stream:
+            # 4-5. Stream LLM output: rows are deduped and uploaded as soon as each one is complete
+            print("Streaming LLM parse...")
+            gmail_rows = iter_llm_rows(stream_llm_chunks(full_text, args.output_mode), args.output_mode)
+            streamed = chain(all_notifications, gmail_rows)
+            if args.dry_run:
+                print("\n[DRY RUN] Would upload these notifications:")
+                for notif in streamed:
+                    print(f"  - {notif}")
+            else:
+                upload_stream_to_supabase(streamed)
+            all_notifications = []
+        else:
+            # 4. Call LLM
+            print("Sending to LLM for parsing...")
+            raw_output = call_llm(full_text, args.output_mode)
 
-        # 4. Parse LLM Output
-        gmail_notifications = parse_llm_output(raw_output)
-        print(f"Parsed {len(gmail_notifications)} notifications from Gmail.")
-        all_notifications.extend(gmail_notifications)
-    else:
+            # 5. Parse LLM Output
+            gmail_notifications = parse_llm_output(raw_output, args.output_mode)
+            print(f"Parsed {len(gmail_notifications)} notifications from Gmail.")
+            all_notifications.extend(gmail_notifications)
+    elif not all_notifications:
         print("No emails found.")
 
-    # 5. Fetch Canvas Data
+    # 6. Fetch Canvas Data
     if not args.skip_canvas:
         canvas_notifications = fetch_canvas_data()
         all_notifications.extend(canvas_notifications)
     
-    # 6. Upload to Supabase (with automatic deduplication and similarity detection)
+    # 7. Upload to Supabase (with automatic deduplication and similarity detection)
     if all_notifications:
         if args.dry_run:
             print("\n[DRY RUN] Would upload these notifications:")
@@ -198,7 +279,7 @@ def main():
                 print(f"  - {notif}")
         else:
             upload_to_supabase(all_notifications)
-    else:
+    elif not args.stream:
         print("No notifications to upload.")
 
 if __name__ == "__main__":
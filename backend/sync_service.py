@@ -2,13 +2,22 @@
 Sync Service Module
 Handles synchronization of Gmail emails and Canvas data for users.
 """
+import logging
 import os
 from google.oauth2.credentials import Credentials
 from email_api import fetch_emails_with_creds
 from supabase import create_client
+from metrics import instrument_supabase
 
+from canvas_api import fetch_canvas_info
+from dashboard import apply_canvas_info
+from event_hub import publish
+from logging_config import user_ref
 
-def perform_full_sync(creds_dict):
+log = logging.getLogger(__name__)
+
+
+def perform_full_sync(creds_dict, user_id=None):
     """
     Performs a full synchronization of user data from Gmail and Canvas.
     
@@ -20,17 +29,19 @@ def perform_full_sync(creds_dict):
                    - client_id: OAuth client ID
                    - client_secret: OAuth client secret
                    - scopes: List of OAuth scopes
+        user_id: Supabase user id; when given, progress is published as live events (/api/events)
     
     Returns:
         dict: Sync results with status information
     """
-    print("🔄 Starting full sync...")
+    log.info("starting full sync", extra={"user": user_ref(user_id)})
+    publish(user_id, "sync.started", {})
     
     try:
         # Initialize Supabase client
         supabase_url = os.environ.get("SUPABASE_URL")
         supabase_key = os.environ.get("SUPABASE_KEY")
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = instrument_supabase(create_client(supabase_url, supabase_key))
         
         # Create credentials object from dictionary
         creds = Credentials(
@@ -43,15 +54,23 @@ def perform_full_sync(creds_dict):
         )
         
         # Fetch emails from Gmail
-        print("📧 Fetching emails from Gmail...")
         emails = fetch_emails_with_creds(creds, max_results=50)
-        print(f"✅ Fetched {len(emails)} emails")
+        log.debug("fetched emails", extra={"user": user_ref(user_id), "count": len(emails)})
+        publish(user_id, "sync.progress", {"stage": "gmail", "emails_fetched": len(emails)})
         
         # TODO: Store emails in Supabase if needed
-        # TODO: Sync Canvas data if Canvas token is available
         # TODO: Parse and categorize notifications
+
+        # Canvas: refresh the Canvas part of the materialized dashboard timeline
+        if user_id:
+            try:
+                apply_canvas_info(user_id, fetch_canvas_info(user_id), supabase)
+                publish(user_id, "sync.progress", {"stage": "canvas"})
+            except Exception as canvas_e:
+                log.warning("Canvas sync skipped: %s", canvas_e, extra={"user": user_ref(user_id)})
         
-        print("✅ Full sync completed successfully")
+        log.info("full sync finished", extra={"user": user_ref(user_id), "emails": len(emails)})
+        publish(user_id, "sync.finished", {"emails_synced": len(emails), "dashboard": True})
         return {
             "success": True,
             "emails_synced": len(emails),
@@ -59,7 +78,8 @@ def perform_full_sync(creds_dict):
         }
         
     except Exception as e:
-        print(f"❌ Sync failed: {str(e)}")
+        log.exception("sync failed: %s", e, extra={"user": user_ref(user_id)})
+        publish(user_id, "sync.failed", {"error": "Sync failed"})
         return {
             "success": False,
             "error": str(e),
@@ -92,5 +112,5 @@ def sync_gmail_only(creds_dict, max_results=50):
         return emails
         
     except Exception as e:
-        print(f"❌ Gmail sync failed: {str(e)}")
+        log.exception("Gmail sync failed: %s", e)
         return []
@@ -0,0 +1,199 @@
+"""Tests for the shared upstream loop (async_http) and the async Canvas / Gmail fetches, via httpx.MockTransport."""
+import asyncio
+import contextvars
+import threading
+from http.server import ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import async_http
+import canvas_api
+import canvas_async
+import gmail_async
+from bench_server import FakeCanvasHandler
+
+CANVAS = "https://canvas.test"
+request_tag = contextvars.ContextVar("request_tag", default=None)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Routes the shared client through a MockTransport; set upstream.handler to an (async) handler."""
+    state = type("Upstream", (), {"requests": [], "handler": None})()
+
+    async def dispatch(request):
+        state.requests.append(request)
+        return await state.handler(request)
+
+    monkeypatch.setattr(async_http, "_client", httpx.AsyncClient(transport=httpx.MockTransport(dispatch)))
+    return state
+
+
+def test_run_returns_result_on_the_shared_loop():
+    async def where():
+        return threading.current_thread().name, asyncio.get_running_loop()
+
+    first, loop = async_http.run(where())
+    second, same_loop = async_http.run(where())
+    assert first == second == "upstream-io"
+    assert loop is same_loop
+
+
+def test_run_carries_the_callers_context():
+    async def read():
+        return request_tag.get()
+
+    token = request_tag.set("req-42")
+    try:
+        assert async_http.run(read()) == "req-42"
+    finally:
+        request_tag.reset(token)
+
+
+def test_run_timeout_cancels_the_coroutine():
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(TimeoutError):
+        async_http.run(slow(), timeout=0.05)
+    assert cancelled.wait(2)
+
+
+# --- Canvas ---
+
+def _json(body, headers=None):
+    return httpx.Response(200, json=body, headers=headers or {})
+
+
+@pytest.fixture
+def canvas(monkeypatch, upstream):
+    monkeypatch.setattr(canvas_api, "API_URL", CANVAS)
+    monkeypatch.setattr(canvas_api, "get_api_key", lambda user_id: "tok")
+    return upstream
+
+
+def test_canvas_follows_link_pagination(canvas):
+    async def handler(request):
+        assert request.headers["Authorization"] == "Bearer tok"
+        page = request.url.params.get("page")
+        if page is None:
+            return _json([{"id": 1}, {"id": 2}], {"Link": f'<{CANVAS}/api/v1/courses?page=2>; rel="next", '
+                                                         f'<{CANVAS}/api/v1/courses?page=1>; rel="first"'})
+        if page == "2":
+            return _json([{"id": 3}], {"Link": f'<{CANVAS}/api/v1/courses?page=1>; rel="first"'})
+        raise AssertionError(request.url)
+
+    canvas.handler = handler
+    items = async_http.run(canvas_async._get_all(f"{CANVAS}/api/v1/courses", "tok", {"per_page": 2}))
+    assert [i["id"] for i in items] == [1, 2, 3]
+    # Only the first request carries the caller's params; the next link already has its own.
+    assert [str(r.url) for r in canvas.requests] == [f"{CANVAS}/api/v1/courses?per_page=2",
+                                                     f"{CANVAS}/api/v1/courses?page=2"]
+
+
+def test_canvas_requests_are_concurrent_but_bounded(canvas, monkeypatch):
+    monkeypatch.setattr(canvas_async, "CANVAS_MAX_CONCURRENCY", 3)
+    in_flight = peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        path = request.url.path
+        if path == "/api/v1/courses":
+            return _json([{"id": i, "name": f"CSE {i} WI26"} for i in range(1, 5)] + [{"id": 99, "name": "CSE 99 FA25"}])
+        if path.endswith("/enrollments"):
+            return _json([{"grades": {"current_score": 91.0, "current_grade": "A-"}}])
+        if path.endswith("/assignments"):
+            return _json([{"id": 7, "name": "PA1", "due_at": None, "points_possible": 5}])
+        return _json([{"id": 8, "title": "Hi", "message": "", "posted_at": None}])
+
+    canvas.handler = handler
+    info = async_http.run(canvas_async.fetch_canvas_info_async("u1"))
+    assert [c["id"] for c in info["courses"]] == [1, 2, 3, 4]
+    assert info["courses"][0]["grades"]["current_grade"] == "A-"
+    assert info["courses"][0]["assignments"][0]["name"] == "PA1"
+    assert len(canvas.requests) == 1 + 4 * 3  # FA25 course skipped
+    assert peak == 3
+
+
+def test_canvas_http_errors_propagate(canvas):
+    async def handler(request):
+        return httpx.Response(401, json={"errors": [{"message": "Invalid access token."}]})
+
+    canvas.handler = handler
+    with pytest.raises(httpx.HTTPStatusError):
+        async_http.run(canvas_async.fetch_canvas_info_async("u1"))
+
+
+@pytest.mark.filterwarnings("ignore:Canvas may respond unexpectedly")
+def test_async_crawl_matches_canvasapi(monkeypatch):
+    monkeypatch.setattr(FakeCanvasHandler, "latency", 0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCanvasHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.setattr(canvas_api, "API_URL", f"http://127.0.0.1:{server.server_address[1]}")
+        monkeypatch.setattr(canvas_api, "get_api_key", lambda user_id: "tok")
+        assert async_http.run(canvas_async.fetch_canvas_info_async("u1")) == canvas_api.fetch_canvas_info("u1")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# --- Gmail ---
+
+class FakeCreds:
+    def __init__(self, refresh_token="refresh"):
+        self.token = "expired"
+        self.refresh_token = refresh_token
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = f"fresh-{self.refreshes}"
+
+
+def _message(msg_id):
+    return {"id": msg_id, "snippet": f"snippet {msg_id}", "payload": {"headers": [
+        {"name": "Subject", "value": f"Subject {msg_id}"},
+        {"name": "From", "value": "prof@ucsd.edu"},
+    ]}}
+
+
+def _gmail_handler(valid_token):
+    async def handler(request):
+        if request.headers["Authorization"] != f"Bearer {valid_token}":
+            return httpx.Response(401, json={"error": {"code": 401}})
+        if request.url.path.endswith("/messages"):
+            return _json({"messages": [{"id": "m1"}, {"id": "m2"}]})
+        return _json(_message(request.url.path.rsplit("/", 1)[-1]))
+    return handler
+
+
+def test_gmail_refreshes_the_token_once_on_401(upstream):
+    upstream.handler = _gmail_handler("fresh-1")
+    creds = FakeCreds()
+    emails = async_http.run(gmail_async.fetch_emails_async(creds, max_results=2))
+    assert [(e["id"], e["subject"], e["from"]) for e in emails] == [
+        ("m1", "Subject m1", "prof@ucsd.edu"), ("m2", "Subject m2", "prof@ucsd.edu")]
+    assert creds.refreshes == 1
+    assert [r.headers["Authorization"] for r in upstream.requests[:2]] == ["Bearer expired", "Bearer fresh-1"]
+    assert upstream.requests[-1].url.params.get("format") == "metadata"
+
+
+def test_gmail_without_refresh_token_raises(upstream):
+    upstream.handler = _gmail_handler("fresh-1")
+    creds = FakeCreds(refresh_token=None)
+    with pytest.raises(httpx.HTTPStatusError):
+        async_http.run(gmail_async.fetch_emails_async(creds))
+    assert creds.refreshes == 0 and len(upstream.requests) == 1
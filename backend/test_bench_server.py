@@ -0,0 +1,105 @@
+"""Tests for the production server config (gunicorn.conf.py) and the load-test harness (bench_server.py)."""
+import argparse
+import http.client
+import json
+import os
+import runpy
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import bench_server
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _gunicorn_conf(monkeypatch, **env):
+    for name in ("GUNICORN_WORKERS", "GUNICORN_THREADS", "GUNICORN_TIMEOUT", "GUNICORN_ACCESS_LOG", "GUNICORN_BIND"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(os.path.join(HERE, "gunicorn.conf.py"))
+
+
+def test_gunicorn_defaults(monkeypatch):
+    monkeypatch.setenv("PORT", "9000")
+    conf = _gunicorn_conf(monkeypatch)
+    assert conf["bind"] == "0.0.0.0:9000"
+    assert conf["worker_class"] == "gthread"
+    assert conf["workers"] >= 3
+    assert conf["accesslog"] == "-"
+    assert conf["preload_app"] is False
+    assert conf["graceful_timeout"] < conf["timeout"]
+
+
+def test_documented_servers_are_in_requirements():
+    with open(os.path.join(HERE, "requirements.txt")) as f:
+        reqs = dict((line.split(";") + [""])[:2] for line in f.read().split("\n") if line.strip())
+    # wsgi.py is documented as the entry point on any OS; gevent serves /api/events under gunicorn.
+    assert reqs["waitress"] == ""
+    assert reqs["gunicorn"].strip() == reqs["gevent"].strip() == 'sys_platform != "win32"'
+
+
+def test_gunicorn_settings_from_env(monkeypatch):
+    conf = _gunicorn_conf(monkeypatch, GUNICORN_WORKERS="2", GUNICORN_THREADS="3", GUNICORN_TIMEOUT="45",
+                          GUNICORN_ACCESS_LOG="", GUNICORN_BIND="127.0.0.1:7000")
+    assert (conf["workers"], conf["threads"], conf["timeout"]) == (2, 3, 45)
+    assert conf["accesslog"] is None
+    assert conf["bind"] == "127.0.0.1:7000"
+
+
+def test_percentile():
+    assert bench_server._percentile([], 0.5) == 0.0
+    values = [float(v) for v in range(1, 101)]
+    assert bench_server._percentile(values, 0.50) == 51.0
+    assert bench_server._percentile(values, 0.95) == 96.0
+    assert bench_server._percentile(values, 1.0) == 100.0
+
+
+@pytest.fixture
+def fake_canvas(monkeypatch):
+    monkeypatch.setattr(bench_server.FakeCanvasHandler, "latency", 0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), bench_server.FakeCanvasHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def _get(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read())
+    finally:
+        conn.close()
+
+
+def test_fake_canvas_answers_the_crawl(fake_canvas):
+    status, courses = _get(fake_canvas, "/api/v1/courses?enrollment_state=active")
+    assert status == 200 and len(courses) == bench_server.FakeCanvasHandler.courses
+    status, assignments = _get(fake_canvas, "/api/v1/courses/2/assignments")
+    assert status == 200 and assignments[0]["id"] == 2000
+    assert _get(fake_canvas, "/api/v1/users/self")[0] == 404
+
+
+def test_run_load_counts_requests_and_errors(fake_canvas):
+    ok = bench_server.run_load(fake_canvas, clients=2, duration=0.3, path="/api/v1/courses")
+    assert ok["requests"] > 0 and ok["errors"] == 0
+    assert ok["p95_ms"] >= ok["p50_ms"] > 0
+    missing = bench_server.run_load(fake_canvas, clients=1, duration=0.2, path="/api/v1/nope")
+    assert missing["requests"] == 0 and missing["errors"] > 0
+
+
+@pytest.mark.skipif(os.name == "nt", reason="gunicorn needs a POSIX system")
+def test_courses_served_under_gunicorn(fake_canvas, monkeypatch):
+    pytest.importorskip("gunicorn")
+    monkeypatch.setenv("SUPABASE_URL", os.environ.get("SUPABASE_URL") or "http://127.0.0.1:9")
+    monkeypatch.setenv("SUPABASE_KEY", os.environ.get("SUPABASE_KEY") or "test")
+    args = argparse.Namespace(threads=2, worker_class="gthread", clients=[2], duration=0.5)
+    result = bench_server.bench_workers(2, args, f"http://127.0.0.1:{fake_canvas}")
+    assert result["workers"] == 2 and result["mode"] == "async"
+    assert result["requests"] > 0 and result["errors"] == 0
@@ -0,0 +1,153 @@
+"""Tests for the cached Canvas token lookup in canvas_api (shared client, TTL, invalidation, secrecy)."""
+import pickle
+import threading
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+import canvas_api
+import routes.profile as profile_routes
+from ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSupabase:
+    """profiles table stand-in answering canvas_token from a dict; counts selects."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.queries = 0
+        self._user = None
+        self._update = None
+
+    def table(self, name):
+        assert name == "profiles"
+        return self
+
+    def select(self, columns):
+        assert columns == "canvas_token"
+        self._update = None
+        return self
+
+    def update(self, data):
+        self._update = data
+        return self
+
+    def eq(self, column, value):
+        self._user = value
+        return self
+
+    def execute(self):
+        if self._update is not None:
+            self.tokens[self._user] = self._update["canvas_token"]
+            return SimpleNamespace(data=[{"id": self._user, **self._update}])
+        self.queries += 1
+        if self._user not in self.tokens:
+            return SimpleNamespace(data=[])
+        return SimpleNamespace(data=[{"canvas_token": self.tokens[self._user]}])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(canvas_api, "_tokens", TTLCache(maxsize=16, ttl=300, clock=clock))
+    return clock
+
+
+@pytest.fixture
+def db(monkeypatch, clock):
+    fake = FakeSupabase({"u1": "tok-1", "u2": None})
+    created = []
+
+    def create_client(url, key):
+        created.append((url, key))
+        return fake
+
+    monkeypatch.setattr(canvas_api, "_client", None)
+    monkeypatch.setattr(canvas_api, "create_client", create_client)
+    monkeypatch.setattr(canvas_api, "instrument_supabase", lambda client: client)
+    fake.created = created
+    return fake
+
+
+def test_token_cached_per_user_behind_one_client(db):
+    assert canvas_api.get_api_key("u1") == "tok-1"
+    assert canvas_api.get_api_key("u1") == "tok-1"
+    assert canvas_api.get_api_key(2) is None
+    assert db.queries == 2
+    assert len(db.created) == 1
+
+
+def test_missing_token_is_cached_too(db):
+    for _ in range(3):
+        assert canvas_api.get_api_key("u2") is None
+        assert canvas_api.get_api_key("nobody") is None
+    assert db.queries == 2
+
+
+def test_token_expires_after_ttl(db, clock):
+    canvas_api.get_api_key("u1")
+    clock.now += 301
+    db.tokens["u1"] = "tok-2"
+    assert canvas_api.get_api_key("u1") == "tok-2"
+    assert db.queries == 2
+
+
+def test_invalidate_reloads_the_token(db):
+    canvas_api.get_api_key("u1")
+    db.tokens["u1"] = "tok-2"
+    assert canvas_api.get_api_key("u1") == "tok-1"
+    canvas_api.invalidate_api_key("u1")
+    assert canvas_api.get_api_key("u1") == "tok-2"
+
+
+def test_concurrent_first_lookups_share_one_client(db):
+    threads = [threading.Thread(target=canvas_api.get_api_key, args=(f"u{i}",)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(db.created) == 1
+
+
+def test_cached_tokens_stay_out_of_dumps(db):
+    canvas_api.get_api_key("u1")
+    canvas_api.get_api_key("u2")
+    cached = [canvas_api._tokens.get("u1"), canvas_api._tokens.get("u2")]
+    dumped = repr(cached) + str(cached[0]) + repr(canvas_api._tokens._data)
+    assert "tok-1" not in dumped
+    assert dumped.startswith("[<secret>, <secret: empty>]")
+    with pytest.raises(TypeError):
+        pickle.dumps(cached[0])
+
+
+def test_fetch_canvas_info_requires_a_token(db):
+    with pytest.raises(ValueError, match="Canvas token not set"):
+        canvas_api.fetch_canvas_info("u2")
+
+
+@pytest.mark.parametrize("method, path, body, expected", [
+    ("post", "/api/profile/canvas-token", {"canvas_token": "tok-2"}, "tok-2"),
+    ("delete", "/api/profile/canvas-token", None, None),
+    ("put", "/api/profile/me", {"canvas_token": "tok-3"}, "tok-3"),
+])
+def test_profile_token_writes_invalidate_the_cache(db, monkeypatch, method, path, body, expected):
+    monkeypatch.setattr(profile_routes, "get_supabase_client", lambda: db)
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(profile_routes.profile, url_prefix="/api/profile")
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = "u1"
+
+    assert canvas_api.get_api_key("u1") == "tok-1"
+    assert getattr(client, method)(path, json=body).status_code == 200
+    assert canvas_api.get_api_key("u1") == expected
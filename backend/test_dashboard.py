@@ -0,0 +1,127 @@
+"""Tests for the materialized dashboard timeline (merge, ordering and version compare-and-set)."""
+import copy
+from types import SimpleNamespace
+
+import pytest
+
+import dashboard
+
+
+class Query:
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.op, self.payload, self.filters = "select", None, []
+
+    def select(self, *_):
+        return self
+
+    def limit(self, *_):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def update(self, payload):
+        self.op, self.payload = "update", payload
+        return self
+
+    def insert(self, payload):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self.db.run(self))
+
+
+class FakeSupabase:
+    """In-memory tables; before_update(table) runs just before each update (a concurrent writer)."""
+
+    def __init__(self):
+        self.tables = {dashboard.DASHBOARD_TABLE: [], "notifications": []}
+        self.before_update = None
+        self.updates = 0
+
+    def table(self, name):
+        return Query(self, name)
+
+    def run(self, q):
+        rows = self.tables[q.table]
+        if q.op == "insert":
+            if any(r["user_id"] == q.payload["user_id"] for r in rows):
+                raise RuntimeError("duplicate key value violates unique constraint")
+            rows.append(copy.deepcopy(q.payload))
+            return [copy.deepcopy(q.payload)]
+        if q.op == "update":
+            self.updates += 1
+            if self.before_update:
+                self.before_update(rows)
+        matched = [r for r in rows if all(r.get(c) == v for c, v in q.filters)]
+        if q.op == "update":
+            for r in matched:
+                r.update(copy.deepcopy(q.payload))
+        return copy.deepcopy(matched)
+
+
+def _notification(i, **fields):
+    return {"id": i, "summary": f"n{i}", "category": "event", "urgency": "medium", "event_date": "EMPTY", **fields}
+
+
+def test_first_write_creates_then_merges_by_key():
+    db = FakeSupabase()
+    dashboard.apply_notification_changes("u1", [_notification(1), _notification(2)], db)
+    row = dashboard.apply_notification_changes("u1", [_notification(1, completed=True)], db)
+    assert row["version"] == 2
+    assert [(i["key"], i["completed"]) for i in row["items"]] == [("n:2", False), ("n:1", True)]
+    assert row["items"][1]["date"] == ""  # EMPTY placeholders are cleaned
+
+
+def test_concurrent_writer_is_not_overwritten():
+    db = FakeSupabase()
+    dashboard.apply_notification_changes("u1", [_notification(1)], db)
+
+    def other_worker(rows):
+        # Another process merges n:9 between our read and our compare-and-set.
+        db.before_update = None
+        rows[0]["items"] = rows[0]["items"] + [dashboard.item_from_notification(_notification(9))]
+        rows[0]["version"] += 1
+
+    db.before_update = other_worker
+    row = dashboard.apply_notification_changes("u1", [_notification(2)], db)
+    assert db.updates == 2  # first CAS lost, retried on the new version
+    assert row["version"] == 3
+    assert {i["key"] for i in row["items"]} == {"n:1", "n:2", "n:9"}
+
+
+def test_gives_up_after_repeated_conflicts():
+    db = FakeSupabase()
+    dashboard.apply_notification_changes("u1", [_notification(1)], db)
+
+    def always_bump(rows):
+        rows[0]["version"] += 1
+
+    db.before_update = always_bump
+    with pytest.raises(RuntimeError):
+        dashboard._apply("u1", [dashboard.item_from_notification(_notification(2))], supabase=db)
+    assert dashboard.apply_notification_changes("u1", [_notification(2)], db) is None  # never raises
+
+
+def test_canvas_refresh_replaces_only_canvas_items_and_orders_by_urgency():
+    db = FakeSupabase()
+    dashboard.apply_notification_changes("u1", [_notification(1, urgency="Low")], db)
+    old = {"courses": [{"name": "CSE 100", "assignments": [{"id": 5, "name": "old", "due_at": None}]}]}
+    dashboard.apply_canvas_info("u1", old, db)
+    new = {"courses": [{"name": "CSE 100", "assignments": [{"id": 6, "name": "PA3", "due_at": "2026-02-03T07:59:00Z"}],
+                        "announcements": [{"id": 7, "title": "Welcome", "posted_at": "2026-01-05T18:00:00Z"}]}]}
+    row = dashboard.apply_canvas_info("u1", new, db)
+    assert [i["key"] for i in row["items"]] == ["ca:6", "cn:7", "n:1"]  # high > medium > low
+    assert row["canvas_synced_at"]
+
+
+def test_sort_puts_open_items_first_and_undated_last():
+    items = [
+        {"key": "a", "completed": True, "urgency": "ultra high", "date": "2026-01-01"},
+        {"key": "b", "urgency": "high", "date": ""},
+        {"key": "c", "urgency": "high", "date": "2026-02-01"},
+    ]
+    assert [i["key"] for i in dashboard.sort_timeline(items)] == ["c", "b", "a"]
@@ -0,0 +1,73 @@
+"""Tests for LLM input compaction of email bodies."""
+from email_compact import compact_body, compact_emails
+
+
+def test_gmail_reply_history_is_cut():
+    body = (
+        "Sounds good, see you at 3pm.\n\n"
+        "On Mon, Jan 19, 2026 at 9:12 AM Alex <alex@ucsd.edu> wrote:\n"
+        "> Can we meet Tuesday?\n"
+    )
+    assert compact_body(body) == "Sounds good, see you at 3pm."
+
+
+def test_outlook_reply_header_is_cut():
+    body = (
+        "Approved.\n\n"
+        "From: Registrar <registrar@ucsd.edu>\n"
+        "Sent: Monday, January 19, 2026 9:12 AM\n"
+        "To: Student\n"
+        "Subject: Petition\n\n"
+        "Your petition was received.\n"
+    )
+    assert compact_body(body) == "Approved."
+
+
+def test_gmail_forward_keeps_the_forwarded_message():
+    body = (
+        "FYI see below.\n\n"
+        "---------- Forwarded message ---------\n"
+        "From: Prof. Lee <lee@ucsd.edu>\n"
+        "Date: Mon, Jan 19, 2026 at 9:12 AM\n"
+        "Subject: CSE 100 midterm\n"
+        "To: cse100-students@ucsd.edu\n\n"
+        "The midterm is moved to Friday, Feb 6 at 10am in CENTR 115.\n"
+    )
+    compacted = compact_body(body)
+    assert compacted.startswith("FYI see below.")
+    assert "Subject: CSE 100 midterm" in compacted
+    assert compacted.endswith("The midterm is moved to Friday, Feb 6 at 10am in CENTR 115.")
+
+
+def test_apple_mail_forward_keeps_message_but_cuts_its_own_history():
+    body = (
+        "Begin forwarded message:\n\n"
+        "From: TA <ta@ucsd.edu>\n"
+        "Date: January 19, 2026 at 9:12:00 AM PST\n"
+        "Subject: Lab 3\n\n"
+        "Lab 3 is due Thursday at 11:59pm.\n\n"
+        "On Sun, Jan 18, 2026 at 8:00 PM Student <s@ucsd.edu> wrote:\n"
+        "> When is lab 3 due?\n"
+    )
+    compacted = compact_body(body)
+    assert "Lab 3 is due Thursday at 11:59pm." in compacted
+    assert "When is lab 3 due" not in compacted and "wrote:" not in compacted
+
+
+def test_tracking_urls_footers_and_signatures_removed():
+    body = (
+        "Register: https://events.ucsd.edu/e/42?utm_source=mail&id=7&fbclid=x\n"
+        "Tracked: https://click.mailer.example.com/abc\n"
+        "Unsubscribe from this list\n"
+        "-- \n"
+        "Jane Doe, Student Org\n"
+    )
+    assert compact_body(body) == "Register: https://events.ucsd.edu/e/42?id=7\nTracked:"
+
+
+def test_html_bodies_are_reduced_and_capped():
+    body = "<html><style>p{}</style><p>Hello <a href='https://x.edu/a'>link</a></p>" + "<p>word</p>" * 500
+    compacted, stats = compact_emails([{"body": body}], max_body_tokens=20)
+    assert compacted[0]["body"].startswith("Hello link https://x.edu/a")
+    assert compacted[0]["body"].endswith("…[truncated]")
+    assert stats["body_tokens_after"] < stats["body_tokens_before"]
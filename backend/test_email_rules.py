@@ -0,0 +1,53 @@
+"""Tests for the rule-based email pre-classifier (email_rules.json)."""
+from datetime import datetime
+
+import pytest
+
+from email_rules import classify_email, load_rules
+
+TODAY = datetime(2026, 1, 20)
+ANNOUNCEMENT_LINK = "https://canvas.ucsd.edu/courses/61234/discussion_topics/889911"
+
+
+def _canvas(subject: str, body: str) -> dict:
+    return {"from": "Canvas <notifications@instructure.com>", "subject": subject, "body": body}
+
+
+def _classify(email: dict):
+    return classify_email(email, load_rules(), TODAY)
+
+
+def test_canvas_announcement_extracted():
+    action, rule, row = _classify(_canvas(
+        "Welcome to the course: CSE 110 - Software Engineering [WI26]",
+        f"Hi all, welcome! Office hours are listed on the syllabus page.\n{ANNOUNCEMENT_LINK}",
+    ))
+    assert (action, rule) == ("extract", "canvas-announcement")
+    assert row["summary"] == "Canvas Announcement: Welcome to the course"
+    assert row["link"] == ANNOUNCEMENT_LINK
+
+
+@pytest.mark.parametrize("subject, body", [
+    ("Assignment Graded: Lab 1, CSE 11", "https://canvas.ucsd.edu/courses/1/assignments/2/submissions/3"),
+    ("Submission Comment: HW 2, CSE 110", "https://canvas.ucsd.edu/courses/1/assignments/2/submissions/3"),
+    ("Midterm moved: CSE 100 WI26", f"The midterm is moved to Friday, Feb 6.\n{ANNOUNCEMENT_LINK}"),
+    ("Room change: CSE 100 WI26", f"Lecture is in CENTR 115 from next week.\n{ANNOUNCEMENT_LINK}"),
+    ("lab notes: cse 15l", f"Notes are posted.\n{ANNOUNCEMENT_LINK}"),
+])
+def test_non_announcements_and_dated_announcements_go_to_llm(subject, body):
+    action, _, row = _classify(_canvas(subject, body))
+    assert action == "llm" and row is None
+
+
+def test_canvas_assignment_extracted_with_due_date():
+    action, rule, row = _classify(_canvas(
+        "Assignment Created - PA3, CSE 100",
+        "A new assignment has been created.\ndue: Feb 3 at 11:59pm\nhttps://canvas.ucsd.edu/courses/1/assignments/2",
+    ))
+    assert (action, rule) == ("extract", "canvas-assignment")
+    assert (row["event_date"], row["event_time"]) == ("2026-02-03", "11:59 PM")
+
+
+def test_noise_is_ignored():
+    action, rule, _ = _classify({"from": "TritonToGo <noreply@tritontogo.ucsd.edu>", "subject": "Your order", "body": ""})
+    assert (action, rule) == ("ignore", "tritontogo")
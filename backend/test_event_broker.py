@@ -0,0 +1,228 @@
+"""Tests for cross-process event fan-out (event_broker) and serving /api/events on gevent."""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import event_broker
+import event_hub
+from event_hub import EventHub
+
+START = 1_800_000_000.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEventsTable:
+    """user_events stand-in shared by every "process" of a test: bigserial ids, created_at from a clock."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.rows = []
+        self.inserts = []
+        self._next_id = 1
+
+    def add(self, user_id, event_type, data=None, created_at=None, event_id=None):
+        event_id = event_id or self._next_id
+        self._next_id = max(self._next_id, event_id + 1)
+        self.rows.append({"id": event_id, "user_id": user_id, "type": event_type, "data": data or {},
+                          "created_at": self.clock() if created_at is None else created_at})
+
+    def client(self):
+        return SimpleNamespace(table=lambda name: FakeQuery(self, name))
+
+
+class FakeQuery:
+    def __init__(self, db, name):
+        assert name == "user_events"
+        self.db = db
+        self.op = None
+        self.filters = []
+        self.window = None
+
+    def insert(self, rows):
+        self.op, self.payload = "insert", rows
+        return self
+
+    def select(self, columns):
+        self.op = "select"
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def gte(self, column, value):
+        ts = datetime.fromisoformat(value).timestamp()
+        self.filters.append(lambda r: r[column] >= ts)
+        return self
+
+    def lt(self, column, value):
+        ts = datetime.fromisoformat(value).timestamp()
+        self.filters.append(lambda r: r[column] < ts)
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end)
+        return self
+
+    def execute(self):
+        if self.op == "insert":
+            self.db.inserts.append(len(self.payload))
+            for row in self.payload:
+                self.db.add(row["user_id"], row["type"], row["data"])
+            return SimpleNamespace(data=self.payload)
+        matched = sorted((r for r in self.db.rows if all(f(r) for f in self.filters)), key=lambda r: r["id"])
+        if self.op == "delete":
+            self.db.rows = [r for r in self.db.rows if r not in matched]
+            return SimpleNamespace(data=matched)
+        start, end = self.window
+        return SimpleNamespace(data=[dict(r) for r in matched[start:end + 1]])
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def table(clock):
+    return FakeEventsTable(clock)
+
+
+def _worker(table, clock):
+    hub = EventHub()
+    return hub, event_broker.EventRelay(hub, supabase_factory=table.client, clock=clock)
+
+
+def test_event_from_cli_process_reaches_every_worker(table, clock):
+    (hub_a, relay_a), (hub_b, relay_b) = _worker(table, clock), _worker(table, clock)
+    sub_a, sub_b = hub_a.subscribe("u1"), hub_b.subscribe("u1")
+
+    cli = event_broker.Outbox(supabase_factory=table.client)
+    cli.put("u1", "notification.created", {"id": 7, "event_date": datetime(2027, 1, 5).date()})
+    cli.put("u2", "sync.finished", {})
+    assert cli.flush() == 2 and table.inserts == [2]
+
+    clock.now += 1
+    assert relay_a.poll_once() == 2 and relay_b.poll_once() == 2
+    (a,), (b,) = sub_a.get(timeout=0), sub_b.get(timeout=0)
+    assert (a.id, a.type, a.data) == (b.id, b.type, b.data) == (1, "notification.created", {"id": 7, "event_date": "2027-01-05"})
+    # Same ids everywhere, so Last-Event-ID works on whichever worker the client reconnects to.
+    with hub_b.subscribe("u2", after=0) as late:
+        assert [e.id for e in late.get(timeout=0)] == [2]
+
+
+def test_relay_delivers_each_row_once_including_late_commits(table, clock):
+    hub, relay = _worker(table, clock)
+    sub = hub.subscribe("u1")
+    table.add("u1", "notification.created", {"n": 1}, event_id=11)
+    clock.now += 1
+    relay.poll_once()
+    # id 10 commits after 11 was delivered, with a created_at from before that poll.
+    table.add("u1", "notification.created", {"n": 0}, created_at=clock.now - 2, event_id=10)
+    clock.now += 1
+    relay.poll_once()
+    clock.now += 1
+    relay.poll_once()
+    assert [e.id for e in sub.get(timeout=0)] == [11, 10]
+
+
+def test_relay_skips_history_and_deletes_old_rows(table, clock):
+    table.add("u1", "notification.created", created_at=START - 3600)
+    table.add("u1", "notification.created", created_at=START - 60)
+    hub, relay = _worker(table, clock)
+    sub = hub.subscribe("u1")
+    clock.now += 1
+    assert relay.poll_once() == 0
+    clock.now += 600
+    relay.poll_once()
+    assert [r["created_at"] for r in table.rows] == [START - 60]
+    assert sub.get(timeout=0) == []
+
+
+def test_outbox_thread_batches_a_burst(table):
+    outbox = event_broker.Outbox(supabase_factory=table.client, flush_seconds=0.05)
+    for i in range(20):
+        outbox.put("u1", "notification.updated", {"id": i})
+    deadline = time.monotonic() + 5
+    while len(table.rows) < 20 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert table.inserts == [20]
+
+
+def test_outbox_drops_failed_batches_without_raising(caplog):
+    def broken():
+        raise ConnectionError("supabase down")
+
+    outbox = event_broker.Outbox(supabase_factory=broken)
+    outbox._rows.append({"user_id": "u1", "type": "sync.finished", "data": {}})
+    assert outbox.flush() == 0
+    assert "supabase down" in caplog.text
+
+
+def test_publish_goes_through_the_broker_when_enabled(monkeypatch):
+    sent = []
+    monkeypatch.setattr(event_broker, "EVENT_BROKER", "supabase")
+    monkeypatch.setattr(event_broker, "publish", lambda *args: sent.append(args))
+    with event_hub.get_hub().subscribe("u1") as sub:
+        assert event_hub.publish("u1", "sync.started", {}) is None
+        assert sub.get(timeout=0) == []
+    assert sent == [("u1", "sync.started", {})]
+
+
+# --- serving /api/events without a thread per client ---
+
+@pytest.mark.skipif(os.name == "nt", reason="gunicorn needs a POSIX system")
+def test_gevent_worker_holds_many_streams_on_one_worker():
+    pytest.importorskip("gunicorn")
+    pytest.importorskip("gevent")
+    import bench_server
+
+    port = bench_server._free_port()
+    env = {**os.environ, "GUNICORN_ACCESS_LOG": "", "GUNICORN_LOG_LEVEL": "warning", "EVENT_BROKER": "local",
+           "GUNICORN_GRACEFUL_TIMEOUT": "1",  # open streams would otherwise hold shutdown for 30 s
+           "SUPABASE_URL": os.environ.get("SUPABASE_URL") or "http://127.0.0.1:9",
+           "SUPABASE_KEY": os.environ.get("SUPABASE_KEY") or "test"}
+    cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+           "--workers", "1", "--threads", "1", "--worker-class", "gevent", "bench_server:bench_app()"]
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), env=env, stdout=subprocess.DEVNULL)
+    streams = []
+    try:
+        bench_server._wait_for(port, proc)
+        for _ in range(40):
+            s = socket.create_connection(("127.0.0.1", port), timeout=10)
+            s.sendall(b"GET /api/events HTTP/1.1\r\nHost: test\r\n\r\n")
+            streams.append(s)
+        for s in streams:
+            head = b""
+            while b"retry: 3000" not in head:
+                chunk = s.recv(4096)
+                assert chunk, head
+                head += chunk
+            assert head.startswith(b"HTTP/1.1 200")
+        # Forty open streams on one single-threaded worker, and it still answers other requests.
+        with socket.create_connection(("127.0.0.1", port), timeout=10) as s:
+            s.sendall(b"GET /api/events/poll HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n")
+            assert s.recv(4096).startswith(b"HTTP/1.1 200")
+    finally:
+        for s in streams:
+            s.close()
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
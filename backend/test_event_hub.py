@@ -0,0 +1,55 @@
+"""Quick test: in-process event hub fan-out, replay and overflow (no Flask, no network)."""
+
+import threading
+
+from event_hub import EventHub
+
+
+def test_fan_out_only_to_that_user():
+    hub = EventHub()
+    a1, a2, b = hub.subscribe("a"), hub.subscribe("a"), hub.subscribe("b")
+    hub.publish("a", "notification.created", {"id": 1})
+
+    assert [e.data for e in a1.get(timeout=0)] == [{"id": 1}]
+    assert [e.data for e in a2.get(timeout=0)] == [{"id": 1}]
+    assert b.get(timeout=0) == []
+
+
+def test_blocked_subscriber_wakes_on_publish():
+    hub = EventHub()
+    sub = hub.subscribe("a")
+    got = []
+    waiter = threading.Thread(target=lambda: got.extend(sub.get(timeout=5)))
+    waiter.start()
+    hub.publish("a", "sync.finished", {})
+    waiter.join(timeout=5)
+
+    assert [e.type for e in got] == ["sync.finished"]
+
+
+def test_resume_after_last_event_id():
+    hub = EventHub()
+    first = hub.publish("a", "notification.created", {"id": 1})
+    hub.publish("a", "notification.created", {"id": 2})
+    with hub.subscribe("a", after=first.id) as sub:
+        assert [e.data["id"] for e in sub.get(timeout=0)] == [2]
+    assert hub.subscriber_count("a") == 0
+
+
+def test_slow_subscriber_gets_resync():
+    hub = EventHub(max_queue=3, replay_size=3)
+    sub = hub.subscribe("a")
+    for i in range(5):
+        hub.publish("a", "notification.created", {"id": i})
+    assert [e.type for e in sub.get(timeout=0)] == ["resync"]
+
+    late = hub.subscribe("a", after=0)
+    assert [e.type for e in late.get(timeout=0)] == ["resync"]
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"{name}...")
+            fn()
+    print("ALL TESTS PASSED")
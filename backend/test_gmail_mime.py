@@ -0,0 +1,117 @@
+"""Tests for Gmail MIME body extraction."""
+import base64
+
+import email_api
+from gmail_mime import extract_body
+
+
+def _b64(text: str, charset: str = "utf-8") -> str:
+    return base64.urlsafe_b64encode(text.encode(charset)).decode().rstrip("=")
+
+
+def _part(mime: str, text: str, charset: str = "utf-8", **extra) -> dict:
+    headers = [{"name": "Content-Type", "value": f'{mime}; charset="{charset}"'}]
+    return {"mimeType": mime, "headers": headers, "body": {"data": _b64(text, charset)}, **extra}
+
+
+def test_plain_text_preferred_over_html():
+    payload = {"mimeType": "multipart/alternative", "parts": [
+        _part("text/html", "<p>HTML version</p>"),
+        _part("text/plain", "Plain version"),
+    ]}
+    assert extract_body(payload) == "Plain version"
+
+
+def test_html_converted_when_no_plain_part_and_nesting_kept_in_order():
+    payload = {"mimeType": "multipart/mixed", "parts": [
+        {"mimeType": "multipart/related", "parts": [_part("text/html", "<div>First</div><br><a href='https://x.edu'>link</a>")]},
+        _part("text/html", "<p>Second</p>"),
+    ]}
+    body = extract_body(payload)
+    assert body.index("First") < body.index("link https://x.edu") < body.index("Second")
+    assert "<" not in body
+
+
+def test_attachments_skipped():
+    payload = {"mimeType": "multipart/mixed", "parts": [
+        _part("text/plain", "Body text"),
+        _part("text/plain", "notes.txt contents", filename="notes.txt"),
+        {"mimeType": "text/plain", "filename": "", "body": {"attachmentId": "abc", "size": 10}},
+        _part("text/plain", "inline disposition attachment",
+              headers=[{"name": "Content-Disposition", "value": "attachment; filename=a.txt"}]),
+    ]}
+    assert extract_body(payload) == "Body text"
+
+
+def test_charset_and_byte_cap():
+    payload = _part("text/plain", "Café — résumé " * 100)
+    capped = extract_body(payload, max_bytes=40)
+    assert len(capped.encode("utf-8")) <= 40 + 3  # a split multi-byte char becomes one replacement char
+    assert capped.startswith("Café")
+    latin = _part("text/plain", "Café", charset="iso-8859-1")
+    assert extract_body(latin) == "Café"
+
+
+def test_empty_or_non_text_payloads():
+    assert extract_body({}) == ""
+    assert extract_body({"mimeType": "image/png", "body": {"data": _b64("x")}}) == ""
+    assert extract_body({"mimeType": "text/plain", "body": {"data": "!!not base64!!"}}) == ""
+
+
+def test_deep_nesting_does_not_recurse():
+    payload = _part("text/plain", "deep")
+    for _ in range(5000):
+        payload = {"mimeType": "multipart/mixed", "parts": [payload]}
+    assert extract_body(payload) == "deep"
+
+
+class _Call:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeGmail:
+    """Just enough of googleapiclient's Gmail service; records the messages.get arguments."""
+
+    def __init__(self, message):
+        self.message = message
+        self.gets = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, **kwargs):
+        return _Call({"messages": [{"id": self.message["id"]}]})
+
+    def get(self, **kwargs):
+        self.gets.append(kwargs)
+        return _Call(self.message)
+
+
+def _gmail_message():
+    payload = {"mimeType": "multipart/alternative", "headers": [{"name": "Subject", "value": "HW 3"}],
+               "parts": [_part("text/plain", "Homework 3 is due Friday")]}
+    return {"id": "m1", "snippet": "Homework 3", "payload": payload}
+
+
+def test_parsing_fetch_decodes_full_bodies(monkeypatch):
+    gmail = FakeGmail(_gmail_message())
+    monkeypatch.setattr(email_api, "get_gmail_service", lambda creds=None: gmail)
+    [email] = email_api.get_emails_last_month(max_results=1, creds=object())
+    assert gmail.gets[0]["format"] == "full"
+    assert (email["subject"], email["body"]) == ("HW 3", "Homework 3 is due Friday")
+
+
+def test_inbox_listing_fetches_headers_only(monkeypatch):
+    gmail = FakeGmail(_gmail_message())
+    monkeypatch.setattr(email_api, "build", lambda *args, **kwargs: gmail)
+    [email] = email_api.fetch_emails_with_creds(object(), max_results=1)
+    assert gmail.gets[0]["format"] == "metadata"
+    assert gmail.gets[0]["metadataHeaders"] == ["Subject", "From", "Date", "List-Id"]
+    assert email["subject"] == "HW 3" and "body" not in email
@@ -0,0 +1,70 @@
+"""Tests for the hedged Gemini client as driven from synchronous code (call_llm, stream_llm_chunks)."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import llm_client
+import parse_notifications
+from llm_client import AsyncGeminiClient
+
+API_KEY = "test-key"
+
+
+class LoopBoundGenai:
+    """Like google.genai's aio transport: bound to the first event loop it is used on."""
+
+    def __init__(self):
+        self.loop = None
+        self.calls = []
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(
+                generate_content=self._generate_content,
+                generate_content_stream=self._generate_content_stream,
+            )
+        )
+
+    def _check_loop(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        elif self.loop is not loop:
+            raise RuntimeError("Event loop is closed")
+
+    async def _generate_content(self, model, contents, config=None):
+        self._check_loop()
+        self.calls.append(model)
+        return SimpleNamespace(text="ok")
+
+    async def _generate_content_stream(self, model, contents, config=None):
+        self._check_loop()
+        self.calls.append(model)
+
+        async def chunks():
+            for text in ("a|", "b\n"):
+                yield SimpleNamespace(text=text)
+
+        return chunks()
+
+
+@pytest.fixture
+def genai(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", API_KEY)
+    fake = LoopBoundGenai()
+    llm_client.install_async_client(
+        API_KEY, AsyncGeminiClient(models=["m1", "m2"], genai_client=fake, prompt_cache=None)
+    )
+    yield fake
+    llm_client._default_clients.pop(API_KEY, None)
+
+
+def test_back_to_back_calls_stay_on_the_preferred_model(genai):
+    assert parse_notifications.call_llm("first") == "ok"
+    assert parse_notifications.call_llm("second") == "ok"
+    assert genai.calls == ["m1", "m1"]
+
+
+def test_streaming_shares_the_loop_with_call_llm(genai):
+    assert parse_notifications.call_llm("first") == "ok"
+    assert "".join(parse_notifications.stream_llm_chunks("second")) == "a|b\n"
+    assert genai.calls == ["m1", "m1"]
@@ -0,0 +1,75 @@
+"""Tests for the offline LLM record/replay layer."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from llm_replay import ReplayGenaiClient, ReplayMiss, fixture_key
+
+CONFIG = {"system_instruction": "Parse notifications.", "response_mime_type": "application/json"}
+
+
+class FakeInner:
+    def __init__(self):
+        self.calls = 0
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(generate_content=self._generate, generate_content_stream=self._stream),
+            caches=SimpleNamespace(create=self._create_cache),
+        )
+
+    async def _generate(self, model, contents, config=None):
+        self.calls += 1
+        return SimpleNamespace(text=f"[{contents}]", usage_metadata=SimpleNamespace(prompt_token_count=7))
+
+    async def _stream(self, model, contents, config=None):
+        self.calls += 1
+
+        async def chunks():
+            for text in ("[", contents, "]"):
+                yield SimpleNamespace(text=text, usage_metadata=None)
+
+        return chunks()
+
+    async def _create_cache(self, model, config=None):
+        return SimpleNamespace(name="cachedContents/real-1")
+
+
+async def _collect(stream):
+    return [chunk.text async for chunk in stream]
+
+
+def test_recorded_responses_replay_without_the_inner_client(tmp_path):
+    inner = FakeInner()
+    recorder = ReplayGenaiClient("record", fixtures_dir=str(tmp_path), inner=inner)
+    recorded = asyncio.run(recorder.aio.models.generate_content(model="m1", contents="a", config=CONFIG))
+    chunks = asyncio.run(_collect(
+        asyncio.run(recorder.aio.models.generate_content_stream(model="m1", contents="b", config=CONFIG))
+    ))
+    assert inner.calls == 2
+
+    replay = ReplayGenaiClient("replay", fixtures_dir=str(tmp_path))
+    # Fixtures are not keyed by model: a replay works whichever model is picked.
+    replayed = asyncio.run(replay.aio.models.generate_content(model="m2", contents="a", config=CONFIG))
+    assert replayed.text == recorded.text == "[a]"
+    assert replayed.usage_metadata.prompt_token_count == 7
+    stream = asyncio.run(replay.aio.models.generate_content_stream(model="m2", contents="b", config=CONFIG))
+    assert asyncio.run(_collect(stream)) == chunks == ["[", "b", "]"]
+
+
+def test_missing_fixture_raises(tmp_path):
+    replay = ReplayGenaiClient("replay", fixtures_dir=str(tmp_path))
+    with pytest.raises(ReplayMiss):
+        asyncio.run(replay.aio.models.generate_content(model="m1", contents="never recorded", config=CONFIG))
+
+
+def test_key_ignores_whether_the_prompt_was_context_cached(tmp_path):
+    replay = ReplayGenaiClient("replay", fixtures_dir=str(tmp_path))
+    cache = asyncio.run(replay.aio.caches.create(model="m1", config={"system_instruction": CONFIG["system_instruction"]}))
+    cached_config = {**CONFIG, "system_instruction": None, "cached_content": cache.name}
+    assert fixture_key("a", cached_config, replay.cached_prompts) == fixture_key("a", CONFIG)
+    assert fixture_key("a", CONFIG) != fixture_key("a", {**CONFIG, "response_mime_type": None})
+
+
+def test_record_mode_needs_an_inner_client():
+    with pytest.raises(ValueError):
+        ReplayGenaiClient("record")
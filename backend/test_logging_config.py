@@ -0,0 +1,69 @@
+"""Tests for the queue-backed structured logging setup."""
+import io
+import json
+import logging
+
+import pytest
+
+import logging_config
+
+
+@pytest.fixture
+def json_log():
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    quiet = {name: logging.getLogger(name).level for name in logging_config._QUIET_LOGGERS}
+    stream = io.StringIO()
+    logging_config.configure_logging(level="DEBUG", fmt="json", stream=stream)
+
+    def lines():
+        logging_config.shutdown_logging()  # drains the queue
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield lines
+    logging_config.shutdown_logging()
+    root.handlers, root.level = saved_handlers, saved_level
+    for name, level in quiet.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def test_json_lines_carry_extra_fields(json_log):
+    logging.getLogger("routes.canvas").info("fetched %d courses", 4, extra={"user": "abc123"})
+    (entry,) = json_log()
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "routes.canvas"
+    assert entry["msg"] == "fetched 4 courses"
+    assert entry["user"] == "abc123"
+
+
+def test_exception_rendered_by_writer(json_log):
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logging.getLogger("sync").exception("sync failed")
+    (entry,) = json_log()
+    assert "RuntimeError: boom" in entry["exc"]
+
+
+def test_sampling_drops_and_keeps(json_log):
+    log = logging.getLogger("emails")
+    for _ in range(50):
+        log.debug("dropped", extra={"sample_rate": 0.0})
+    log.debug("kept", extra={"sample_rate": 1.0})
+    entries = json_log()
+    assert [e["msg"] for e in entries] == ["kept"]
+    assert entries[0]["sample_rate"] == 1.0
+
+
+def test_http_client_request_lines_suppressed(json_log):
+    logging.getLogger("httpx").info('HTTP Request: GET https://canvas.test/api/v1/courses "HTTP/1.1 200 OK"')
+    logging.getLogger("httpcore.connection").debug("connect_tcp.started")
+    logging.getLogger("httpx").warning("retrying")
+    logging.getLogger("routes.canvas").debug("still shown")
+    assert [e["msg"] for e in json_log()] == ["retrying", "still shown"]
+
+
+def test_user_ref_is_stable_and_short():
+    assert logging_config.user_ref("user-1") == logging_config.user_ref("user-1")
+    assert len(logging_config.user_ref("user-1")) == 12
+    assert logging_config.user_ref(None) == "-"
@@ -0,0 +1,62 @@
+"""Tests for the in-process metrics registry and Prometheus rendering."""
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from flask import Flask
+
+import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = metrics.Histogram("t_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        hist.observe(value, stage="canvas")
+    text = "\n".join(hist.render())
+    assert 't_seconds_bucket{stage="canvas",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="canvas",le="1"} 3' in text
+    assert 't_seconds_bucket{stage="canvas",le="+Inf"} 4' in text
+    assert 't_seconds_count{stage="canvas"} 4' in text
+    assert 't_seconds_sum{stage="canvas"} 4.050000' in text
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("t_total", "test", ("target",))
+    counter.inc(target='a"b\\c')
+    assert 't_total{target="a\\"b\\\\c"} 1' in counter.render()
+
+
+def test_timed_counts_errors():
+    before = metrics.STAGE_SECONDS.count(stage="test", target="boom")
+    with pytest.raises(ValueError):
+        with metrics.timed("test", "boom"):
+            raise ValueError("x")
+    assert metrics.STAGE_SECONDS.count(stage="test", target="boom") == before + 1
+    assert metrics.STAGE_ERRORS.value(stage="test", target="boom") >= 1
+
+
+def test_supabase_requests_timed_per_table():
+    transport = httpx.MockTransport(lambda req: httpx.Response(200, json=[]))
+    client = SimpleNamespace(postgrest=SimpleNamespace(session=httpx.Client(transport=transport)))
+    metrics.instrument_supabase(client)
+    before = metrics.STAGE_SECONDS.count(stage="supabase", target="notifications")
+    client.postgrest.session.get("https://x.supabase.co/rest/v1/notifications?select=id")
+    assert metrics.STAGE_SECONDS.count(stage="supabase", target="notifications") == before + 1
+
+
+def test_route_latency_and_metrics_endpoint(monkeypatch):
+    from routes.metrics import metrics_bp
+
+    app = Flask(__name__)
+    metrics.init_app(app)
+    app.register_blueprint(metrics_bp)
+    app.add_url_rule("/api/items/<int:item_id>", "item", lambda item_id: "ok")
+    client = app.test_client()
+    client.get("/api/items/7")
+    monkeypatch.setenv("INTERNAL_API_TOKEN", "scrape-secret")
+    resp = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert resp.status_code == 200
+    assert resp.content_type.startswith("text/plain; version=0.0.4")
+    body = resp.get_data(as_text=True)
+    assert 'route="/api/items/<int:item_id>",status="200"' in body
+    assert client.get("/metrics").status_code == 403
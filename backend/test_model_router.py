@@ -0,0 +1,79 @@
+"""Tests for model routing statistics and their persistence between runs."""
+import pytest
+from flask import Flask
+
+import llm_client
+from model_router import ModelRouter, load_router_states, save_router_states
+from routes.internal import internal
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_slow_model_ranked_last_and_sets_hedge_delay():
+    router = ModelRouter(["m1", "m2"], clock=FakeClock())
+    for _ in range(5):
+        router.record_success("m1", 9.0)
+        router.record_success("m2", 1.5)
+    assert router.rank() == ["m2", "m1"]
+    assert router.expected_latency("m2") == 1.5
+
+
+def test_state_round_trip_keeps_ranking_and_cooldown(tmp_path):
+    path = str(tmp_path / "router.json")
+    router = ModelRouter(["m1", "m2", "m3"])
+    router.record_failure("m1", 2.0)
+    router.record_success("m2", 1.0)
+    router.mark_rate_limited("m3", 600)
+    save_router_states({"abcd1234": router}, path)
+    save_router_states({"ffff0000": ModelRouter(["m1"])}, path)  # other keys are merged, not replaced
+
+    states = load_router_states(path)
+    assert set(states) == {"abcd1234", "ffff0000"}
+    restored = ModelRouter(["m1", "m2", "m3"])
+    restored.load_state(states["abcd1234"])
+    assert restored.rank() == ["m2", "m1", "m3"]
+    assert restored.is_rate_limited("m3")
+    assert restored.expected_latency("m2") == 1.0
+
+
+def test_missing_or_disabled_state_is_empty(tmp_path):
+    assert load_router_states(str(tmp_path / "missing.json")) == {}
+    assert load_router_states("") == {}
+
+
+def test_internal_endpoint_reads_saved_stats(tmp_path, monkeypatch):
+    path = str(tmp_path / "router.json")
+    router = ModelRouter(["m1"])
+    router.record_success("m1", 2.0)
+    save_router_states({"abcd1234": router}, path)
+    monkeypatch.setattr(llm_client, "load_router_states", lambda: load_router_states(path))
+    monkeypatch.setenv("INTERNAL_API_TOKEN", "ops-secret")
+
+    app = Flask(__name__)
+    app.register_blueprint(internal, url_prefix="/internal")
+    body = app.test_client().get("/internal/llm/models", headers={"X-Internal-Token": "ops-secret"}).get_json()
+    assert body["abcd1234"]["ranking"] == ["m1"]
+    assert body["abcd1234"]["models"]["m1"]["latency_p50"] == 2.0
+
+
+@pytest.mark.parametrize("token, headers", [
+    ("", {}),  # not configured: closed even to localhost (a same-host proxy makes every request local)
+    ("", {"X-Internal-Token": ""}),
+    ("ops-secret", {}),
+    ("ops-secret", {"X-Internal-Token": "ops-secre"}),
+    ("ops-secret", {"Authorization": "Bearer wrong"}),
+    ("ops-secret", {"X-Internal-Token": "\u00e9t\u00e9"}),
+])
+def test_internal_endpoint_fails_closed(monkeypatch, token, headers):
+    monkeypatch.setenv("INTERNAL_API_TOKEN", token)
+    app = Flask(__name__)
+    app.register_blueprint(internal, url_prefix="/internal")
+    resp = app.test_client().get("/internal/llm/models", headers=headers,
+                                 environ_base={"REMOTE_ADDR": "127.0.0.1"})
+    assert resp.status_code == 403
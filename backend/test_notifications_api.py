@@ -0,0 +1,199 @@
+"""Tests for the notifications list / update endpoints against a recording fake Supabase client."""
+from types import SimpleNamespace
+
+import base64
+import json
+
+import pytest
+from flask import Flask
+
+import routes.profile as profile_routes
+
+USER_ID = "user-1"
+
+
+class FakeQuery:
+    """Chainable PostgREST query stand-in: records every builder call, answers execute() from a script."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args))
+            return self
+        return call
+
+    def execute(self):
+        self.db.queries.append(self)
+        return SimpleNamespace(data=self.db.results.pop(0) if self.db.results else [])
+
+    def args_of(self, name):
+        return [args for call, args in self.calls if call == name]
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.results = []
+        self.queries = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeSupabase()
+    monkeypatch.setattr(profile_routes, "get_supabase_client", lambda: fake)
+    monkeypatch.setattr(profile_routes, "apply_notification_changes", lambda *args: None)
+    return fake
+
+
+@pytest.fixture
+def client(db):
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(profile_routes.profile, url_prefix="/api/profile")
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = USER_ID
+    return client
+
+
+def _row(i, created_at):
+    return {"id": i, "summary": f"n{i}", "created_at": created_at, "updated_at": created_at}
+
+
+def test_cursor_round_trip():
+    cursor = profile_routes._encode_cursor({"created_at": "2026-01-20T10:00:00+00:00", "id": 42})
+    assert profile_routes._decode_cursor(cursor) == ("2026-01-20T10:00:00+00:00", 42)
+    with pytest.raises(ValueError):
+        profile_routes._decode_cursor("not-a-cursor")
+    uid = "9b2f5a4e-3c1d-4e8f-a6b7-0c9d8e7f6a5b"
+    cursor = profile_routes._encode_cursor({"created_at": "2026-01-20T10:00:00.12345Z", "id": uid.upper()})
+    assert profile_routes._decode_cursor(cursor) == ("2026-01-20T10:00:00.123450+00:00", uid)
+
+
+def _raw_cursor(created_at, row_id):
+    raw = json.dumps({"c": created_at, "i": row_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("query", [
+    "urgency=high\",or(user_id.neq.x",
+    "urgency=high),or(id.gt.0",
+    "urgency=urgent",
+    "date_from=2026-01-01,or(id.gt.0)",
+    "limit=5&cursor=" + _raw_cursor('2026-01-02",or(user_id.neq.x', 1),
+    "limit=5&cursor=" + _raw_cursor("2026-01-02", "1),or(id.gt.0"),
+    "limit=5&cursor=" + _raw_cursor("2026-01-02", True),
+    "limit=5&cursor=" + _raw_cursor(None, 1),
+    "updated_since=2026-01-01&cursor=" + _raw_cursor("2026-01-02", [1]),
+])
+def test_hostile_filter_and_cursor_values_are_rejected(client, db, query):
+    resp = client.get("/api/profile/notifications?" + query.replace(",", "%2C").replace('"', "%22"))
+    assert resp.status_code == 400
+    assert db.queries == []
+
+
+def test_urgency_filter_accepts_known_values_in_any_case(client, db):
+    client.get("/api/profile/notifications?urgency=Ultra High,LOW")
+    assert db.queries[-1].args_of("or_") == [('urgency.ilike."ultra high",urgency.ilike."low"',)]
+
+
+def test_keyset_pages_follow_the_cursor(client, db):
+    db.results = [[_row(3, "2026-01-03"), _row(2, "2026-01-02"), _row(1, "2026-01-01")]]
+    page = client.get("/api/profile/notifications?limit=2").get_json()
+    assert [r["id"] for r in page["items"]] == [3, 2]
+    first = db.queries[-1]
+    assert first.args_of("limit") == [(3,)]  # one extra row detects the next page
+    assert first.args_of("order") == [("created_at",), ("id",)]
+
+    db.results = [[_row(1, "2026-01-01")]]
+    page = client.get(f"/api/profile/notifications?limit=2&cursor={page['next_cursor']}").get_json()
+    assert [r["id"] for r in page["items"]] == [1] and page["next_cursor"] is None
+    assert db.queries[-1].args_of("or_") == [
+        ('created_at.lt."2026-01-02T00:00:00",and(created_at.eq."2026-01-02T00:00:00",id.lt.2)',)]
+
+
+def test_delta_mode_orders_by_update_and_reports_high_water_mark(client, db):
+    db.results = [[_row(5, "2026-01-05T00:00:00"), _row(6, "2026-01-06T00:00:00")]]
+    body = client.get("/api/profile/notifications?updated_since=2026-01-04T00:00:00").get_json()
+    query = db.queries[-1]
+    assert query.args_of("gt") == [("updated_at", "2026-01-04T00:00:00")]
+    assert query.args_of("order") == [("updated_at",), ("id",)]
+    assert body["updated_since"] == "2026-01-06T00:00:00"
+
+
+def test_filters_and_projection(client, db):
+    client.get("/api/profile/notifications?category=exam,assignment&completed=false&fields=summary&date_to=2026-02-01")
+    query = db.queries[-1]
+    assert query.args_of("select") == [("created_at,id,summary",)]
+    assert ("category", ["exam", "assignment"]) in query.args_of("in_")
+    assert ("completed", False) in query.args_of("eq")
+    assert query.args_of("lte") == [("event_date", "2026-02-01")]
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=201", "cursor=!!", "fields=password", "completed=maybe",
+                                   "updated_since=yesterday"])
+def test_bad_parameters_are_rejected(client, db, query):
+    assert client.get(f"/api/profile/notifications?{query}").status_code == 400
+    assert db.queries == []
+
+
+def test_etag_answers_304_until_the_list_changes(client, db):
+    rows = [_row(1, "2026-01-01T00:00:00+00:00")]
+    db.results = [list(rows)]
+    first = client.get("/api/profile/notifications")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.headers["Last-Modified"]
+
+    db.results = [list(rows)]
+    assert client.get("/api/profile/notifications", headers={"If-None-Match": etag}).status_code == 304
+    db.results = [rows + [_row(2, "2026-01-02T00:00:00+00:00")]]
+    assert client.get("/api/profile/notifications", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_bulk_update_by_filter_scopes_to_the_user(client, db):
+    db.results = [[{"id": 1, "completed": True}]]
+    resp = client.patch("/api/profile/notifications/bulk", json={"completed": True, "filter": {"urgency": "High"}})
+    assert resp.status_code == 200 and resp.get_json()["count"] == 1
+    query = db.queries[-1]
+    assert query.args_of("update") == [({"completed": True},)]
+    assert ("user_id", USER_ID) in query.args_of("eq")
+    assert query.args_of("or_") == [('urgency.ilike."high"',)]
+
+
+@pytest.mark.parametrize("body", [
+    {"completed": True, "filter": {"urgncy": "High"}},
+    {"completed": True, "filter": {"urgency": "High", "source": "Canvas"}},
+    {"completed": True, "filter": {}},
+    {"completed": True, "filter": {"urgency": "", "category": []}},
+    {"completed": True, "filter": {"urgency": ['high",or(id.gt.0']}},
+    {"completed": True, "filter": {"date_to": {"$gt": 1}}},
+    {"completed": True, "ids": [1], "filter": {"urgency": "High"}},
+    {"completed": "yes", "ids": [1]},
+    {"completed": True, "ids": ["x"]},
+])
+def test_bulk_update_rejects_bodies_that_could_touch_the_wrong_rows(client, db, body):
+    resp = client.patch("/api/profile/notifications/bulk", json=body)
+    assert resp.status_code == 400
+    assert db.queries == []
+
+
+def test_batch_validates_everything_before_writing(client, db):
+    ops = [{"op": "create", "summary": "ok"}, {"op": "update", "id": 3}]
+    resp = client.post("/api/profile/notifications/batch", json={"operations": ops})
+    assert resp.status_code == 400
+    assert resp.get_json()["details"] == [{"index": 1, "error": "completed (boolean) is required"}]
+    assert db.queries == []
+
+
+def test_batch_results_in_request_order(client, db):
+    db.results = [[{"id": 10, "summary": "new"}], [{"id": 3, "completed": True}]]
+    ops = [{"op": "update", "id": 3, "completed": True}, {"op": "create", "summary": "new"},
+           {"op": "update", "id": 4, "completed": True}]
+    results = client.post("/api/profile/notifications/batch", json={"operations": ops}).get_json()["results"]
+    assert [(r["op"], r["status"]) for r in results] == [("update", 200), ("create", 201), ("update", 404)]
@@ -0,0 +1,114 @@
+"""Tests for parsing the LLM response into notification rows."""
+import json
+from datetime import datetime
+
+from parse_notifications import (
+    COLUMNS,
+    JsonRowDecoder,
+    build_llm_request,
+    iter_deduped,
+    iter_lines,
+    iter_llm_rows,
+    parse_llm_output,
+)
+
+TODAY = datetime(2026, 1, 20)
+
+ROWS = [
+    {"source": "Piazza", "category": "announcement", "event_date": None, "event_time": None,
+     "urgency": "Low", "link": None, "summary": "Office hours moved to room 2154"},
+    {"source": "Prof. Lee", "category": "exam", "event_date": "2026-02-06", "event_time": "10:00 AM",
+     "urgency": "High", "link": "https://example.edu/midterm", "summary": "CSE 100 midterm"},
+    {"source": "Unknown", "category": "spam", "event_date": None, "event_time": None,
+     "urgency": "Low", "link": None, "summary": "You won a prize"},
+]
+
+
+def _pipe(row: dict) -> str:
+    return "|".join("null" if row[c] is None else row[c] for c in COLUMNS)
+
+
+def test_json_and_pipe_outputs_parse_to_the_same_rows():
+    from_json = parse_llm_output(json.dumps(ROWS), "json")
+    from_pipe = parse_llm_output("\n".join(_pipe(r) for r in ROWS), "pipe")
+    assert from_json == from_pipe
+    assert [r["category"] for r in from_json] == ["exam", "announcement"]  # spam dropped, exams first
+    assert from_json[1]["event_date"] == "" and from_json[1]["link"] == ""
+
+
+def test_json_output_keeps_pipes_in_text():
+    (row,) = parse_llm_output(json.dumps([{**ROWS[0], "summary": "Lab | Section B moved"}]), "json")
+    assert row["summary"] == "Lab | Section B moved"
+
+
+def test_json_output_tolerates_code_fences_and_missing_keys():
+    raw = '```json\n[{"source": "Canvas", "category": "assignment", "summary": "PA2 due"}]\n```'
+    (row,) = parse_llm_output(raw, "json")
+    assert set(row) == set(COLUMNS)
+    assert row["summary"] == "PA2 due" and row["event_time"] == ""
+
+
+def test_malformed_rows_are_skipped():
+    assert parse_llm_output("only|three|columns\n\n# comment", "pipe") == []
+    assert parse_llm_output('[{"source": "x", "summary": oops}]', "json") == []
+
+
+def test_json_mode_requests_schema_constrained_output():
+    _, config = build_llm_request("FROM: a", "json")
+    assert config.response_mime_type == "application/json"
+    assert config.response_schema is not None
+    _, config = build_llm_request("FROM: a", "pipe")
+    assert config.response_mime_type is None
+
+
+def test_json_decoder_handles_every_chunk_boundary():
+    raw = json.dumps([
+        {"source": "Canvas", "category": "exam", "summary": 'Quiz {1} "review" \\ notes'},
+        {"source": "Piazza", "category": "event", "summary": "Lunch}, then [talk]"},
+    ])
+    expected = json.loads(raw)
+    for size in (1, 2, 3, 7, len(raw)):
+        decoder = JsonRowDecoder()
+        objs = []
+        for i in range(0, len(raw), size):
+            objs.extend(decoder.feed(raw[i : i + size]))
+        assert objs == expected, size
+
+
+def test_json_decoder_returns_rows_as_soon_as_they_close():
+    decoder = JsonRowDecoder()
+    assert decoder.feed('[{"summary": "a"}, {"summ') == [{"summary": "a"}]
+    assert decoder.feed('ary": "b"') == []
+    assert decoder.feed("}]") == [{"summary": "b"}]
+
+
+def test_json_decoder_skips_malformed_object_and_continues():
+    decoder = JsonRowDecoder()
+    assert decoder.feed('[{"summary": oops}, {"summary": "ok"}]') == [{"summary": "ok"}]
+
+
+def test_iter_lines_rejoins_split_lines_and_flushes_the_tail():
+    assert list(iter_lines(["a|b", "|c\nd|", "e\nf"])) == ["a|b|c", "d|e", "f"]
+
+
+def test_streamed_rows_are_yielded_before_the_response_ends():
+    consumed = []
+
+    def chunks():
+        for chunk in ('[{"source": "Canvas", "category": "exam", "summary": "Midterm"}', ", ", '{"summary": "x"}]'):
+            consumed.append(chunk)
+            yield chunk
+
+    rows = iter_llm_rows(chunks(), "json", TODAY)
+    first = next(rows)
+    assert first["summary"] == "Midterm" and len(consumed) == 1
+    assert [r["summary"] for r in rows] == ["x"]
+
+
+def test_iter_deduped_drops_near_duplicates_from_the_same_source():
+    rows = [
+        {"source": "Canvas", "category": "assignment", "event_date": "2026-02-03", "summary": "PA3 is due."},
+        {"source": "Canvas", "category": "assignment", "event_date": "2026-02-03", "summary": "PA3 is due!"},
+        {"source": "Piazza", "category": "assignment", "event_date": "2026-02-03", "summary": "PA3 is due."},
+    ]
+    assert [r["source"] for r in iter_deduped(iter(rows))] == ["Canvas", "Piazza"]
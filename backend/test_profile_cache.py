@@ -0,0 +1,171 @@
+"""Tests for the verified session-token cache and the cached /me profile (routes/profile.py)."""
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+from itsdangerous.timed import TimestampSigner
+
+import routes.profile as profile_routes
+from ttl_cache import TTLCache
+
+USER_ID = "user-1"
+START = 1_800_000_000.0
+
+
+class FakeClock:
+    def __init__(self, now=START):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProfiles:
+    """profiles table stand-in: select() answers the current row, update() changes it; counts selects."""
+
+    def __init__(self, row):
+        self.row = row
+        self.selects = 0
+        self._update = None
+
+    def table(self, name):
+        assert name == "profiles"
+        return self
+
+    def select(self, *args):
+        self.selects += 1
+        self._update = None
+        return self
+
+    def update(self, data):
+        self._update = data
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def execute(self):
+        if self._update is not None:
+            self.row = {**self.row, **self._update}
+        return SimpleNamespace(data=[dict(self.row)])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # Tokens are signed and checked on the same fake wall clock as the caches.
+    monkeypatch.setattr(TimestampSigner, "get_timestamp", lambda self: int(clock()))
+    monkeypatch.setattr(profile_routes, "_verified_tokens", TTLCache(maxsize=2, ttl=3600, clock=clock))
+    monkeypatch.setattr(profile_routes, "_profiles", TTLCache(maxsize=16, ttl=30, clock=clock))
+    monkeypatch.setattr(profile_routes, "invalidate_api_key", lambda user_id: None)
+    return clock
+
+
+@pytest.fixture
+def db(monkeypatch, clock):
+    fake = FakeProfiles({"id": USER_ID, "full_name": "Ada", "canvas_token": "secret"})
+    monkeypatch.setattr(profile_routes, "get_supabase_client", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def client(db):
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(profile_routes.profile, url_prefix="/api/profile")
+    return app.test_client()
+
+
+@pytest.fixture
+def token_loads(monkeypatch):
+    """Counts signature checks done by the real serializer."""
+    calls = []
+    real = profile_routes._session_token_serializer
+
+    def counting():
+        serializer = real()
+        loads = serializer.loads
+
+        def counted(*args, **kwargs):
+            calls.append(args[0])
+            return loads(*args, **kwargs)
+
+        serializer.loads = counted
+        return serializer
+
+    monkeypatch.setattr(profile_routes, "_session_token_serializer", counting)
+    return calls
+
+
+def _token(user_id=USER_ID):
+    return profile_routes._session_token_serializer().dumps({"user_id": user_id})
+
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_session_token_signature_checked_once(clock, token_loads):
+    token = _token()
+    assert profile_routes._verify_session_token(token) == USER_ID
+    assert profile_routes._verify_session_token(token) == USER_ID
+    assert len(token_loads) == 1
+
+
+def test_token_cache_is_bounded_lru(clock, token_loads):
+    a, b, c = _token("a"), _token("b"), _token("c")
+    for token in (a, b, a, c):  # c evicts b, the least recently used
+        profile_routes._verify_session_token(token)
+    assert len(token_loads) == 3
+    profile_routes._verify_session_token(a)
+    profile_routes._verify_session_token(b)
+    assert token_loads[3:] == [b]
+
+
+def test_cached_token_expires_with_the_token(client, clock):
+    token = _token()
+    assert client.get("/api/profile/me", headers=_bearer(token)).status_code == 200
+    clock.now = START + profile_routes.SESSION_TOKEN_MAX_AGE + 60
+    res = client.get("/api/profile/me", headers=_bearer(token))
+    assert (res.status_code, res.get_json()) == (401, {"error": "Session expired"})
+
+
+def test_tampered_token_rejected(client):
+    res = client.get("/api/profile/me", headers=_bearer(_token() + "x"))
+    assert (res.status_code, res.get_json()) == (401, {"error": "Invalid token"})
+
+
+def test_me_served_from_cache_without_canvas_secret(client, db):
+    headers = _bearer(_token())
+    first = client.get("/api/profile/me", headers=headers).get_json()
+    second = client.get("/api/profile/me", headers=headers).get_json()
+    assert first == second == {"id": USER_ID, "full_name": "Ada", "has_canvas_token": True}
+    assert db.selects == 1
+
+
+def test_me_cache_expires(client, db, clock):
+    headers = _bearer(_token())
+    client.get("/api/profile/me", headers=headers)
+    clock.now += 31
+    client.get("/api/profile/me", headers=headers)
+    assert db.selects == 2
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ("put", "/api/profile/me", {"full_name": "Grace"}),
+    ("post", "/api/profile/canvas-token", {"canvas_token": "new"}),
+    ("delete", "/api/profile/canvas-token", None),
+])
+def test_profile_writes_invalidate_me(client, db, method, path, body):
+    token = _token()
+    with client.session_transaction() as sess:
+        sess["user_id"] = USER_ID
+    client.get("/api/profile/me", headers=_bearer(token))
+    assert getattr(client, method)(path, json=body).status_code == 200
+    me = client.get("/api/profile/me", headers=_bearer(token)).get_json()
+    assert me == {"id": USER_ID, **{k: v for k, v in db.row.items() if k not in ("id", "canvas_token")},
+                  "has_canvas_token": bool(db.row["canvas_token"])}
+    assert db.selects == 2
@@ -0,0 +1,70 @@
+"""Tests for the opt-in sampling profiler."""
+import os
+import threading
+import time
+
+from flask import Flask
+
+import profiling
+
+
+def _busy(ms: float):
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        sum(range(200))
+
+
+def test_recording_writes_folded_stacks(tmp_path):
+    sampler = profiling.Sampler(interval_ms=1)
+    recording = sampler.start(profiling.Recording("job", threading.get_ident()))
+    _busy(60)
+    sampler.stop(recording)
+    paths = recording.write(str(tmp_path))
+    wall = next(p for p in paths if p.endswith(".wall.folded"))
+    lines = open(wall, encoding="utf-8").read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("_busy (test_profiling.py" in line for line in lines)
+
+
+def test_profile_run_logs_written_files(tmp_path, caplog):
+    with caplog.at_level("INFO", logger="profiling"):
+        with profiling.profile_run("run_gmail", "user-1", directory=str(tmp_path)):
+            _busy(60)
+    written = sorted(os.path.join(tmp_path, name) for name in os.listdir(tmp_path))
+    assert written and all(os.path.basename(p).startswith("run_gmail-") for p in written)
+    assert sorted(r.args[0] for r in caplog.records if r.getMessage().startswith("profile written")) == written
+
+
+def _app(tmp_path, monkeypatch, threshold_ms):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    app = Flask(__name__)
+    app.secret_key = "test"
+    profiling.init_app(app, threshold_ms=threshold_ms)
+
+    @app.route("/api/slow")
+    def slow():
+        _busy(50)
+        return "ok"
+
+    @app.route("/api/fast")
+    def fast():
+        return "ok"
+
+    return app
+
+
+def test_slow_request_profile_named_by_route_and_user(tmp_path, monkeypatch):
+    client = _app(tmp_path, monkeypatch, threshold_ms=20).test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = "user-1"
+    client.get("/api/fast")
+    assert os.listdir(tmp_path) == []
+    client.get("/api/slow")
+    names = os.listdir(tmp_path)
+    prefix = f"GET_api_slow-{profiling.user_ref('user-1')}-"
+    assert names and all(n.startswith(prefix) for n in names)
+
+
+def test_disabled_registers_nothing(tmp_path, monkeypatch):
+    app = _app(tmp_path, monkeypatch, threshold_ms=0)
+    assert not app.before_request_funcs and not app.teardown_request_funcs
@@ -0,0 +1,149 @@
+"""Quick test: context caching of the parse system prompt against a local fake Gemini client (no network)."""
+
+import asyncio
+from types import SimpleNamespace
+
+from llm_client import AsyncGeminiClient
+from prompt_cache import PromptCache
+
+# Long enough to pass the minimum cacheable size (~1,024 tokens for Flash models).
+SYSTEM_PROMPT = "You are a notification parser. " * 150
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeGenai:
+    """Records cache creations and the config of every generate_content call."""
+
+    def __init__(self, cache_error=None):
+        self.cache_error = cache_error
+        self.created = []
+        self.requests = []
+        self.live_caches = set()
+        self.deleted = []
+        self.aio = SimpleNamespace(
+            caches=SimpleNamespace(create=self._create_cache, delete=self._delete_cache),
+            models=SimpleNamespace(generate_content=self._generate_content),
+        )
+
+    async def _create_cache(self, model, config=None):
+        if self.cache_error:
+            raise RuntimeError(self.cache_error)
+        name = f"cachedContents/{model}-{len(self.created)}"
+        self.created.append((model, config["system_instruction"]))
+        self.live_caches.add(name)
+        return SimpleNamespace(name=name)
+
+    async def _delete_cache(self, name):
+        self.deleted.append(name)
+        self.live_caches.discard(name)
+
+    async def _generate_content(self, model, contents, config=None):
+        self.requests.append(config)
+        cached = config.get("cached_content")
+        if cached and cached not in self.live_caches:
+            raise RuntimeError("403 PERMISSION_DENIED: CachedContent not found (or permission denied)")
+        return SimpleNamespace(text="ok")
+
+
+def _client(fake, clock=None, state_path=None, model="m1"):
+    cache = PromptCache(fake, ttl_seconds=24 * 60 * 60, clock=clock or FakeClock(), state_path=state_path)
+    return AsyncGeminiClient(models=[model], genai_client=fake, prompt_cache=cache)
+
+
+def _config(prompt=SYSTEM_PROMPT):
+    return {"system_instruction": prompt, "temperature": 0}
+
+
+def test_cache_created_once_and_reused():
+    fake = FakeGenai()
+    client = _client(fake)
+    for _ in range(3):
+        assert asyncio.run(client.generate("Today is 2026-01-05.\n\nCONTENT TO PARSE:\nx", _config())) == "ok"
+
+    assert fake.created == [("m1", SYSTEM_PROMPT)]
+    for config in fake.requests:
+        assert config["cached_content"] == "cachedContents/m1-0"
+        assert config["system_instruction"] is None
+
+
+def test_cache_refreshed_after_a_day():
+    fake = FakeGenai()
+    clock = FakeClock()
+    client = _client(fake, clock)
+    asyncio.run(client.generate("a", _config()))
+    clock.now += 24 * 60 * 60
+    asyncio.run(client.generate("b", _config()))
+
+    assert len(fake.created) == 2
+    assert fake.requests[-1]["cached_content"] == "cachedContents/m1-1"
+    assert fake.deleted == ["cachedContents/m1-0"]
+
+
+def test_cache_reused_by_the_next_run(tmp_path):
+    state = str(tmp_path / "prompt_cache.json")
+    fake = FakeGenai()
+    clock = FakeClock()
+    asyncio.run(_client(fake, clock, state).generate("a", _config()))
+    clock.now += 60 * 60
+    asyncio.run(_client(fake, clock, state).generate("b", _config()))  # a new process, same state file
+
+    assert len(fake.created) == 1
+    assert fake.requests[-1]["cached_content"] == "cachedContents/m1-0"
+
+
+def test_changed_prompt_retires_the_old_cache_once_expired(tmp_path):
+    state = str(tmp_path / "prompt_cache.json")
+    fake = FakeGenai()
+    clock = FakeClock()
+    asyncio.run(_client(fake, clock, state).generate("a", _config()))
+    clock.now += 24 * 60 * 60
+    asyncio.run(_client(fake, clock, state).generate("b", _config(SYSTEM_PROMPT + "v2")))
+
+    assert fake.deleted == ["cachedContents/m1-0"]
+
+
+def test_prompt_below_minimum_is_not_cached():
+    fake = FakeGenai()
+    asyncio.run(_client(fake).generate("a", _config("Short prompt.")))
+    asyncio.run(_client(fake, model="gemini-pro-latest").generate("b", _config()))  # Pro needs 4,096 tokens
+
+    assert fake.created == []
+    assert all(config["system_instruction"] for config in fake.requests)
+
+
+def test_falls_back_inline_when_caching_unavailable():
+    fake = FakeGenai(cache_error="400 INVALID_ARGUMENT: cached content is too small")
+    client = _client(fake)
+    asyncio.run(client.generate("a", _config()))
+    asyncio.run(client.generate("b", _config()))
+
+    for config in fake.requests:
+        assert config.get("cached_content") is None
+        assert config["system_instruction"] == SYSTEM_PROMPT
+
+
+def test_expired_cache_is_dropped_and_request_retried_inline():
+    fake = FakeGenai()
+    client = _client(fake)
+    asyncio.run(client.generate("a", _config()))
+    fake.live_caches.clear()  # server-side expiry
+
+    assert asyncio.run(client.generate("b", _config())) == "ok"
+    assert fake.requests[-1]["system_instruction"] == SYSTEM_PROMPT
+    asyncio.run(client.generate("c", _config()))
+    assert len(fake.created) == 2
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"{name}...")
+            fn()
+    print("ALL TESTS PASSED")
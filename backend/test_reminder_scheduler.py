@@ -0,0 +1,174 @@
+"""Quick test: timer wheel and reminder scheduler (fake clock, no Supabase)."""
+
+import logging
+import os
+import random
+import tempfile
+import threading
+from unittest import mock
+
+import reminder_scheduler
+from reminder_scheduler import ReminderScheduler, TimerWheel, acquire_lock, deadline_timestamp, release_lock
+
+START = 1_800_000_000.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+
+def test_wheel_fires_in_order_across_levels():
+    wheel = TimerWheel(start=START)
+    rng = random.Random(7)
+    dues = {f"t{i}": START + rng.randint(1, 40 * 24 * 3600) for i in range(2000)}
+    for key, due in dues.items():
+        wheel.add(key, due)
+    wheel.cancel("t0")
+
+    fired = []
+    now = START
+    while len(wheel):
+        now += 3600
+        for timer in wheel.advance(now):
+            assert timer.due <= now < timer.due + 3600 + 1
+            fired.append(timer.key)
+    assert sorted(fired) == sorted(k for k in dues if k != "t0")
+
+
+def test_wheel_overflow_beyond_top_level():
+    wheel = TimerWheel(start=START, wheel_sizes=(8, 4))
+    wheel.add("far", START + 100)
+    assert [t.key for t in wheel.advance(START + 99)] == []
+    assert [t.key for t in wheel.advance(START + 100)] == ["far"]
+
+
+def test_reminders_fire_at_offsets_and_cancel_on_completion():
+    clock = FakeClock()
+    fired = []
+    scheduler = ReminderScheduler(offsets_minutes=(1440, 60), on_fire=fired.append, clock=clock)
+    deadline = START + 2 * 24 * 3600
+    row = {"id": 1, "user_id": "u", "summary": "PA1", "completed": False}
+    assert scheduler.schedule("u", "n:1", deadline, "PA1") == 2
+
+    clock.now = deadline - 1440 * 60
+    scheduler.tick()
+    assert [p["minutes_before"] for p in fired] == [1440]
+
+    scheduler.schedule_notification({**row, "completed": True, "event_date": "2027-01-01"})
+    clock.now = deadline
+    scheduler.tick()
+    assert len(fired) == 1
+
+
+def test_failed_delivery_is_logged_and_does_not_stop_the_tick():
+    clock = FakeClock()
+    fired = []
+
+    def on_fire(payload):
+        if payload["item"] == "n:1":
+            raise RuntimeError("hub down")
+        fired.append(payload["item"])
+
+    scheduler = ReminderScheduler(offsets_minutes=(60,), on_fire=on_fire, clock=clock)
+    scheduler.schedule("u", "n:1", START + 2 * 3600, "A")
+    scheduler.schedule("u", "n:2", START + 2 * 3600 + 60, "B")
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("reminder_scheduler")
+    logger.addHandler(handler)
+    try:
+        assert scheduler.tick(START + 3 * 3600) == 2
+    finally:
+        logger.removeHandler(handler)
+    assert fired == ["n:2"]
+    assert [(r.levelno, "hub down" in r.getMessage()) for r in records] == [(logging.WARNING, True)]
+
+
+def test_reminders_are_published_through_the_broker():
+    sent = []
+    with mock.patch.object(reminder_scheduler.event_broker, "EVENT_BROKER", "supabase"), \
+            mock.patch.object(reminder_scheduler.event_broker, "publish", lambda *args: sent.append(args)):
+        clock = FakeClock()
+        scheduler = ReminderScheduler(offsets_minutes=(60,), clock=clock)
+        scheduler.schedule("u", "n:1", START + 2 * 3600, "Quiz 3")
+        assert scheduler.tick(START + 3600) == 1
+    ((user_id, event_type, payload),) = sent
+    assert (user_id, event_type, payload["title"], payload["minutes_before"]) == ("u", "reminder.due", "Quiz 3", 60)
+
+
+def test_state_round_trip():
+    clock = FakeClock()
+    scheduler = ReminderScheduler(offsets_minutes=(60,), on_fire=lambda p: None, clock=clock)
+    scheduler.schedule_canvas_items("u", [{"kind": "canvas_assignment", "key": "ca:9", "title": "HW",
+                                           "date": "2027-03-01", "time": "23:59"}])
+    scheduler.since = "2027-01-01T00:00:00+00:00"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "state.json")
+        scheduler.save(path)
+        restored = ReminderScheduler(offsets_minutes=(60,), on_fire=lambda p: None, clock=clock)
+        assert restored.load(path)
+    assert len(restored.wheel) == 1
+    assert restored.since == scheduler.since
+    # The restored scheduler still knows the item, so dropping it from the timeline cancels it.
+    restored.schedule_canvas_items("u", [])
+    assert len(restored.wheel) == 0
+
+
+def test_state_written_through_per_process_temp_file():
+    scheduler = ReminderScheduler(offsets_minutes=(60,), on_fire=lambda p: None, clock=FakeClock())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "state.json")
+        with mock.patch.object(reminder_scheduler.os, "replace", wraps=os.replace) as replace:
+            scheduler.save(path)
+        assert replace.call_args.args == (f"{path}.{os.getpid()}.tmp", path)
+        assert os.listdir(tmp) == ["state.json"]
+
+
+def test_only_one_scheduler_holds_the_lock():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "reminders.lock")
+        first = acquire_lock(path)
+        assert first is not None
+        assert acquire_lock(path) is None
+        release_lock(first)
+        second = acquire_lock(path)
+        assert second is not None
+        release_lock(second)
+
+
+def test_standby_worker_takes_over_when_the_holder_exits():
+    started = threading.Event()
+
+    def fake_run(stop, **kwargs):
+        started.set()
+        stop.wait()
+
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(reminder_scheduler, "run", fake_run):
+        path = os.path.join(tmp, "reminders.lock")
+        holder = acquire_lock(path)
+        stop = reminder_scheduler.start_in_background(lock_path=path, retry_seconds=0.01)
+        try:
+            assert not started.wait(0.1)
+            release_lock(holder)
+            assert started.wait(2)
+            assert acquire_lock(path) is None
+        finally:
+            stop.set()
+
+
+def test_deadline_time_formats():
+    assert deadline_timestamp("2027-03-01", "11:59 PM") == deadline_timestamp("2027-03-01", "23:59")
+    assert deadline_timestamp("EMPTY") is None
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            print(f"{name}...")
+            fn()
+    print("ALL TESTS PASSED")
@@ -0,0 +1,81 @@
+"""Tests for the orjson JSON provider and Accept-Encoding response compression."""
+import datetime
+import gzip
+import json
+
+import pytest
+from flask import Flask, jsonify, make_response, request
+from flask.json.provider import DefaultJSONProvider
+
+import compression
+from json_provider import OrjsonProvider, install_json_provider, orjson
+
+ROWS = [{"id": i, "title": f"Assignment {i}", "category": "canvas", "completed": False} for i in range(200)]
+
+
+def _app():
+    app = Flask(__name__)
+    install_json_provider(app)
+    compression.init_compression(app)
+
+    @app.route("/rows")
+    def rows():
+        response = make_response(jsonify(ROWS))
+        response.add_etag()
+        return response.make_conditional(request)
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    return app
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson not installed")
+def test_orjson_output_matches_stdlib_provider():
+    app = Flask(__name__)
+    install_json_provider(app)
+    assert isinstance(app.json, OrjsonProvider)
+    obj = {"b": 1, "a": [1.5, None, "é"], "when": datetime.date(2026, 3, 1)}
+    with app.app_context():
+        fast = json.loads(app.json.dumps(obj))
+        app.json = DefaultJSONProvider(app)
+        assert fast == json.loads(app.json.dumps(obj))
+    assert list(fast) == ["a", "b", "when"]  # sorted like the default provider
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson not installed")
+def test_orjson_falls_back_for_unsupported_values():
+    app = Flask(__name__)
+    install_json_provider(app)
+    assert app.json.loads(app.json.dumps({"big": 2 ** 70})) == {"big": 2 ** 70}
+
+
+def test_gzip_negotiated_and_weak_etag_still_conditional():
+    client = _app().test_client()
+    resp = client.get("/rows", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert json.loads(gzip.decompress(resp.data)) == ROWS
+    etag = resp.headers["ETag"]
+    assert etag.startswith("W/")
+    again = client.get("/rows", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304
+
+
+def test_no_compression_when_not_accepted_or_small():
+    client = _app().test_client()
+    plain = client.get("/rows", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert json.loads(plain.data) == ROWS
+    refused = client.get("/rows", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in refused.headers
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+def test_brotli_preferred_when_available():
+    resp = _app().test_client().get("/rows", headers={"Accept-Encoding": "gzip, br"})
+    assert resp.headers["Content-Encoding"] == "br"
+    assert json.loads(compression.brotli.decompress(resp.data)) == ROWS
@@ -0,0 +1,92 @@
+"""Tests for request tracing: span nesting, propagation, sampling and OTLP export."""
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from flask import Flask
+
+import async_http
+import metrics
+import tracing
+
+
+@pytest.fixture
+def exporter():
+    memory = tracing.MemoryExporter()
+    tracing.configure(memory, sample_rate=1.0)
+    yield memory
+    tracing.configure(None, sample_rate=0.1)
+
+
+def _flush():
+    tracing._processor.flush()
+
+
+def _app(seen_headers):
+    transport = httpx.MockTransport(lambda req: seen_headers.append(dict(req.headers)) or httpx.Response(200, json=[]))
+    supabase = metrics.instrument_supabase(
+        SimpleNamespace(postgrest=SimpleNamespace(session=httpx.Client(transport=transport)))
+    )
+
+    async def upstream():
+        with tracing.span("canvas courses"):
+            return "ok"
+
+    app = Flask(__name__)
+    tracing.init_app(app)
+
+    @app.route("/api/canvas/courses")
+    def courses():
+        with metrics.timed("gmail", "messages.list"):
+            pass
+        supabase.postgrest.session.get("https://x.supabase.co/rest/v1/profiles?select=id")
+        return async_http.run(upstream())
+
+    return app
+
+
+def test_request_spans_nest_and_propagate(exporter):
+    headers = []
+    resp = _app(headers).test_client().get("/api/canvas/courses")
+    _flush()
+    by_name = {s.name: s for s in exporter.spans}
+    root = by_name["GET /api/canvas/courses"]
+    assert resp.headers["X-Trace-Id"] == root.trace_id
+    assert root.parent_id is None and root.attributes["http.status_code"] == 200
+    for name in ("gmail messages.list", "supabase profiles", "canvas courses"):
+        assert by_name[name].trace_id == root.trace_id
+        assert by_name[name].parent_id == root.span_id
+    assert headers[0]["traceparent"] == by_name["supabase profiles"].traceparent
+
+
+def test_incoming_traceparent_is_continued_or_declined(exporter):
+    client = _app([]).test_client()
+    trace_id, parent = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    client.get("/api/canvas/courses", headers={"traceparent": f"00-{trace_id}-{parent}-01"})
+    _flush()
+    root = next(s for s in exporter.spans if s.name.startswith("GET "))
+    assert (root.trace_id, root.parent_id) == (trace_id, parent)
+
+    exporter.spans.clear()
+    resp = client.get("/api/canvas/courses", headers={"traceparent": f"00-{trace_id}-{parent}-00"})
+    _flush()
+    assert exporter.spans == [] and "X-Trace-Id" not in resp.headers
+
+
+def test_unsampled_and_disabled_are_noops():
+    tracing.configure(None)
+    with tracing.span("anything") as span:
+        assert span is None
+    assert tracing.start_trace("job") == (None, None)
+
+
+def test_file_exporter_writes_otlp_json(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    root = tracing.Span("GET /x", "ab" * 16, kind=tracing.KIND_SERVER, attributes={"http.status_code": 200})
+    root.end_ns = root.start_ns + 1000
+    tracing.FileExporter(str(path)).export([root])
+    payload = json.loads(path.read_text().splitlines()[0])
+    span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["traceId"] == "ab" * 16 and span["name"] == "GET /x"
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in span["attributes"]
@@ -0,0 +1,134 @@
+"""Tests for the deadline-heap urgency engine, driven by a fake clock and writer."""
+import json
+from datetime import datetime
+
+import urgency_engine
+from urgency_engine import UrgencyEngine
+
+
+class FakeClock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, urgency, ids):
+        self.calls.append((urgency, list(ids)))
+        return [{"id": i, "urgency": urgency} for i in ids]
+
+
+def _canvas(notif_id, event_date, urgency="High", user_id="u1", **extra):
+    return {"id": notif_id, "user_id": user_id, "source": "Canvas", "event_date": event_date,
+            "urgency": urgency, "completed": False, **extra}
+
+
+def _engine(now, batch_size=200):
+    clock, writer = FakeClock(now), RecordingWriter()
+    return UrgencyEngine(writer=writer, clock=clock, batch_size=batch_size), clock, writer
+
+
+def test_promotes_at_window_start_and_demotes_after_the_event():
+    engine, clock, writer = _engine(datetime(2026, 2, 1, 12))
+    assert engine.track(_canvas(1, "2026-02-10")) is False
+    assert engine.next_change() == datetime(2026, 2, 7)
+
+    assert engine.advance(datetime(2026, 2, 6, 23, 59)) == 0
+    clock.now = datetime(2026, 2, 7, 0, 1)
+    assert engine.advance() == 1
+    assert engine.flush() == [{"id": 1, "urgency": "Ultra High"}]
+    assert engine.next_change() == datetime(2026, 2, 11)
+
+    clock.now = datetime(2026, 2, 11, 0, 1)
+    engine.advance()
+    engine.flush()
+    assert writer.calls == [("Ultra High", [1]), ("High", [1])]
+    assert len(engine) == 0 and engine.next_change() is None  # nothing left to change
+
+
+def test_heap_order_across_users_only_pops_crossed_thresholds():
+    engine, clock, writer = _engine(datetime(2026, 2, 1), batch_size=2)
+    engine.track(_canvas(1, "2026-02-20", user_id="u1"))
+    engine.track(_canvas(2, "2026-02-06", user_id="u2"))
+    engine.track(_canvas(3, "2026-02-06", user_id="u1"))
+    engine.track(_canvas(4, "2026-02-07", user_id="u2"))
+    assert engine.next_change() == datetime(2026, 2, 3)
+
+    assert engine.advance(datetime(2026, 2, 4)) == 3  # ids 2, 3 (window from Feb 3) and 4 (from Feb 4)
+    clock.now = datetime(2026, 2, 4)
+    engine.flush()
+    assert writer.calls == [("Ultra High", [2, 3]), ("Ultra High", [4])]  # batched by batch_size
+    assert engine.next_change() == datetime(2026, 2, 7)  # ids 2 and 3 demote after Feb 6
+
+
+def test_stale_stored_urgency_is_queued_on_track():
+    engine, _, writer = _engine(datetime(2026, 2, 9))
+    assert engine.track(_canvas(1, "2026-02-10", urgency="High")) is True
+    assert engine.track(_canvas(2, "2026-02-10", urgency="Ultra High")) is False
+    engine.flush()
+    assert writer.calls == [("Ultra High", [1])]
+
+
+def test_retracked_and_completed_rows_drop_their_old_heap_entries():
+    engine, clock, writer = _engine(datetime(2026, 2, 1))
+    engine.track(_canvas(1, "2026-02-05"))
+    engine.track(_canvas(1, "2026-03-05"))  # date edited: the Feb 2 crossing is stale
+    engine.track(_canvas(2, "2026-02-05"))
+    engine.track(_canvas(2, "2026-02-05", completed=True))
+    engine.track({**_canvas(3, "2026-02-05"), "source": "Piazza"})
+
+    assert engine.advance(datetime(2026, 2, 3)) == 0
+    assert engine.flush() == [] and writer.calls == []
+    assert engine.next_change() == datetime(2026, 3, 2)
+
+
+def test_saved_state_resumes_and_queues_crossings_missed_while_stopped(tmp_path):
+    path = str(tmp_path / "urgency.json")
+    engine, _, _ = _engine(datetime(2026, 2, 1))
+    engine.track(_canvas(1, "2026-02-10", user_id="u1"))
+    engine.track(_canvas(2, "2026-03-20", user_id="u2"))
+    engine.since = "2026-02-01T00:00:00+00:00"
+    engine.save(path)
+
+    resumed, _, writer = _engine(datetime(2026, 2, 8))  # the Feb 7 window start passed while stopped
+    assert resumed.load(path) is True
+    assert len(resumed) == 2 and resumed.since == "2026-02-01T00:00:00+00:00"
+    resumed.flush()
+    assert writer.calls == [("Ultra High", [1])]
+    assert resumed.next_change() == datetime(2026, 2, 11)
+
+    with open(path, "w") as f:
+        json.dump({"version": 0, "since": "x", "rows": []}, f)
+    assert _engine(datetime(2026, 2, 8))[0].load(path) is False
+    assert _engine(datetime(2026, 2, 8))[0].load(str(tmp_path / "missing.json")) is False
+
+
+def test_once_resumes_from_state_instead_of_rescanning(tmp_path, monkeypatch):
+    path = str(tmp_path / "urgency.json")
+    full_loads, polls = [], []
+
+    def fake_load_initial(engine, supabase):
+        full_loads.append(1)
+        engine.track(_canvas(1, "2099-01-01"))  # stored urgency is current: nothing to write
+
+    def fake_poll_changes(engine, supabase, since):
+        polls.append(since)
+        return "2026-02-02T00:00:00+00:00"
+
+    monkeypatch.setattr(urgency_engine, "load_initial", fake_load_initial)
+    monkeypatch.setattr(urgency_engine, "poll_changes", fake_poll_changes)
+    monkeypatch.setattr(urgency_engine, "_publish_updates", lambda rows: None)
+
+    urgency_engine.run(once=True, state_path=path, supabase=object())
+    assert full_loads == [1] and polls == []
+
+    urgency_engine.run(once=True, state_path=path, supabase=object())
+    assert full_loads == [1] and len(polls) == 1  # second run only fetches rows changed since the first
+    with open(path) as f:
+        state = json.load(f)
+    assert state["since"] == "2026-02-02T00:00:00+00:00" and [row[0] for row in state["rows"]] == [1]
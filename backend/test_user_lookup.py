@@ -0,0 +1,84 @@
+"""Tests for email -> auth user id resolution (RPC, list_users fallback, cache)."""
+from types import SimpleNamespace
+
+import pytest
+from postgrest.exceptions import APIError
+
+import user_lookup
+from user_lookup import find_auth_user_id, forget, remember
+
+NOT_INSTALLED = APIError({
+    "code": "PGRST202",
+    "message": "Could not find the function public.auth_user_id_by_email(p_email) in the schema cache",
+})
+
+
+class FakeSupabase:
+    def __init__(self, users=(), rpc_result=None, rpc_error=None):
+        self.users = [{"id": uid, "email": email} for email, uid in users]
+        self.rpc_result = rpc_result
+        self.rpc_error = rpc_error
+        self.rpc_calls = 0
+        self.pages = []
+        self.auth = SimpleNamespace(admin=SimpleNamespace(list_users=self._list_users))
+
+    def rpc(self, name, params):
+        assert name == "auth_user_id_by_email"
+        self.rpc_calls += 1
+        return SimpleNamespace(execute=self._execute)
+
+    def _execute(self):
+        if self.rpc_error:
+            raise self.rpc_error
+        return SimpleNamespace(data=self.rpc_result)
+
+    def _list_users(self, page, per_page):
+        self.pages.append(page)
+        return self.users[(page - 1) * per_page:page * per_page]
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(user_lookup, "_rpc_available", True)
+    user_lookup._cache.clear()
+    yield
+    user_lookup._cache.clear()
+
+
+def test_rpc_result_is_cached_by_normalized_email():
+    db = FakeSupabase(rpc_result="uid-1")
+    assert find_auth_user_id(db, " Student@UCSD.edu ") == "uid-1"
+    assert find_auth_user_id(db, "student@ucsd.edu") == "uid-1"
+    assert db.rpc_calls == 1
+    forget("STUDENT@ucsd.edu")
+    find_auth_user_id(db, "student@ucsd.edu")
+    assert db.rpc_calls == 2
+
+
+def test_remembered_mapping_skips_supabase():
+    db = FakeSupabase(rpc_error=AssertionError("should not be called"))
+    remember("new@ucsd.edu", "uid-9")
+    assert find_auth_user_id(db, "new@ucsd.edu") == "uid-9"
+
+
+def test_missing_rpc_falls_back_to_paging_once_and_for_all(monkeypatch):
+    monkeypatch.setattr(user_lookup, "_LIST_USERS_PAGE_SIZE", 2)
+    db = FakeSupabase(users=[("a@x.edu", "a"), ("b@x.edu", "b"), ("c@x.edu", "c")], rpc_error=NOT_INSTALLED)
+    assert find_auth_user_id(db, "c@x.edu") == "c"
+    assert db.pages == [1, 2]
+    assert find_auth_user_id(db, "nobody@x.edu") is None
+    assert db.rpc_calls == 1
+
+
+@pytest.mark.parametrize("error", [
+    APIError({"code": "42501", "message": "permission denied for function auth_user_id_by_email"}),
+    TimeoutError("timed out calling /rest/v1/rpc/auth_user_id_by_email"),
+])
+def test_other_rpc_errors_propagate_and_keep_the_rpc(error):
+    db = FakeSupabase(users=[("a@x.edu", "a")], rpc_error=error)
+    with pytest.raises(type(error)):
+        find_auth_user_id(db, "a@x.edu")
+    assert user_lookup._rpc_available
+    assert db.pages == []
+    db.rpc_error, db.rpc_result = None, [{"id": "a"}]
+    assert find_auth_user_id(db, "a@x.edu") == "a"
@@ -0,0 +1,327 @@
+"""
+Lightweight request tracing: one root span per sampled Flask request, child spans for every
+Gmail, Canvas, Gemini and Supabase call made while handling it, exported in the OTLP/JSON format.
+
+    TRACE_EXPORTER      none (default: tracing off, span() is a no-op) / file / otlp
+    TRACE_FILE          file exporter output, one OTLP/JSON batch per line (default traces.jsonl)
+    OTLP_ENDPOINT       otlp exporter base URL; batches are POSTed to {OTLP_ENDPOINT}/v1/traces
+    TRACE_SAMPLE_RATE   fraction of requests traced (default 0.1); an incoming W3C traceparent
+                        header overrides it with the caller's sampled flag
+    TRACE_SERVICE_NAME  service.name resource attribute (default triton-hub-backend)
+
+IDs follow W3C Trace Context: the incoming traceparent is continued, outgoing Canvas, Gmail and
+Supabase requests carry a traceparent for the active span, and sampled responses carry X-Trace-Id.
+Unsampled requests create no span objects at all. Finished spans are queued and exported in
+batches by one background thread, so request threads never wait on the exporter.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+OTLP_ENDPOINT = os.environ.get("OTLP_ENDPOINT", "http://localhost:4318").rstrip("/")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0.1"))
+TRACE_SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "triton-hub-backend")
+TRACE_BATCH_SIZE = 256
+TRACE_FLUSH_SECONDS = 2.0
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+# OTLP span kinds
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+
+_current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+log = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, kind: int = KIND_INTERNAL, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def otlp_payload(spans: list) -> dict:
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", TRACE_SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": "triton-hub"}, "spans": [s.to_otlp() for s in spans]}],
+        }]
+    }
+
+
+class FileExporter:
+    """Appends one OTLP/JSON batch per line (a collector's file receiver can replay it)."""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+
+    def export(self, spans: list):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(otlp_payload(spans)) + "\n")
+
+
+class OtlpHttpExporter:
+    """POSTs OTLP/JSON batches to an OTLP/HTTP collector (e.g. the OpenTelemetry Collector on :4318)."""
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT, timeout: float = 5.0):
+        self.url = f"{endpoint}/v1/traces"
+        self.timeout = timeout
+
+    def export(self, spans: list):
+        body = json.dumps(otlp_payload(spans)).encode("utf-8")
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            resp.read()
+
+
+class MemoryExporter:
+    """Keeps exported spans in a list (tests, or a stand-in for the collector)."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans: list):
+        self.spans.extend(spans)
+
+
+class BatchProcessor:
+    """Queue of finished spans drained by one daemon thread; exporter errors are dropped, never raised."""
+
+    def __init__(self, exporter, batch_size: int = TRACE_BATCH_SIZE, interval: float = TRACE_FLUSH_SECONDS):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, span: Span):
+        self._queue.put(span)
+        if self._pid != os.getpid():  # first use, or first use after a fork
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                    self._thread.start()
+
+    def _drain(self) -> list:
+        spans = []
+        while len(spans) < self.batch_size:
+            try:
+                spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return spans
+
+    def flush(self):
+        while True:
+            spans = self._drain()
+            if not spans:
+                return
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                log.warning("export of %d span(s) failed: %s", len(spans), e)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+
+_processor: BatchProcessor | None = None
+
+
+def configure(exporter=None, sample_rate: float = None):
+    """Set the exporter (None turns tracing off) and sampling rate. Called at import from the environment."""
+    global _processor, TRACE_SAMPLE_RATE
+    if _processor is not None:
+        _processor.flush()
+    _processor = BatchProcessor(exporter) if exporter is not None else None
+    if sample_rate is not None:
+        TRACE_SAMPLE_RATE = sample_rate
+
+
+def enabled() -> bool:
+    return _processor is not None
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def start_span(name: str, kind: int = KIND_INTERNAL, **attributes) -> Span | None:
+    """A child of the active span, not made current (for spans that end in a callback). None when not tracing."""
+    parent = _current.get()
+    if parent is None or _processor is None:
+        return None
+    return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+
+def end_span(span: Span | None, error=None):
+    if span is None:
+        return
+    span.end_ns = time.time_ns()
+    if error is not None:
+        span.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+    if _processor is not None:
+        _processor.submit(span)
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Child span of the active one for the duration of the block; a no-op outside a sampled trace."""
+    child = start_span(name, kind, **attributes)
+    if child is None:
+        yield None
+        return
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        end_span(child, e)
+        raise
+    else:
+        end_span(child)
+    finally:
+        _current.reset(token)
+
+
+def inject(headers: dict) -> dict:
+    """Add a traceparent header for the active span (outgoing HTTP calls). Returns headers."""
+    active = _current.get()
+    if active is not None:
+        headers["traceparent"] = active.traceparent
+    return headers
+
+
+def _parse_traceparent(value: str):
+    match = _TRACEPARENT_RE.match((value or "").strip().lower())
+    if not match or match.group(1) == "0" * 32:
+        return None
+    return match.group(1), match.group(2), int(match.group(3), 16) & 1 == 1
+
+
+def start_trace(name: str, traceparent: str = None, kind: int = KIND_SERVER, **attributes):
+    """
+    Root (or continued) span for an incoming request or a job, made current. Returns (span, token)
+    to pass to finish_trace, or (None, None) when not traced.
+    """
+    if _processor is None:
+        return None, None
+    parsed = _parse_traceparent(traceparent)
+    if parsed:
+        trace_id, parent_id, sampled = parsed
+    else:
+        trace_id, parent_id, sampled = os.urandom(16).hex(), None, random.random() < TRACE_SAMPLE_RATE
+    if not sampled:
+        return None, None
+    root = Span(name, trace_id, parent_id, kind, attributes)
+    return root, _current.set(root)
+
+
+def finish_trace(root: Span | None, token, error=None):
+    if root is None:
+        return
+    try:
+        _current.reset(token)
+    except ValueError:  # finished from a different context than it was started in
+        _current.set(None)
+    end_span(root, error)
+
+
+def init_app(app):
+    """Root span per sampled request, named "<METHOD> <url rule>"; response gets X-Trace-Id."""
+    from flask import g, request
+
+    @app.before_request
+    def _trace_start():
+        if _processor is None:
+            return
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        root, token = start_trace(
+            f"{request.method} {route}",
+            request.headers.get("traceparent"),
+            **{"http.method": request.method, "http.route": route},
+        )
+        if root is not None:
+            g._trace = (root, token)
+
+    @app.after_request
+    def _trace_status(response):
+        trace = g.get("_trace")
+        if trace is not None:
+            trace[0].set_attribute("http.status_code", response.status_code)
+            response.headers["X-Trace-Id"] = trace[0].trace_id
+        return response
+
+    @app.teardown_request
+    def _trace_end(exc):
+        trace = g.pop("_trace", None)
+        if trace is not None:
+            root, token = trace
+            status = root.attributes.get("http.status_code", 500)
+            finish_trace(root, token, exc if exc is not None else (f"HTTP {status}" if status >= 500 else None))
+
+
+def _exporter_from_env():
+    if TRACE_EXPORTER == "file":
+        return FileExporter(TRACE_FILE)
+    if TRACE_EXPORTER == "otlp":
+        return OtlpHttpExporter(OTLP_ENDPOINT)
+    return None
+
+
+configure(_exporter_from_env())
+atexit.register(lambda: _processor is not None and _processor.flush())
@@ -0,0 +1,69 @@
+"""
+Small thread-safe LRU cache with per-entry expiry, for per-process caches in front of Supabase
+and token verification. Each gunicorn worker has its own copy, so a TTL also bounds how long
+another worker can serve a value after it was invalidated here.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: float = None, expires_at: float = None):
+        """Store value for ttl seconds (default self.ttl), or until expires_at on this cache's clock."""
+        if expires_at is None:
+            expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(self, key, loader, ttl: float = None):
+        """Cached value, or loader() stored and returned. A None result is not cached."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(key, value, ttl=ttl)
+        return value
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
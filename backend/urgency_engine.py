@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Time-aware urgency for open Canvas notifications.
+
+Canvas urgency depends on how close the event date is (see canvas_urgency), so a value stored at
+parse time goes stale. UrgencyEngine keeps, per user, a heap of open notifications ordered by the
+moment their urgency next changes (start of the Ultra High window, or the day after the event).
+advance() pops only the entries whose moment has passed, so the work per tick is proportional to
+the number of threshold crossings, not to the number of rows. Changed urgencies are queued and
+written back in batches: one UPDATE ... WHERE id IN (...) per urgency value.
+
+New and edited rows are picked up with a delta query on notifications.updated_at (see
+triton-hub/supabase/notifications_updated_at.sql). The tracked rows and that high-water mark are
+saved to URGENCY_STATE_PATH, so the table is read in full only when there is no state file yet:
+a restart, or the next --once run, resumes from the file and fetches only rows changed since.
+Delete the file to force a full reload.
+
+Run as a worker:   python urgency_engine.py            (loops until interrupted)
+or from cron:      python urgency_engine.py --once     (resume, apply due changes, write, save, exit)
+"""
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from supabase import create_client
+from metrics import instrument_supabase
+
+from dashboard import apply_notification_changes
+from event_hub import publish
+from logging_config import configure_logging
+from parse_notifications import canvas_urgency, next_canvas_urgency_change
+
+URGENCY_FLUSH_BATCH = int(os.environ.get("URGENCY_FLUSH_BATCH", "200"))
+URGENCY_POLL_SECONDS = float(os.environ.get("URGENCY_POLL_SECONDS", "60"))
+URGENCY_STATE_PATH = os.environ.get(
+    "URGENCY_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".urgency_state.json")
+)
+
+_STATE_VERSION = 1
+
+log = logging.getLogger(__name__)
+
+
+def _is_open_canvas(row: dict) -> bool:
+    return "canvas" in (row.get("source") or "").lower() and not row.get("completed")
+
+
+class UrgencyEngine:
+    """Per-user deadline heaps for open Canvas notifications, with batched write-back."""
+
+    def __init__(self, writer=None, clock=datetime.now, batch_size: int = URGENCY_FLUSH_BATCH):
+        # writer(urgency, ids) -> updated rows; defaults to a Supabase update.
+        self._writer = writer
+        self._clock = clock
+        self.batch_size = batch_size
+        # user_id -> heap of (change_at, generation, notification id)
+        self._heaps: dict[str, list] = defaultdict(list)
+        # Min-heap of (earliest change_at, user_id); may hold stale heads, checked on pop.
+        self._users: list = []
+        # notification id -> (user_id, event_date, urgency currently stored, generation)
+        self._tracked: dict[int, tuple] = {}
+        # urgency -> ids waiting to be written
+        self._pending: dict[str, set] = defaultdict(set)
+        self._generations = itertools.count()
+        # updated_at high-water mark of the delta sync (see poll_changes)
+        self.since: str | None = None
+
+    def __len__(self):
+        return len(self._tracked)
+
+    def track(self, row: dict) -> bool:
+        """
+        Start (or refresh) tracking a notification row; completed or non-Canvas rows are dropped.
+        Returns True if the row's stored urgency is already out of date (a write is queued).
+        """
+        notif_id = row.get("id")
+        if notif_id is None:
+            return False
+        if not _is_open_canvas(row):
+            self.untrack(notif_id)
+            return False
+        # A new generation makes any heap entries from earlier track() calls stale.
+        self._tracked[notif_id] = (str(row.get("user_id")), row.get("event_date") or "", row.get("urgency") or "",
+                                   next(self._generations))
+        return self._recompute(notif_id, self._clock())
+
+    def untrack(self, notif_id):
+        # Heap entries for untracked ids are skipped lazily when popped.
+        self._tracked.pop(notif_id, None)
+        for ids in self._pending.values():
+            ids.discard(notif_id)
+
+    def _recompute(self, notif_id, now: datetime) -> bool:
+        user_id, event_date, stored, generation = self._tracked[notif_id]
+        wanted = canvas_urgency(event_date, now)
+        for ids in self._pending.values():
+            ids.discard(notif_id)
+        if wanted != stored:
+            self._pending[wanted].add(notif_id)
+        change_at = next_canvas_urgency_change(event_date, now)
+        if change_at is None and wanted == stored:
+            # Nothing left to change for this row.
+            del self._tracked[notif_id]
+        elif change_at is not None:
+            heap = self._heaps[user_id]
+            entry = (change_at, generation, notif_id)
+            heapq.heappush(heap, entry)
+            if heap[0] is entry:
+                heapq.heappush(self._users, (change_at, user_id))
+        return wanted != stored
+
+    def next_change(self) -> datetime | None:
+        """Earliest pending threshold crossing across all users."""
+        while self._users:
+            change_at, user_id = self._users[0]
+            heap = self._heaps.get(user_id)
+            if heap and heap[0][0] == change_at:
+                return change_at
+            heapq.heappop(self._users)  # stale head
+            if heap:
+                heapq.heappush(self._users, (heap[0][0], user_id))
+        return None
+
+    def advance(self, now: datetime = None) -> int:
+        """Apply every threshold crossed by now; returns how many rows were queued for a write."""
+        now = now or self._clock()
+        changed = 0
+        while self._users and self._users[0][0] <= now:
+            _, user_id = heapq.heappop(self._users)
+            heap = self._heaps.get(user_id)
+            while heap and heap[0][0] <= now:
+                _, generation, notif_id = heapq.heappop(heap)
+                entry = self._tracked.get(notif_id)
+                if entry is None or entry[3] != generation:
+                    continue
+                changed += self._recompute(notif_id, now)
+            if heap:
+                heapq.heappush(self._users, (heap[0][0], user_id))
+            else:
+                self._heaps.pop(user_id, None)
+        return changed
+
+    def pending_count(self) -> int:
+        return sum(len(ids) for ids in self._pending.values())
+
+    def flush(self) -> list[dict]:
+        """Write queued urgency changes in batches; returns the updated rows."""
+        updated = []
+        for urgency, ids in list(self._pending.items()):
+            ids = sorted(ids)
+            for start in range(0, len(ids), self.batch_size):
+                chunk = ids[start:start + self.batch_size]
+                rows = self._write(urgency, chunk)
+                updated.extend(rows)
+                for notif_id in chunk:
+                    entry = self._tracked.get(notif_id)
+                    if entry is None:
+                        continue
+                    if next_canvas_urgency_change(entry[1], self._clock()) is None:
+                        del self._tracked[notif_id]
+                    else:
+                        self._tracked[notif_id] = (entry[0], entry[1], urgency, entry[3])
+            self._pending.pop(urgency, None)
+        return updated
+
+    def save(self, path: str = URGENCY_STATE_PATH):
+        """Write the tracked rows (with the urgency currently stored) and the sync high-water mark atomically."""
+        state = {
+            "version": _STATE_VERSION,
+            "since": self.since,
+            "rows": [[notif_id, user_id, event_date, stored]
+                     for notif_id, (user_id, event_date, stored, _) in self._tracked.items()],
+        }
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def load(self, path: str = URGENCY_STATE_PATH) -> bool:
+        """
+        Re-track saved rows against the current clock, so thresholds crossed while nothing was running
+        are queued. Returns False if there is no usable state (missing, another format version, no mark).
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        if state.get("version") != _STATE_VERSION or not state.get("since"):
+            return False
+        for notif_id, user_id, event_date, stored in state.get("rows", []):
+            self.track({"id": notif_id, "user_id": user_id, "source": "canvas", "event_date": event_date,
+                        "urgency": stored, "completed": False})
+        self.since = state["since"]
+        return True
+
+    def _write(self, urgency: str, ids: list) -> list[dict]:
+        if self._writer is not None:
+            return self._writer(urgency, ids) or []
+        supabase = _supabase()
+        return supabase.table("notifications").update({"urgency": urgency}).in_("id", ids).execute().data or []
+
+
+def _supabase():
+    return instrument_supabase(create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")))
+
+
+def _open_canvas_query(supabase, columns="id,user_id,source,event_date,urgency,completed,updated_at"):
+    return (
+        supabase.table("notifications")
+        .select(columns)
+        .ilike("source", "%canvas%")
+        .eq("completed", False)
+    )
+
+
+def load_initial(engine: UrgencyEngine, supabase, page_size: int = 1000):
+    """
+    Track every open Canvas row that can still change: event date today or later, or currently
+    stored as Ultra High (may need demoting).
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    offset = 0
+    while True:
+        rows = (
+            _open_canvas_query(supabase)
+            .or_(f'and(event_date.gte.{today},event_date.lte.9999-12-31),urgency.ilike."ultra high"')
+            .order("id")
+            .range(offset, offset + page_size - 1)
+            .execute()
+        ).data or []
+        for row in rows:
+            engine.track(row)
+        if len(rows) < page_size:
+            return
+        offset += page_size
+
+
+def poll_changes(engine: UrgencyEngine, supabase, since: str | None) -> str | None:
+    """Track Canvas rows created or edited after since (completed ones are untracked). Returns the new high-water mark."""
+    query = supabase.table("notifications").select("id,user_id,source,event_date,urgency,completed,updated_at").ilike("source", "%canvas%")
+    if since:
+        query = query.gt("updated_at", since)
+    rows = query.order("updated_at").limit(5000).execute().data or []
+    for row in rows:
+        engine.track(row)
+        since = row.get("updated_at") or since
+    return since
+
+
+def _publish_updates(rows: list[dict]):
+    by_user = defaultdict(list)
+    for row in rows:
+        by_user[row.get("user_id")].append(row)
+        publish(row.get("user_id"), "notification.updated", row)
+    for user_id, user_rows in by_user.items():
+        apply_notification_changes(user_id, user_rows)
+
+
+def run(once: bool = False, poll_seconds: float = URGENCY_POLL_SECONDS, state_path: str = URGENCY_STATE_PATH,
+        supabase=None):
+    supabase = supabase or _supabase()
+    engine = UrgencyEngine()
+    if engine.load(state_path):
+        engine.since = poll_changes(engine, supabase, engine.since)
+        log.info("tracking %d open Canvas notification(s) (resumed)", len(engine))
+    else:
+        # Re-tracking a row is idempotent, so start the delta a little before the load to cover clock skew.
+        engine.since = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+        load_initial(engine, supabase)
+        log.info("tracking %d open Canvas notification(s) (full load)", len(engine))
+    while True:
+        engine.advance()
+        if engine.pending_count():
+            rows = engine.flush()
+            log.info("updated %d notification(s)", len(rows))
+            _publish_updates(rows)
+        engine.save(state_path)
+        if once:
+            return
+        next_change = engine.next_change()
+        wait = poll_seconds
+        if next_change is not None:
+            wait = min(wait, max(0.0, (next_change - datetime.now()).total_seconds()))
+        time.sleep(wait)
+        engine.since = poll_changes(engine, supabase, engine.since)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep Canvas notification urgency in step with the calendar")
+    parser.add_argument("--once", action="store_true", help="Apply due urgency changes once and exit")
+    parser.add_argument("--poll-seconds", type=float, default=URGENCY_POLL_SECONDS,
+                        help="How often to pick up new or edited notifications")
+    parser.add_argument("--state", default=URGENCY_STATE_PATH, help="State file (tracked rows + sync mark)")
+    args = parser.parse_args()
+    configure_logging()
+    try:
+        run(once=args.once, poll_seconds=args.poll_seconds, state_path=args.state)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Email -> Supabase auth user id.
+
+Used by the Google OAuth callback when no profile row exists yet. Resolution order:
+1. a small in-process TTL cache;
+2. the auth_user_id_by_email RPC (triton-hub/supabase/auth_user_lookup.sql), an indexed lookup on
+   auth.users.email, so the cost does not grow with the number of users;
+3. if that function has not been installed, auth.admin.list_users page by page until the email is found.
+"""
+import logging
+import os
+
+from ttl_cache import TTLCache
+
+USER_LOOKUP_TTL = float(os.environ.get("USER_LOOKUP_TTL", "600"))
+USER_LOOKUP_CACHE_SIZE = 10_000
+_LIST_USERS_PAGE_SIZE = 1000
+
+_cache = TTLCache(maxsize=USER_LOOKUP_CACHE_SIZE, ttl=USER_LOOKUP_TTL)
+log = logging.getLogger(__name__)
+# Set once the RPC is known to be missing, so we do not pay a failing round trip on every login.
+_rpc_available = True
+
+
+def _norm(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+def remember(email: str, user_id: str):
+    """Cache a known mapping (e.g. right after creating the auth user)."""
+    if not email or not user_id:
+        return
+    _cache.set(_norm(email), str(user_id))
+
+
+def forget(email: str):
+    _cache.pop(_norm(email))
+
+
+def _field(obj, name):
+    return getattr(obj, name, None) or (obj.get(name) if isinstance(obj, dict) else None)
+
+
+def _lookup_rpc(supabase, email: str) -> str | None:
+    global _rpc_available
+    try:
+        res = supabase.rpc("auth_user_id_by_email", {"p_email": email}).execute()
+    except Exception as e:
+        # Only "function not found" means the RPC is not installed; anything else (timeouts, permission
+        # errors, ...) must not switch every later login over to list_users paging.
+        msg = str(e).lower()
+        if getattr(e, "code", None) == "PGRST202" or "pgrst202" in msg or "could not find the function" in msg:
+            log.info("auth_user_id_by_email() not installed; falling back to list_users paging")
+            _rpc_available = False
+            return None
+        raise
+    data = res.data
+    if isinstance(data, list):
+        data = data[0] if data else None
+    if isinstance(data, dict):
+        data = data.get("auth_user_id_by_email") or data.get("id")
+    return str(data) if data else None
+
+
+def _lookup_paged(supabase, email: str) -> str | None:
+    page = 1
+    while True:
+        ulist = supabase.auth.admin.list_users(page=page, per_page=_LIST_USERS_PAGE_SIZE)
+        if not isinstance(ulist, list):
+            ulist = getattr(ulist, "users", None) or []
+        for u in ulist:
+            em = _field(u, "email")
+            if em and _norm(em) == email:
+                return _field(u, "id")
+        if len(ulist) < _LIST_USERS_PAGE_SIZE:
+            return None
+        page += 1
+
+
+def find_auth_user_id(supabase, email: str) -> str | None:
+    """Auth user id for email, or None if no such user exists."""
+    email = _norm(email)
+    if not email:
+        return None
+    user_id = _cache.get(email)
+    if user_id:
+        return user_id
+    if _rpc_available:
+        user_id = _lookup_rpc(supabase, email)
+    if not user_id and not _rpc_available:
+        user_id = _lookup_paged(supabase, email)
+    if user_id:
+        remember(email, user_id)
+    return user_id
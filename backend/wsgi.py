@@ -0,0 +1,24 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app      (Linux / macOS)
+    python wsgi.py                             (any OS; waitress, e.g. on Windows)
+
+`python app.py` remains the single-process debug server for development.
+"""
+import os
+
+from app import app
+
+if __name__ == "__main__":
+    from waitress import serve
+
+    # waitress is a single process with a thread pool; size it like one gunicorn gthread worker per core.
+    serve(
+        app,
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", "8080")),
+        threads=int(os.environ.get("WAITRESS_THREADS", "16")),
+        channel_timeout=int(os.environ.get("GUNICORN_TIMEOUT", "120")),
+        connection_limit=int(os.environ.get("WAITRESS_CONNECTION_LIMIT", "1000")),
+    )
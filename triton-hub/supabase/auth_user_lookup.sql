@@ -0,0 +1,18 @@
+-- Run in Supabase SQL editor once: indexed email -> auth user id lookup for the Google OAuth
+-- callback (backend/user_lookup.py). Without it the backend pages through auth.admin.list_users.
+create or replace function public.auth_user_id_by_email(p_email text)
+returns uuid
+language sql
+stable
+security definer
+set search_path = ''
+as $$
+  -- auth.users.email is stored lower-case and indexed.
+  select id from auth.users where email = lower(p_email) limit 1;
+$$;
+
+revoke all on function public.auth_user_id_by_email(text) from public, anon, authenticated;
+grant execute on function public.auth_user_id_by_email(text) to service_role;
+
+-- The callback first looks the user up in profiles by email.
+create index if not exists profiles_email_idx on public.profiles (email);
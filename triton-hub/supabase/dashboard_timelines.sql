@@ -0,0 +1,15 @@
+-- Run in Supabase SQL editor once: materialized per-user timeline served by GET /api/dashboard.
+-- The backend (service role) keeps it current on notification writes, syncs and Canvas fetches.
+create table if not exists public.dashboard_timelines (
+  user_id uuid primary key references auth.users (id) on delete cascade,
+  items jsonb not null default '[]'::jsonb,
+  version bigint not null default 1,
+  updated_at timestamptz not null default now(),
+  canvas_synced_at timestamptz
+);
+
+alter table public.dashboard_timelines enable row level security;
+
+drop policy if exists "Users read own dashboard timeline" on public.dashboard_timelines;
+create policy "Users read own dashboard timeline" on public.dashboard_timelines
+  for select using (auth.uid() = user_id);
@@ -0,0 +1,19 @@
+-- Run in Supabase SQL editor once: enables delta sync (GET /api/profile/notifications?updated_since=...)
+-- and keyset pagination on the notifications list.
+alter table public.notifications add column if not exists updated_at timestamptz not null default now();
+
+create or replace function public.set_notifications_updated_at()
+returns trigger language plpgsql as $$
+begin
+  new.updated_at = now();
+  return new;
+end;
+$$;
+
+drop trigger if exists notifications_set_updated_at on public.notifications;
+create trigger notifications_set_updated_at
+  before update on public.notifications
+  for each row execute function public.set_notifications_updated_at();
+
+create index if not exists notifications_user_created_idx on public.notifications (user_id, created_at desc, id desc);
+create index if not exists notifications_user_updated_idx on public.notifications (user_id, updated_at, id);
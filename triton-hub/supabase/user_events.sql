@@ -0,0 +1,15 @@
+-- Run in Supabase SQL editor once: cross-process live events (backend/event_broker.py, EVENT_BROKER=supabase).
+-- Every process appends here; each web worker polls new rows and pushes them to its /api/events streams.
+-- Rows are short-lived: the relays delete them after EVENT_RETENTION_SECONDS.
+create table if not exists public.user_events (
+  id bigserial primary key,
+  user_id uuid not null,
+  type text not null,
+  data jsonb not null default '{}'::jsonb,
+  created_at timestamptz not null default now()
+);
+
+create index if not exists user_events_created_idx on public.user_events (created_at, id);
+
+-- Only the backend (service role) reads and writes events.
+alter table public.user_events enable row level security;